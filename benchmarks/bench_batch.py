@@ -0,0 +1,61 @@
+""" Scaling curve of `normalize_batch` by the number of worker processes, for
+each scheduler. Some huge arrays are mixed into the formulas, as the real 
+corpus does
+
+Usage:
+    python benchmarks/bench_batch.py [number of formulas]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from xizi_latex_normalizer.batch import normalize_batch, SCHEDULER_FIXED, SCHEDULER_COST
+
+from samples import SAMPLE_LATEX_LIST
+
+
+HUGE_LATEX = (
+    r"\begin{array}{l}" + r"x^{2}+\frac{1}{2} \\ " * 500 + r"\end{array}"
+)
+# one huge formula for each number of formulas
+HUGE_LATEX_INTERVAL = 2000
+
+
+def get_workers_list(cpu_count: int) -> list:
+    workers_list, workers = [], 1
+    while workers < cpu_count:
+        workers_list.append(workers)
+        workers *= 2
+    workers_list.append(cpu_count)
+
+    return workers_list
+
+
+def main(num_formulas: int):
+    latex_list = (SAMPLE_LATEX_LIST * (num_formulas // len(SAMPLE_LATEX_LIST) + 1))
+    latex_list = latex_list[:num_formulas]
+    latex_list[::HUGE_LATEX_INTERVAL] = (
+        [HUGE_LATEX] * len(latex_list[::HUGE_LATEX_INTERVAL])
+    )
+
+    print("{:>9} {:>7} {:>9} {:>12} {:>8} {:>10}".format(
+        "scheduler", "workers", "seconds", "formulas/s", "speedup", "efficiency"))
+    base_cost = None
+    for scheduler in (SCHEDULER_FIXED, SCHEDULER_COST):
+        for workers in get_workers_list(os.cpu_count() or 1):
+            start = time.perf_counter()
+            normalize_batch(latex_list, workers=workers, scheduler=scheduler, 
+                            ensure_valid_formula=False)
+            cost = time.perf_counter() - start
+
+            base_cost = base_cost or cost
+            print("{:>9} {:>7} {:>9.3f} {:>12.0f} {:>8.2f} {:>10.1%}".format(
+                scheduler, workers, cost, num_formulas / cost, base_cost / cost, 
+                base_cost / cost / workers))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
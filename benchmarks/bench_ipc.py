@@ -0,0 +1,79 @@
+""" Per-item overhead of sending short formulas to worker processes and back,
+by plain `Pool.map`, and by `normalize_batch` with pickled or packed chunks.
+Transports are also timed alone by echoing chunks without normalizing
+
+Usage:
+    python benchmarks/bench_ipc.py [number of formulas] [number of workers]
+"""
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xizi_latex_normalizer.batch import (
+    normalize_batch, TRANSPORT_PICKLE, TRANSPORT_PACKED, CHUNKS_PER_WORKER
+)
+from xizi_latex_normalizer.ipc import pack_texts, unpack_texts
+from xizi_latex_normalizer.normalize import normalize_latex_expression
+
+
+SHORT_LATEX_LIST = ["x", "a+b", r"\frac12", "x^2", r"\alpha", "2k+1", r"\sqrt3", "f(x)"]
+
+
+def echo_items(item_list):
+    return list(item_list)
+
+
+def echo_packed(buffer):
+    return pack_texts(unpack_texts(buffer)[0])
+
+
+def time_it(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(num_formulas: int, workers: int):
+    latex_list = (SHORT_LATEX_LIST * (num_formulas // len(SHORT_LATEX_LIST) + 1))
+    latex_list = latex_list[:num_formulas]
+    chunksize = math.ceil(num_formulas / (workers * CHUNKS_PER_WORKER))
+    chunk_list = [
+        latex_list[start:start + chunksize] for start in range(0, num_formulas, chunksize)
+    ]
+
+    serial_cost = time_it(lambda: [normalize_latex_expression(latex) for latex in latex_list])
+    print("{:>24} {:>9} {:>12}".format("case", "seconds", "us/formula"))
+    print("{:>24} {:>9.3f} {:>12.2f}".format(
+        "serial", serial_cost, serial_cost / num_formulas * 1e6))
+
+    with multiprocessing.Pool(workers) as pool:
+        # workers are started before timing
+        pool.map(echo_items, [[]] * workers)
+        case_list = [
+            ("echo pickled", lambda: pool.map(echo_items, chunk_list)),
+            ("echo packed", lambda: [
+                unpack_texts(buffer) for buffer in
+                pool.map(echo_packed, [pack_texts(chunk) for chunk in chunk_list])
+            ]),
+            ("Pool.map", lambda: pool.map(
+                normalize_latex_expression, latex_list, chunksize=chunksize)),
+        ]
+        for name, func in case_list:
+            cost = time_it(func)
+            print("{:>24} {:>9.3f} {:>12.2f}".format(name, cost, cost / num_formulas * 1e6))
+
+    for transport in (TRANSPORT_PICKLE, TRANSPORT_PACKED):
+        cost = time_it(lambda: normalize_batch(latex_list, workers=workers, transport=transport))
+        print("{:>24} {:>9.3f} {:>12.2f}".format(
+            "normalize_batch " + transport, cost, cost / num_formulas * 1e6))
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    )
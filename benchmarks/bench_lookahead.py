@@ -0,0 +1,36 @@
+""" Report how often a stream peeks at the same status while normalizing
+
+Usage:
+    python benchmarks/bench_lookahead.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from xizi_latex_normalizer.components import BraceComponent
+from xizi_latex_normalizer.stream import LatexTokenStream
+
+from samples import SAMPLE_LATEX_LIST
+
+
+def main():
+    total_hits, total_misses = 0, 0
+    print("{:>6} {:>6} {:>9}  {}".format("hits", "misses", "hit rate", "latex"))
+    for latex in SAMPLE_LATEX_LIST:
+        stream = LatexTokenStream('{' + latex + '}', pretokenize=True)
+        BraceComponent.match(stream, strict=True).to_string()
+
+        stats = stream.get_lookahead_stats()
+        total_hits += stats["hits"]
+        total_misses += stats["misses"]
+        print("{:>6} {:>6} {:>9.1%}  {}".format(
+            stats["hits"], stats["misses"], stats["hit_rate"], latex[:50]))
+
+    print("{:>6} {:>6} {:>9.1%}  total".format(
+        total_hits, total_misses, total_hits / (total_hits + total_misses)))
+
+
+if __name__ == "__main__":
+    main()
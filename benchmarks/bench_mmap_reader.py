@@ -0,0 +1,48 @@
+""" Compare normalizing a file of one formula per line by streaming records
+to workers, and by memory mapped shards decoded by workers themselves
+
+Usage:
+    python benchmarks/bench_mmap_reader.py [number of formulas] [number of workers]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from xizi_latex_normalizer.corpus import normalize_files
+from xizi_latex_normalizer.mmap_reader import normalize_mmap_file
+
+from samples import SAMPLE_LATEX_LIST
+
+
+def main(num_formulas: int, workers: int):
+    latex_list = (SAMPLE_LATEX_LIST * (num_formulas // len(SAMPLE_LATEX_LIST) + 1))
+    temp_dir = tempfile.mkdtemp()
+    try:
+        input_path = os.path.join(temp_dir, "formulas.txt")
+        with open(input_path, "w", encoding="utf-8") as wfile:
+            wfile.write("\n".join(latex_list[:num_formulas]) + "\n")
+
+        output_path = os.path.join(temp_dir, "normalized.txt")
+        case_list = [
+            ("stream", lambda: normalize_files([input_path], output_path, workers=workers)),
+            ("mmap", lambda: normalize_mmap_file(input_path, output_path, workers=workers)),
+        ]
+        for name, run in case_list:
+            start = time.perf_counter()
+            run()
+            cost = time.perf_counter() - start
+            print("{:>8} {:>9.3f}s {:>12.0f} formulas/s".format(name, cost, num_formulas / cost))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    )
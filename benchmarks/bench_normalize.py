@@ -0,0 +1,43 @@
+""" Benchmark of the whole `normalize_latex_expression` path, with formulas
+tokenized into `TokenTable` before parsing or not
+
+Usage:
+    python benchmarks/bench_normalize.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samples import SAMPLE_LATEX_LIST
+from xizi_latex_normalizer.normalize import Normalizer, normalize_latex_expression
+
+
+LONG_LATEX = " + ".join(SAMPLE_LATEX_LIST) * 5
+
+
+def bench(latex_list: list, number: int) -> float:
+    """ Return the best seconds of normalizing `latex_list` once """
+    return min(timeit.repeat(
+        lambda: [normalize_latex_expression(latex) for latex in latex_list],
+        number=number, repeat=5
+    )) / number
+
+
+def main():
+    print("{:>24} {:>12} {:>12}".format("case", "samples ms", "long ms"))
+    default_pretokenize = Normalizer.pretokenize
+    try:
+        for pretokenize in (False, True):
+            Normalizer.pretokenize = pretokenize
+            print("{:>24} {:>12.2f} {:>12.2f}".format(
+                "pretokenize" if pretokenize else "lookahead cache only",
+                bench(SAMPLE_LATEX_LIST, 20) * 1e3, bench([LONG_LATEX], 3) * 1e3
+            ))
+    finally:
+        Normalizer.pretokenize = default_pretokenize
+
+
+if __name__ == "__main__":
+    main()
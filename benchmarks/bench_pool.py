@@ -0,0 +1,70 @@
+""" Startup latency of `NormalizerPool` with preloaded state, compared with a
+cold pool of spawned processes loading everything by the first formula
+
+Usage:
+    python benchmarks/bench_pool.py [number of workers]
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xizi_latex_normalizer.batch import normalize_items, BATCH_KIND_LATEX
+from xizi_latex_normalizer.normalize import Normalizer
+from xizi_latex_normalizer.pool import NormalizerPool
+
+
+LATEX = r"\frac12+\sqrt[3]{x}\geqslant\sin\alpha"
+ROUNDS = 3
+
+
+def time_cold_pool(workers: int) -> tuple:
+    """ Seconds to start, and to get the first result of each worker """
+    normalizer = Normalizer()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, 
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        started = time.perf_counter()
+        list(executor.map(
+            normalize_items, [normalizer] * workers, [BATCH_KIND_LATEX] * workers,
+            [[LATEX]] * workers
+        ))
+        first_result = time.perf_counter()
+
+    return started - start, first_result - start
+
+
+def time_warm_pool(workers: int, start_method: str) -> tuple:
+    start = time.perf_counter()
+    with NormalizerPool(workers=workers, start_method=start_method) as pool:
+        started = time.perf_counter()
+        pool.map([LATEX] * workers, chunksize=1)
+        first_result = time.perf_counter()
+
+    return started - start, first_result - start
+
+
+def main(workers: int):
+    case_list = [("cold spawn", time_cold_pool)]
+    for start_method in ("fork", "forkserver", "spawn"):
+        if start_method in multiprocessing.get_all_start_methods():
+            case_list.append((
+                "warm " + start_method,
+                lambda workers, start_method=start_method: time_warm_pool(workers, start_method)
+            ))
+
+    print("{:>16} {:>10} {:>14}".format("pool", "start(s)", "first result(s)"))
+    for name, time_func in case_list:
+        timing_list = [time_func(workers) for _ in range(ROUNDS)]
+        print("{:>16} {:>10.3f} {:>14.3f}".format(
+            name, 
+            min(timing[0] for timing in timing_list), 
+            min(timing[1] for timing in timing_list)
+        ))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1))
@@ -0,0 +1,36 @@
+""" Normalizing a batch of sentences repeating small formulas, sentence by
+sentence, and with each distinct formula of the batch normalized once
+
+Usage:
+    python benchmarks/bench_sentence_dedup.py [number of sentences]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samples import SAMPLE_SENTENCE_LIST
+from xizi_latex_normalizer.batch import normalize_sentence_batch, normalize_sentences
+
+
+def main(num_sentences: int):
+    sentence_list = [
+        SAMPLE_SENTENCE_LIST[idx % len(SAMPLE_SENTENCE_LIST)] for idx in range(num_sentences)
+    ]
+
+    print("{:>24} {:>12}".format("case", "ms"))
+    start = time.perf_counter()
+    normalize_sentence_batch(sentence_list, workers=1)
+    print("{:>24} {:>12.2f}".format("sentence by sentence", (time.perf_counter() - start) * 1e3))
+
+    start = time.perf_counter()
+    _, stats = normalize_sentences(sentence_list)
+    print("{:>24} {:>12.2f}".format("deduplicated", (time.perf_counter() - start) * 1e3))
+    print("{} formulas, {} unique, dedup ratio {:.2%}".format(
+        stats["formulas"], stats["unique_formulas"], stats["dedup_ratio"]
+    ))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
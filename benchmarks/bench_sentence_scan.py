@@ -0,0 +1,47 @@
+""" Splitting a long document into texts and formulas, by translating units
+and splitting at $ in two passes over chars, and by the single-pass scanner
+searching delimiters with compiled regex
+
+Usage:
+    python benchmarks/bench_sentence_scan.py [kilobytes of document]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samples import SAMPLE_SENTENCE_LIST
+from xizi_latex_normalizer.utils.common_utils import (
+    trans_chinese_unit_to_latex, split_to_latex_and_not, scan_sentence
+)
+
+
+def split_in_two_passes(document: str) -> list:
+    return split_to_latex_and_not(trans_chinese_unit_to_latex(document))
+
+
+def time_it(func, document: str, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(document)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(kilobytes: int):
+    paragraph = "。".join(SAMPLE_SENTENCE_LIST) + "\n"
+    document = paragraph * (kilobytes * 1024 // len(paragraph.encode("utf-8")) + 1)
+    print("document of {} KB, {} formulas".format(
+        len(document.encode("utf-8")) // 1024, len(scan_sentence(document)[1])
+    ))
+
+    print("{:>24} {:>12}".format("case", "ms"))
+    for name, func in (("two passes", split_in_two_passes),
+                       ("single pass", scan_sentence)):
+        print("{:>24} {:>12.2f}".format(name, time_it(func, document) * 1e3))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,66 @@
+""" Normalizing a corpus with repeated formulas by workers, without cache,
+with a result cache in each worker, and with the cache shared by workers, in
+which a formula is normalized once for all workers
+
+Usage:
+    python benchmarks/bench_shared_cache.py [number of formulas] [number of workers]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samples import SAMPLE_LATEX_LIST
+from xizi_latex_normalizer.batch import normalize_batch
+from xizi_latex_normalizer.cache import (
+    enable_result_cache, disable_result_cache, enable_shared_cache, disable_shared_cache
+)
+
+
+def make_corpus(num_formulas: int) -> list:
+    """ Formulas of popularity like real corpora, a few ones are repeated a
+    lot, and most ones are rare
+    """
+    rng = random.Random(0)
+    distinct_list = SAMPLE_LATEX_LIST + [
+        r"x^{%d}+\frac{%d}{2}" % (idx, idx) for idx in range(num_formulas // 10)
+    ]
+    weight_list = [1.0 / (rank + 1) for rank in range(len(distinct_list))]
+    rng.shuffle(distinct_list)
+    return rng.choices(distinct_list, weight_list, k=num_formulas)
+
+
+def main(num_formulas: int, workers: int):
+    latex_list = make_corpus(num_formulas)
+    print("{} formulas, {} distinct, {} workers".format(
+        num_formulas, len(set(latex_list)), workers))
+    print("{:>16} {:>9} {:>10}".format("cache", "seconds", "hit rate"))
+
+    for name in ("none", "per worker", "shared"):
+        if name == "per worker":
+            enable_result_cache()
+        elif name == "shared":
+            cache = enable_shared_cache(max_entries=4 * num_formulas)
+
+        start = time.perf_counter()
+        normalize_batch(latex_list, workers=workers)
+        seconds = time.perf_counter() - start
+
+        hit_rate = ""
+        if name == "shared":
+            stats = cache.get_stats()
+            # workers count their own hits, the table counts distinct results
+            hit_rate = "{:.1%}".format(1 - stats["entries"] / num_formulas)
+        print("{:>16} {:>9.3f} {:>10}".format(name, seconds, hit_rate))
+
+        disable_result_cache()
+        disable_shared_cache()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1),
+    )
@@ -0,0 +1,63 @@
+""" Compare normalizing formulas differing only in literals directly and 
+through the skeleton cache
+
+Usage:
+    python benchmarks/bench_skeleton_cache.py [number of formulas]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xizi_latex_normalizer.cache import SkeletonCache
+from xizi_latex_normalizer.normalize import Normalizer
+
+
+# `{n}` for numbers and `{v}` for variables
+TEMPLATE_LIST = [
+    r"\frac{{{n}}}{{{n}}}+\frac{{{n}}}{{{n}}}",
+    r"{v}^{{2}}+{v}^{{2}}={v}^{{2}}",
+    r"\left({n}+{v}\right)\times {n}",
+    r"\sqrt{{{n}}}+\sqrt{{{v}+{n}}}",
+    r"f({v})=\frac{{{v}}}{{{n}}}-{n}",
+    r"\log_{{2}}({n})+\sin({v})",
+    r"\left\{{\begin{{array}}{{l}}{{{v}+{v}={n}}} \\ {{{v}-{v}={n}}}\end{{array}}\right.",
+    r"\overline{{{v}}}\perp \vec{{{v}}}",
+]
+
+
+def fill_template(template: str, rnd: random.Random) -> str:
+    # fill one by one, as each `{n}` and `{v}` gets its own value
+    while "{n}" in template or "{v}" in template:
+        template = template.replace("{n}", str(rnd.randint(0, 99)), 1)
+        template = template.replace("{v}", rnd.choice(string.ascii_lowercase), 1)
+
+    return template.replace("{{", "{").replace("}}", "}")
+
+
+def main(num_formulas: int):
+    rnd = random.Random(0)
+    latex_list = [
+        fill_template(rnd.choice(TEMPLATE_LIST), rnd) for _ in range(num_formulas)
+    ]
+    normalizer = Normalizer(ensure_valid_formula=False)
+
+    start = time.perf_counter()
+    expected = [normalizer(latex) for latex in latex_list]
+    direct_cost = time.perf_counter() - start
+
+    cache = SkeletonCache()
+    start = time.perf_counter()
+    result = [cache.normalize(normalizer, latex) for latex in latex_list]
+    skeleton_cost = time.perf_counter() - start
+
+    assert result == expected
+    print("direct:   {:.3f}s".format(direct_cost))
+    print("skeleton: {:.3f}s, {}".format(skeleton_cost, cache.get_stats()))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,56 @@
+""" Benchmark of tokenizing cost per token while the formula grows longer
+
+Usage:
+    python benchmarks/bench_tokenize.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xizi_latex_normalizer.stream import LatexTokenStream
+from xizi_latex_normalizer.stream.token_stream import LEXER_STEPWISE, LEXER_REGEX
+
+
+UNIT_LATEX = r"x^{2} + \frac{1}{2} \sqrt[3]{a b} - \sin \alpha + 12.5 k \\ "
+LENGTH_LIST = [100, 1000, 10000, 100000]
+
+
+def make_latex(length: int) -> str:
+    return (UNIT_LATEX * (length // len(UNIT_LATEX) + 1))[:length]
+
+
+CASE_LIST = [
+    # (name, kwargs of LatexTokenStream)
+    ("stepwise", {"lexer": LEXER_STEPWISE}),
+    ("regex", {"lexer": LEXER_REGEX}),
+    ("regex+pretokenize", {"lexer": LEXER_REGEX, "pretokenize": True}),
+]
+
+
+def bench(latex: str, kwargs: dict, number: int) -> float:
+    """ Return the best seconds of tokenizing `latex` once """
+    return min(timeit.repeat(
+        lambda: LatexTokenStream(latex, **kwargs).get_all_tokens(),
+        number=number, repeat=3
+    )) / number
+
+
+def main():
+    print("us per token")
+    print("{:>8} {:>8}".format("chars", "tokens") + "".join(
+        " {:>18}".format(name) for name, _ in CASE_LIST))
+    for length in LENGTH_LIST:
+        latex = make_latex(length)
+        num_tokens = len(LatexTokenStream(latex).get_all_tokens())
+        number = max(1, 20000 // length)
+
+        print("{:>8} {:>8}".format(length, num_tokens) + "".join(
+            " {:>18.3f}".format(bench(latex, kwargs, number) / num_tokens * 1e6)
+            for _, kwargs in CASE_LIST
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+""" Formulas shared by benchmarks """
+
+SAMPLE_LATEX_LIST = [
+    r"x",
+    r"\frac12",
+    r"a^2+b^2=c^2",
+    r"x+\frac12+\vec a-\sqrt[2]5+\frac{\frac12}{\frac1{3}}",
+    r"3 + y^{x+2}_{y+2} + \frac14",
+    r"\left\{\begin{array}{l}{\frac{x^{2}}{a^{2}}+\frac{y^{2}}{a^{2}-9}=1} \\ "
+    r"{y=k(x-3)}\end{array} \Rightarrow \frac{x^{2}}{a^{2}}+"
+    r"\frac{k^{2}(x-3)^{2}}{a^{2}-a}=1\right.",
+    r"\sin \angle A + \cos^2 x = \tan \frac{\pi}{4}",
+    r"\log_23 + \lg 100 - \ln(x+1)",
+    r"f(x)\geq 0",
+    r"\left(\frac{\pi  }{4}+2k\pi ,\frac{\pi }{2}+2k\pi \right)",
+    r"S _ O A B + S_ AC D",
+    r"\overline{AB} \perp \vec{CD}",
+    r"\rm{kg}",
+    r"3.2 + 2.5 = 5.7",
+    r"\sqrt[3]\frac12 + \sqrt{x^2+1}",
+]
+
+SAMPLE_SENTENCE_LIST = [
+    "已知$x+\\frac12=3$，求$x$的值",
+    "其中$64$米的长度为$\\sqrt2$",
+    "在$\\triangle ABC$中，$\\angle A=60^{\\circ}$，$a=\\sqrt3$",
+    "水温为$5$度，速度为$3$米每秒",
+    "设$f(x)=\\log_2 x$，则$f(8)=$",
+]
@@ -27,6 +27,12 @@ setuptools.setup(
     include_package_data=True,
     python_requires='>=3.6',
     install_requires=[],
+    entry_points={
+        "console_scripts": [
+            "xizi-latex-normalize = xizi_latex_normalizer.cli:main",
+            "xizi-latex-normalize-server = xizi_latex_normalizer.server:main",
+        ],
+    },
     classifiers=(
         "Development Status :: 5 - Production/Stable",
         "Programming Language :: Python",
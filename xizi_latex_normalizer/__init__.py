@@ -1 +1,13 @@
-from .normalize import normalize_latex_expression, normalize_latex_in_sentence
\ No newline at end of file
+from .normalize import (
+    normalize_latex_expression, normalize_latex_in_sentence, Normalizer
+)
+from .batch import (
+    normalize_batch, normalize_sentence_batch, normalize_sentences, NormalizeError
+)
+from .pool import NormalizerPool, WorkerExitedError
+from .cache import (
+    enable_result_cache, disable_result_cache, get_result_cache,
+    enable_persistent_cache, disable_persistent_cache, get_persistent_cache,
+    enable_shared_cache, disable_shared_cache, get_shared_cache,
+    enable_skeleton_cache, disable_skeleton_cache, get_skeleton_cache
+)
@@ -0,0 +1,201 @@
+""" Normalization for asyncio. Concurrent requests are collected into
+micro-batches for a short window and normalized by a pool of processes, so
+the event loop is never blocked by normalization
+"""
+import asyncio
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import normalize_items, NormalizeError, BATCH_KIND_LATEX, BATCH_KIND_SENTENCE
+from .exceptions import exception_from_name
+from .normalize import Normalizer
+
+
+# seconds to wait for more requests after the first one of a batch
+BATCH_WINDOW = 0.002
+MAX_BATCH_SIZE = 256
+# requests waiting for batching at most, later ones wait to be queued
+MAX_PENDING = 4096
+
+_get_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
+
+class AsyncNormalizer(object):
+    """ Normalizer with fixed options for asyncio. Requests are queued in a
+    bounded queue, which is drained into batches of `max_batch_size` at most
+    after `batch_window` seconds since the first request of a batch. Batches
+    are normalized by a pool of processes, `max_in_flight` batches at most,
+    and the queue fills up while they are busy, so callers are suspended
+    instead of growing memory without limit
+
+    A cancelled request is dropped if it is still queued, or its result is
+    discarded if its batch is being normalized. Failures are raised as
+    exceptions of the same type, refer to `exceptions.exception_from_name`
+
+    Args:
+        workers(int): number of worker processes, `os.cpu_count()` if None
+        batch_window(float): seconds to collect a batch
+        max_batch_size(int): max number of requests of a batch
+        max_pending(int): max number of queued requests
+        max_in_flight(int): max number of batches being normalized, twice of
+            workers by default
+        options: refer to `normalize_latex_expression`
+    """
+    def __init__(self,
+                 workers: int = None,
+                 batch_window: float = BATCH_WINDOW,
+                 max_batch_size: int = MAX_BATCH_SIZE,
+                 max_pending: int = MAX_PENDING,
+                 max_in_flight: int = None,
+                 **options):
+        self.normalizer = Normalizer(**options)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.max_pending = max_pending
+        self.max_in_flight = max_in_flight or 2 * self.workers
+
+        self._executor = None
+        self._loop = None
+        self._queue = None
+        self._in_flight = None
+        self._batcher = None
+        self._stats = {"requests": 0, "batches": 0, "cancelled": 0}
+
+    async def normalize(self, latex: str) -> str:
+        """ Normalize a latex expression, refer to `normalize_latex_expression` """
+        return await self._submit(BATCH_KIND_LATEX, latex)
+
+    async def normalize_sentence(self, sentence: str) -> str:
+        """ Normalize latex in a sentence, refer to `normalize_latex_in_sentence` """
+        return await self._submit(BATCH_KIND_SENTENCE, sentence)
+
+    def get_stats(self) -> dict:
+        """ Get number of requests, batches, cancelled requests, and requests
+        queued now
+        """
+        stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+    def close(self):
+        """ Stop batching and shut down the pool of processes """
+        if self._batcher is not None and not self._loop.is_closed():
+            self._batcher.cancel()
+        self._batcher = None
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def _submit(self, kind: str, text: str) -> str:
+        self._ensure_started()
+        future = self._loop.create_future()
+        # suspended here while the queue is full
+        await self._queue.put((kind, text, future))
+        self._stats["requests"] += 1
+        return await future
+
+    def _ensure_started(self):
+        """ Start batching in the running loop, once for each loop """
+        loop = _get_running_loop()
+        if loop is self._loop and self._batcher is not None and not self._batcher.done():
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._batcher = loop.create_task(self._run_batcher())
+
+    async def _run_batcher(self):
+        while True:
+            request_list = [await self._queue.get()]
+            if self._queue.qsize() < self.max_batch_size - 1:
+                await asyncio.sleep(self.batch_window)
+            while len(request_list) < self.max_batch_size and not self._queue.empty():
+                request_list.append(self._queue.get_nowait())
+
+            await self._in_flight.acquire()
+            self._loop.create_task(self._run_batch(request_list))
+
+    async def _run_batch(self, request_list: list):
+        try:
+            # requests cancelled while queued
+            pending_list = [request for request in request_list if not request[2].done()]
+            self._stats["cancelled"] += len(request_list) - len(pending_list)
+
+            await asyncio.gather(*[
+                self._run_chunk(kind, [request for request in pending_list if request[0] == kind])
+                for kind in (BATCH_KIND_LATEX, BATCH_KIND_SENTENCE)
+                if any(request[0] == kind for request in pending_list)
+            ])
+        finally:
+            self._in_flight.release()
+            for _, _, future in request_list:
+                if not future.done():
+                    future.cancel()
+
+    async def _run_chunk(self, kind: str, request_list: list):
+        self._stats["batches"] += 1
+        try:
+            result_list = await self._loop.run_in_executor(
+                self._executor, normalize_items, self.normalizer, kind,
+                [text for _, text, _ in request_list]
+            )
+        except Exception as e:
+            # e.g. a worker is killed
+            result_list = [e] * len(request_list)
+
+        for (_, _, future), result in zip(request_list, result_list):
+            if future.done():
+                self._stats["cancelled"] += 1
+            elif isinstance(result, NormalizeError):
+                future.set_exception(
+                    exception_from_name(result.exception_type, result.message)
+                )
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_async_normalizers = {}
+
+
+def get_async_normalizer(**options) -> AsyncNormalizer:
+    """ Get the shared `AsyncNormalizer` of `options`, refer to
+    `normalize_latex_expression`
+    """
+    options = Normalizer(**options).options
+    if options not in _async_normalizers:
+        _async_normalizers[options] = AsyncNormalizer(**options._asdict())
+    return _async_normalizers[options]
+
+
+async def anormalize(latex: str, **options) -> str:
+    """ Normalize a latex expression in a pool of processes without blocking
+    the event loop, refer to `normalize_latex_expression` and `AsyncNormalizer`
+    """
+    return await get_async_normalizer(**options).normalize(latex)
+
+
+async def anormalize_sentence(sentence: str, **options) -> str:
+    """ Normalize latex in a sentence in a pool of processes without blocking
+    the event loop, refer to `normalize_latex_in_sentence` and `AsyncNormalizer`
+    """
+    return await get_async_normalizer(**options).normalize_sentence(sentence)
+
+
+@atexit.register
+def _close_async_normalizers():
+    for async_normalizer in _async_normalizers.values():
+        async_normalizer.close()
+    _async_normalizers.clear()
@@ -0,0 +1,388 @@
+import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from .ipc import (
+    pack_texts, unpack_texts, pack_results, unpack_results, put_buffer,
+    put_buffer_for_reader, read_buffer, take_buffer, ensure_shared_memory_tracker,
+    SHARED_MEMORY_THRESHOLD
+)
+from .normalize import Normalizer
+from .utils.common_utils import scan_sentence, join_scanned_sentence
+
+
+BATCH_KIND_LATEX = "latex"
+BATCH_KIND_SENTENCE = "sentence"
+# chunks for each worker by default, more chunks balance better but cost more
+# in inter-process communication
+CHUNKS_PER_WORKER = 4
+
+# Schedulers of batch, `SCHEDULER_FIXED` splits items into chunks of the same
+# size in order, `SCHEDULER_COST` packs chunks of balanced estimated cost, 
+# refer to `CostAwareScheduler`
+SCHEDULER_FIXED = "fixed"
+SCHEDULER_COST = "cost"
+
+# Transports of chunks between processes, `TRANSPORT_PICKLE` pickles lists of
+# items and results, `TRANSPORT_PACKED` packs them into single buffers, 
+# refer to `ipc`
+TRANSPORT_PICKLE = "pickle"
+TRANSPORT_PACKED = "packed"
+
+# extra cost of structures besides their length, in chars
+COST_WEIGHT_BRACE = 2
+COST_WEIGHT_BEGIN = 8
+COST_WEIGHT_FRAC = 4
+
+
+class NormalizeError(namedtuple("NormalizeError", ["exception_type", "message"])):
+    """ Result of an item failed to normalize in batch
+
+    Attributes:
+        exception_type(str): name of the exception class, e.g. `LatexSyntaxError`
+        message(str): message of the exception
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_exception(cls, exception: Exception):
+        return cls(type(exception).__name__, str(exception))
+
+
+def normalize_items(normalizer: Normalizer, kind: str, item_list: list) -> list:
+    """ Normalize items one by one, exceptions are returned as `NormalizeError` """
+    normalize_func = normalizer if kind == BATCH_KIND_LATEX else normalizer.normalize_sentence
+
+    result_list = []
+    for item in item_list:
+        try:
+            result_list.append(normalize_func(item))
+        except Exception as e:
+            result_list.append(NormalizeError.from_exception(e))
+
+    return result_list
+
+
+def normalize_timed_items(normalizer: Normalizer, kind: str, item_list: list) -> tuple:
+    """ Normalize items like `normalize_items`, with seconds spent """
+    start = time.perf_counter()
+    result_list = normalize_items(normalizer, kind, item_list)
+    return result_list, time.perf_counter() - start
+
+
+def normalize_packed_items(normalizer: Normalizer, 
+                           kind: str, 
+                           buffer, 
+                           shared_memory_threshold: int = SHARED_MEMORY_THRESHOLD) -> tuple:
+    """ Normalize items packed by `ipc.pack_texts` like `normalize_items`
+
+    Returns:
+        tuple, (buffer of results packed by `ipc.pack_results`, seconds spent)
+    """
+    start = time.perf_counter()
+    item_list, _ = unpack_texts(read_buffer(buffer))
+    result_buffer = put_buffer_for_reader(
+        pack_results(normalize_items(normalizer, kind, item_list)), shared_memory_threshold
+    )
+    return result_buffer, time.perf_counter() - start
+
+
+def estimate_cost(item: str) -> int:
+    """ Estimate relative cost to normalize `item` by its length and structures """
+    return (
+        len(item) 
+        + COST_WEIGHT_BRACE * item.count("{")
+        + COST_WEIGHT_BEGIN * item.count("\\begin")
+        + COST_WEIGHT_FRAC * item.count("\\frac")
+    )
+
+
+class CostAwareScheduler(object):
+    """ Schedule items into chunks of balanced estimated cost, the most costly
+    items are dispatched first. Cost of a chunk is a share of the remaining 
+    cost for each worker, so chunks get smaller to the end and workers finish 
+    together. Once latency of chunks is observed, chunk cost is also kept 
+    between `min_latency` and `max_latency`
+
+    Args:
+        cost_list(list): estimated cost of each item
+        workers(int): number of workers
+        min_latency(float): seconds a chunk costs at least, for less 
+            inter-process communication
+        max_latency(float): seconds a chunk costs at most
+    """
+    # weight of the latest observation in seconds per cost
+    smoothing = 0.3
+
+    def __init__(self, 
+                 cost_list: list, 
+                 workers: int, 
+                 min_latency: float = 0.01, 
+                 max_latency: float = 0.5):
+        self.workers = workers
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+
+        self._cost_list = cost_list
+        self._order = sorted(
+            range(len(cost_list)), key=cost_list.__getitem__, reverse=True
+        )
+        self._next_idx = 0
+        self._remaining_cost = sum(cost_list)
+        self._seconds_per_cost = None
+
+    def has_next(self) -> bool:
+        return self._next_idx < len(self._order)
+
+    def next_chunk(self) -> list:
+        """ Get indexes of items in the next chunk """
+        target_cost = self._remaining_cost / (self.workers * CHUNKS_PER_WORKER)
+        if self._seconds_per_cost:
+            target_cost = min(
+                max(target_cost, self.min_latency / self._seconds_per_cost),
+                self.max_latency / self._seconds_per_cost
+            )
+
+        chunk, chunk_cost = [], 0
+        while self.has_next() and (not chunk or chunk_cost < target_cost):
+            idx = self._order[self._next_idx]
+            self._next_idx += 1
+            chunk.append(idx)
+            chunk_cost += self._cost_list[idx]
+
+        self._remaining_cost -= chunk_cost
+        return chunk
+
+    def observe(self, chunk: list, seconds: float):
+        """ Update seconds per cost with latency of a finished chunk """
+        chunk_cost = sum(self._cost_list[idx] for idx in chunk)
+        if chunk_cost <= 0:
+            return
+
+        seconds_per_cost = seconds / chunk_cost
+        if self._seconds_per_cost is None:
+            self._seconds_per_cost = seconds_per_cost
+        else:
+            self._seconds_per_cost += self.smoothing * (
+                seconds_per_cost - self._seconds_per_cost
+            )
+
+
+def normalize_batch(latex_list,
+                    workers: int = None,
+                    chunksize: int = None,
+                    scheduler: str = SCHEDULER_FIXED,
+                    transport: str = TRANSPORT_PICKLE,
+                    shared_memory_threshold: int = SHARED_MEMORY_THRESHOLD,
+                    **options) -> list:
+    """ Normalize latex expressions with a pool of processes
+
+    Args:
+        latex_list(iterable): latex expressions, no $ on both sides
+        workers(int): number of processes, `os.cpu_count()` if None,
+            normalized in this process if 1
+        chunksize(int): number of expressions sent to a process at once,
+            the batch is split into `CHUNKS_PER_WORKER` chunks for each
+            process if None, `SCHEDULER_FIXED` only
+        scheduler(str): `SCHEDULER_FIXED` or `SCHEDULER_COST`
+        transport(str): `TRANSPORT_PICKLE` or `TRANSPORT_PACKED`, packed
+            chunks cost much less to send for short formulas
+        shared_memory_threshold(int): packed chunks or results of at least
+            these bytes are passed by shared memory if supported, never if
+            None, `TRANSPORT_PACKED` only
+        options: refer to `normalize_latex_expression`
+
+    Returns:
+        list, normalized expression or `NormalizeError` for each item, in the
+        same order as `latex_list`
+    """
+    return _run_batch(
+        BATCH_KIND_LATEX, latex_list, workers, chunksize, scheduler, transport,
+        shared_memory_threshold, options
+    )
+
+
+def normalize_sentence_batch(sentence_list,
+                             workers: int = None,
+                             chunksize: int = None,
+                             scheduler: str = SCHEDULER_FIXED,
+                             transport: str = TRANSPORT_PICKLE,
+                             shared_memory_threshold: int = SHARED_MEMORY_THRESHOLD,
+                             **options) -> list:
+    """ Normalize latex in sentences with a pool of processes, refer to
+    `normalize_batch` and `normalize_latex_in_sentence`
+    """
+    return _run_batch(
+        BATCH_KIND_SENTENCE, sentence_list, workers, chunksize, scheduler, transport,
+        shared_memory_threshold, options
+    )
+
+
+def normalize_sentences(sentence_list, workers: int = 1, **options) -> tuple:
+    """ Normalize latex in sentences like `normalize_sentence_batch`, while
+    each distinct formula of the whole batch is normalized only once, which
+    saves much for batches repeating small formulas like `$x$`. Sentences are
+    split as `normalize_latex_in_sentence` does, and reassembled in order
+
+    Args:
+        sentence_list(iterable): sentences, latex should be braced with $
+        workers(int): number of processes for distinct formulas, refer to
+            `normalize_batch`, normalized in this process if 1
+        options: refer to `normalize_latex_expression`
+
+    Returns:
+        tuple, (normalized sentence or `NormalizeError` of its first failed
+            formula for each item, stats of `sentences`, `formulas`,
+            `unique_formulas` and `dedup_ratio`, the ratio of formulas not
+            normalized for duplicated)
+    """
+    scanned_list = [scan_sentence(sentence) for sentence in sentence_list]
+
+    # distinct formulas in order of their first occurrences
+    latex_index = {}
+    for part_list, _ in scanned_list:
+        for latex in part_list[1::2]:
+            latex_index.setdefault(latex, len(latex_index))
+    latex_result_list = normalize_batch(list(latex_index), workers=workers, **options)
+
+    result_list, num_formulas = [], 0
+    for part_list, delimiter_list in scanned_list:
+        num_formulas += len(delimiter_list)
+        for latex_idx, latex in enumerate(part_list[1::2]):
+            latex_result = latex_result_list[latex_index[latex]]
+            if isinstance(latex_result, NormalizeError):
+                result_list.append(latex_result)
+                break
+            part_list[2 * latex_idx + 1] = latex_result
+        else:
+            result_list.append(join_scanned_sentence(part_list, delimiter_list))
+
+    return result_list, {
+        "sentences": len(scanned_list),
+        "formulas": num_formulas,
+        "unique_formulas": len(latex_index),
+        "dedup_ratio": 1 - len(latex_index) / num_formulas if num_formulas else 0.0,
+    }
+
+
+def _run_batch(kind, item_list, workers, chunksize, scheduler, transport,
+               shared_memory_threshold, options):
+    if scheduler not in (SCHEDULER_FIXED, SCHEDULER_COST):
+        raise ValueError("Unknown scheduler: {}".format(scheduler))
+    if transport not in (TRANSPORT_PICKLE, TRANSPORT_PACKED):
+        raise ValueError("Unknown transport: {}".format(transport))
+
+    normalizer = Normalizer(**options)
+    item_list = list(item_list)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(item_list) <= 1:
+        return normalize_items(normalizer, kind, item_list)
+
+    submitter = _ChunkSubmitter(normalizer, kind, transport, shared_memory_threshold)
+    if scheduler == SCHEDULER_COST:
+        return _run_batch_by_cost(submitter, item_list, workers)
+
+    if chunksize is None:
+        chunksize = math.ceil(len(item_list) / (workers * CHUNKS_PER_WORKER))
+    chunk_list = [
+        item_list[start:start + chunksize]
+        for start in range(0, len(item_list), chunksize)
+    ]
+
+    result_list = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunk_list))) as executor:
+        if transport == TRANSPORT_PICKLE:
+            for chunk_result_list in executor.map(
+                    normalize_items,
+                    [normalizer] * len(chunk_list),
+                    [kind] * len(chunk_list),
+                    chunk_list):
+                result_list.extend(chunk_result_list)
+        else:
+            future_list = [submitter.submit(executor, chunk) for chunk in chunk_list]
+            for future in future_list:
+                result_list.extend(submitter.get_results(future)[0])
+
+    return result_list
+
+
+def _run_batch_by_cost(submitter, item_list, workers):
+    scheduler = CostAwareScheduler([estimate_cost(item) for item in item_list], workers)
+    result_list = [None] * len(item_list)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        future_to_chunk = {}
+
+        def submit_next_chunk():
+            chunk = scheduler.next_chunk()
+            future = submitter.submit(executor, [item_list[idx] for idx in chunk], timed=True)
+            future_to_chunk[future] = chunk
+
+        # keep one more chunk queued for each worker
+        while scheduler.has_next() and len(future_to_chunk) < 2 * workers:
+            submit_next_chunk()
+
+        while future_to_chunk:
+            done_futures, _ = wait(future_to_chunk, return_when=FIRST_COMPLETED)
+            for future in done_futures:
+                chunk = future_to_chunk.pop(future)
+                chunk_result_list, seconds = submitter.get_results(future)
+                scheduler.observe(chunk, seconds)
+                for idx, result in zip(chunk, chunk_result_list):
+                    result_list[idx] = result
+
+                if scheduler.has_next():
+                    submit_next_chunk()
+
+    return result_list
+
+
+class _ChunkSubmitter(object):
+    """ Submit chunks to executor by transport, shared memory of packed
+    chunks is unlinked once results are got
+    """
+    def __init__(self, normalizer, kind, transport, shared_memory_threshold):
+        self.normalizer = normalizer
+        self.kind = kind
+        self.transport = transport
+        self.shared_memory_threshold = shared_memory_threshold
+        self._future_to_memory = {}
+
+        if transport == TRANSPORT_PACKED and shared_memory_threshold is not None:
+            ensure_shared_memory_tracker()
+
+    def submit(self, executor, chunk, timed=False):
+        if self.transport == TRANSPORT_PICKLE:
+            func = normalize_timed_items if timed else normalize_items
+            return executor.submit(func, self.normalizer, self.kind, chunk)
+
+        buffer, memory = put_buffer(pack_texts(chunk), self.shared_memory_threshold)
+        try:
+            future = executor.submit(
+                normalize_packed_items, self.normalizer, self.kind, buffer,
+                self.shared_memory_threshold
+            )
+        except BaseException:
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+            raise
+        self._future_to_memory[future] = memory
+        return future
+
+    def get_results(self, future) -> tuple:
+        """ Get (results, seconds) of the chunk, seconds is None if not timed """
+        if self.transport == TRANSPORT_PICKLE:
+            outputs = future.result()
+            return outputs if isinstance(outputs, tuple) else (outputs, None)
+
+        memory = self._future_to_memory.pop(future)
+        try:
+            result_buffer, seconds = future.result()
+        finally:
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+        return unpack_results(take_buffer(result_buffer), NormalizeError), seconds
@@ -0,0 +1,13 @@
+from .result_cache import (
+    ResultCache, enable_result_cache, disable_result_cache, get_result_cache
+)
+from .persistent_cache import (
+    PersistentResultCache, enable_persistent_cache, disable_persistent_cache, 
+    get_persistent_cache
+)
+from .shared_cache import (
+    SharedResultCache, enable_shared_cache, disable_shared_cache, get_shared_cache
+)
+from .skeleton_cache import (
+    SkeletonCache, enable_skeleton_cache, disable_skeleton_cache, get_skeleton_cache
+)
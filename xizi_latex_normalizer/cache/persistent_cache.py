@@ -0,0 +1,316 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import weakref
+from multiprocessing import util as multiprocessing_util
+
+from ..__about__ import __version__
+from ..exceptions import exception_from_name
+from ..exceptions.base_exception import NormalizerException
+from ..mapping.mapping_data_loader import DIR_PATH as MAPPING_DIR_PATH
+from ..utils.common_utils import get_chinese_unit_matcher
+
+
+MAPPING_DATA_PATH = os.path.join(MAPPING_DIR_PATH, "mapping_data")
+# max number of host parameters in one sqlite statement is 999 for old versions
+SQLITE_MAX_VARIABLES = 999
+
+
+def get_cache_fingerprint() -> str:
+    """ Get the digest of normalizer version, all json files of mapping data
+    and the table of chinese units loaded, which may come from another file,
+    cached results are invalid once it changes
+    """
+    digest = hashlib.sha256(__version__.encode("utf-8"))
+    digest.update(get_chinese_unit_matcher().digest.encode("ascii"))
+    for file_name in sorted(os.listdir(MAPPING_DATA_PATH)):
+        if not file_name.endswith(".json"):
+            continue
+
+        digest.update(file_name.encode("utf-8"))
+        with open(os.path.join(MAPPING_DATA_PATH, file_name), "rb") as rfile:
+            digest.update(hashlib.sha256(rfile.read()).digest())
+
+    return digest.hexdigest()
+
+
+def encode_text(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+def decode_text(data: bytes) -> str:
+    return data.decode("utf-8", "surrogatepass")
+
+
+class PersistentResultCache(object):
+    """ Result cache persisted in a SQLite database, which can be shared by
+    processes. Database in WAL mode allows readers to go on while a process is
+    writing, and writes are buffered and committed in batches
+
+    Key of a result is the hash of (fingerprint, kind, options, input), where
+    the fingerprint comes from normalizer version and mapping data. Results of
+    other fingerprints are never hit but kept, so processes of different
+    versions can share a database, `clear` deletes all of them
+
+    Args:
+        path(str): path of the database file
+        batch_size(int): number of buffered writes to commit at once
+        cache_failures(bool): whether to cache `NormalizerException` raised
+            while computing, the same type of exception is raised when hit
+        timeout(float): seconds to wait for the lock of database
+    """
+    def __init__(self,
+                 path: str,
+                 batch_size: int = 1000,
+                 cache_failures: bool = False,
+                 timeout: float = 30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.cache_failures = cache_failures
+        self.timeout = timeout
+        self.fingerprint = get_cache_fingerprint()
+
+        self._lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+        self._finalizer_pid = None
+        self._pending = {}  # key -> (value, failure)
+        self._prefetched = {}
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+
+        self._get_connection()
+
+    def make_key(self, key: tuple) -> bytes:
+        """ Hash `(kind, options, input)` with the fingerprint """
+        kind, options, text = key
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.fingerprint.encode("ascii"))
+        digest.update(kind.encode("ascii"))
+        digest.update(bytes(bytearray(bool(option) for option in options)))
+        digest.update(encode_text(text))
+        return digest.digest()
+
+    def get_or_compute(self, key, compute_func, *args):
+        """ Get value of `key`, or compute it by `compute_func(*args)` and
+        cache it if not found
+
+        Args:
+            key(tuple): (kind, options, input)
+            compute_func(callable): function to compute the value
+        """
+        db_key = self.make_key(key)
+        entry = self._get_entry(db_key)
+        if entry is not None:
+            return self._unwrap(entry)
+
+        try:
+            value = compute_func(*args)
+        except NormalizerException as e:
+            if self.cache_failures:
+                self._put_entry(db_key, (str(e), type(e).__name__))
+            raise
+
+        self._put_entry(db_key, (value, None))
+        return value
+
+    def prefetch(self, keys):
+        """ Read cached results of `keys` in batches, so following
+        `get_or_compute` of these keys do not query database one by one.
+        Results prefetched before are dropped
+        """
+        db_keys = [self.make_key(key) for key in keys]
+        prefetched = {}
+        with self._lock:
+            connection = self._get_connection()
+            for batch_start in range(0, len(db_keys), SQLITE_MAX_VARIABLES):
+                batch = db_keys[batch_start:batch_start + SQLITE_MAX_VARIABLES]
+                rows = connection.execute(
+                    "SELECT key, value, failure FROM results WHERE key IN ({})".format(
+                        ",".join("?" * len(batch))
+                    ),
+                    batch
+                )
+                for db_key, value, failure in rows:
+                    prefetched[db_key] = (decode_text(value), failure)
+
+            self._prefetched = prefetched
+
+    def flush(self):
+        """ Commit buffered writes """
+        with self._lock:
+            if not self._pending or self._pid != os.getpid():
+                return
+
+            rows = [
+                (db_key, encode_text(value), failure)
+                for db_key, (value, failure) in self._pending.items()
+            ]
+            connection = self._get_connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO results (key, value, failure) VALUES (?, ?, ?)",
+                    rows
+                )
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+            self._writes += len(rows)
+            self._pending.clear()
+
+    def refresh_fingerprint(self):
+        """ Compute the fingerprint again, e.g. another table of chinese units
+        is loaded, results of the old fingerprint are not hit any more
+        """
+        with self._lock:
+            self.flush()
+            self._prefetched = {}
+            self.fingerprint = get_cache_fingerprint()
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._prefetched.clear()
+            self._get_connection().execute("DELETE FROM results")
+
+    def close(self):
+        with self._lock:
+            if self._connection is None:
+                return
+
+            self.flush()
+            self._connection.close()
+            self._connection = None
+
+    def get_stats(self) -> dict:
+        """ Get hits, misses, committed writes and buffered writes """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "writes": self._writes,
+                "pending": len(self._pending),
+            }
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # connection inherited from the parent process must not be used
+        if self._connection is None or self._pid != os.getpid():
+            self._pending = {}
+            self._prefetched = {}
+            self._pid = os.getpid()
+            self._connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            self._init_database(self._connection)
+            # workers of process pools exit by `os._exit` without atexit
+            # hooks, while finalizers are run when they finish. One for each
+            # process, which does not keep the cache alive
+            if self._finalizer_pid != self._pid:
+                multiprocessing_util.Finalize(
+                    self, _flush_cache_ref, args=(weakref.ref(self),), exitpriority=10
+                )
+                self._finalizer_pid = self._pid
+
+        return self._connection
+
+    def _init_database(self, connection):
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # results of any fingerprint are kept, as keys are hashed with it
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key BLOB PRIMARY KEY, value BLOB NOT NULL, failure TEXT) WITHOUT ROWID"
+        )
+
+    def _get_entry(self, db_key: bytes):
+        with self._lock:
+            connection = self._get_connection()
+            entry = self._pending.get(db_key) or self._prefetched.get(db_key)
+            if entry is None:
+                row = connection.execute(
+                    "SELECT value, failure FROM results WHERE key = ?", (db_key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (decode_text(row[0]), row[1])
+
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+            return entry
+
+    def _put_entry(self, db_key: bytes, entry: tuple):
+        with self._lock:
+            self._get_connection()
+            self._pending[db_key] = entry
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    @staticmethod
+    def _unwrap(entry):
+        value, failure = entry
+        if failure is None:
+            return value
+
+        raise exception_from_name(failure, value)
+
+
+def _flush_cache_ref(cache_ref):
+    cache = cache_ref()
+    if cache is not None:
+        cache.flush()
+
+
+_persistent_cache = None
+
+
+def enable_persistent_cache(path: str,
+                            batch_size: int = 1000,
+                            cache_failures: bool = False,
+                            timeout: float = 30.0) -> PersistentResultCache:
+    """ Cache results of all normalizations in this process into a SQLite
+    database, which is shared by processes enabling the same path. The enabled
+    one is closed and replaced, and buffered writes are committed at exit
+
+    Args:
+        refer to `PersistentResultCache`
+
+    Returns:
+        PersistentResultCache, the cache enabled
+    """
+    global _persistent_cache
+    disable_persistent_cache()
+    _persistent_cache = PersistentResultCache(
+        path, batch_size=batch_size, cache_failures=cache_failures, timeout=timeout
+    )
+    return _persistent_cache
+
+
+def disable_persistent_cache():
+    global _persistent_cache
+    if _persistent_cache is not None:
+        _persistent_cache.close()
+    _persistent_cache = None
+
+
+def get_persistent_cache() -> PersistentResultCache:
+    """ Get the enabled persistent cache, `None` if disabled """
+    return _persistent_cache
+
+
+@atexit.register
+def _flush_persistent_cache():
+    if _persistent_cache is not None:
+        _persistent_cache.flush()
@@ -0,0 +1,168 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from ..exceptions.base_exception import NormalizerException
+
+
+class CachedFailure(object):
+    """ `NormalizerException` recorded in cache, raised again when hit """
+    __slots__ = ("exception_type", "args")
+
+    def __init__(self, exception_type, args):
+        self.exception_type = exception_type
+        self.args = args
+
+    def raise_again(self):
+        raise self.exception_type(*self.args)
+
+
+class ResultCache(object):
+    """ Bounded LRU cache of normalization results, which is thread safe
+
+    Args:
+        max_entries(int): max number of entries, no limit if None
+        max_bytes(int): max estimated memory of entries in bytes, no limit 
+            if None
+        cache_failures(bool): whether to cache `NormalizerException` raised 
+            while computing, the same type of exception is raised when hit
+    """
+    # estimated bytes of the dict item and the key tuple of one entry
+    entry_overhead = 200
+
+    def __init__(self, 
+                 max_entries: int = 100000, 
+                 max_bytes: int = None, 
+                 cache_failures: bool = False):
+        if max_entries is None and max_bytes is None:
+            raise ValueError("At least one of max_entries and max_bytes is required")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_failures = cache_failures
+
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_or_compute(self, key, compute_func, *args):
+        """ Get value of `key`, or compute it by `compute_func(*args)` and 
+        cache it if not found
+
+        Args:
+            key(tuple): hashable key, the strings in it are counted in memory
+            compute_func(callable): function to compute the value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            value = entry[0]
+            if isinstance(value, CachedFailure):
+                value.raise_again()
+            return value
+
+        try:
+            value = compute_func(*args)
+        except NormalizerException as e:
+            if self.cache_failures:
+                self.put(key, CachedFailure(type(e), e.args))
+            raise
+
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        size = self._estimate_size(key, value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous_entry = self._entries.pop(key, None)
+            if previous_entry is not None:
+                self._bytes -= previous_entry[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """ Get hits, misses, evictions, number of entries and estimated bytes """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _estimate_size(self, key, value) -> int:
+        size = self.entry_overhead
+        for item in key:
+            if isinstance(item, str):
+                size += sys.getsizeof(item)
+
+        size += sys.getsizeof(value)
+        if isinstance(value, CachedFailure):
+            size += sum(sys.getsizeof(arg) for arg in value.args)
+
+        return size
+
+
+_result_cache = None
+
+
+def enable_result_cache(max_entries: int = 100000, 
+                        max_bytes: int = None, 
+                        cache_failures: bool = False) -> ResultCache:
+    """ Cache results of all normalizations in this process, including 
+    `normalize_latex_expression`, `normalize_latex_in_sentence` and `Normalizer`,
+    keyed by the input and options. A new empty cache replaces the enabled one
+
+    Args:
+        refer to `ResultCache`
+
+    Returns:
+        ResultCache, the cache enabled
+    """
+    global _result_cache
+    _result_cache = ResultCache(
+        max_entries=max_entries, max_bytes=max_bytes, cache_failures=cache_failures
+    )
+    return _result_cache
+
+
+def disable_result_cache():
+    global _result_cache
+    _result_cache = None
+
+
+def get_result_cache() -> ResultCache:
+    """ Get the enabled cache, `None` if disabled """
+    return _result_cache
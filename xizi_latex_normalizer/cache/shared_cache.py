@@ -0,0 +1,350 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import struct
+import threading
+
+from ..exceptions import exception_from_name
+from ..exceptions.base_exception import NormalizerException
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None
+
+
+MAGIC = b"XLNSHMC1"
+# magic, number of buckets, slots of a bucket, bytes of a value cell
+HEADER = struct.Struct("<8sIII")
+# version, key hash, bytes of value, flags
+SLOT = struct.Struct("<IQIB")
+VERSION = struct.Struct("<I")
+SLOT_FLAG_FAILURE = 1
+# key hash of empty slots, hashes of keys are never 0
+EMPTY_HASH = 0
+
+
+def hash_key(key: tuple) -> int:
+    """ 64-bit hash of `(kind, options, input)` """
+    kind, options, text = key
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(kind.encode("ascii"))
+    digest.update(bytes(bytearray(bool(option) for option in options)))
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return int.from_bytes(digest.digest(), "little") or 1
+
+
+class SharedResultCache(object):
+    """ Result cache in shared memory, shared by processes forked after it is
+    created, or by processes started with it as an argument. A popular
+    formula is normalized once for all workers
+
+    It is a fixed-size open-addressing hash table of slots keyed by 64-bit
+    hash of (kind, options, input). A key is probed in its bucket of
+    `bucket_size` slots only, and evicted by clock in the bucket when full:
+    slots hit are marked referenced, and the hand of the bucket skips and
+    unmarks referenced ones. Each slot owns a cell of `max_value_bytes` in
+    the value arena, longer values are not cached
+
+    Reads take no lock. A slot has a version, odd while being written, and a
+    read is valid only if the version is even and unchanged after reading.
+    Writes are serialized by a lock of the bucket, buckets share
+    `num_stripes` locks
+
+    Args:
+        max_entries(int): number of slots, rounded up to whole buckets
+        max_value_bytes(int): max bytes of a value in utf-8
+        bucket_size(int): number of slots of a bucket
+        num_stripes(int): number of write locks
+        cache_failures(bool): whether to cache `NormalizerException` raised
+            while computing, the same type of exception is raised when hit
+    """
+    def __init__(self,
+                 max_entries: int = 65536,
+                 max_value_bytes: int = 256,
+                 bucket_size: int = 8,
+                 num_stripes: int = 64,
+                 cache_failures: bool = False):
+        if shared_memory is None:
+            raise RuntimeError("Shared memory requires python 3.8 or later")
+        if max_entries < 1 or max_value_bytes < 1 or not 1 <= bucket_size <= 255:
+            raise ValueError("Invalid size of shared cache")
+
+        self.num_buckets = -(-max_entries // bucket_size)
+        self.bucket_size = bucket_size
+        self.max_value_bytes = max_value_bytes
+        self.cache_failures = cache_failures
+
+        num_slots = self.num_buckets * self.bucket_size
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=self._get_layout(num_slots)[-1]
+        )
+        HEADER.pack_into(
+            self._memory.buf, 0, MAGIC, self.num_buckets, self.bucket_size, self.max_value_bytes
+        )
+        # locks of spawn context can be passed to processes of any start method
+        context = multiprocessing.get_context("spawn")
+        self._locks = [context.Lock() for _ in range(num_stripes)]
+        self._owner_pid = os.getpid()
+        self._init_local()
+
+    @property
+    def name(self) -> str:
+        """ Name of the shared memory """
+        return self._memory.name
+
+    def get_or_compute(self, key, compute_func, *args):
+        """ Get value of `key`, or compute it by `compute_func(*args)` and
+        cache it if not found
+
+        Args:
+            key(tuple): (kind, options, input)
+            compute_func(callable): function to compute the value
+        """
+        key_hash = hash_key(key)
+        entry = self.get(key_hash)
+        if entry is not None:
+            self._count("_hits")
+            value, failure = entry
+            if failure:
+                exception_type, _, message = value.partition("\x00")
+                raise exception_from_name(exception_type, message)
+            return value
+
+        self._count("_misses")
+        try:
+            value = compute_func(*args)
+        except NormalizerException as e:
+            if self.cache_failures:
+                self.put(key_hash, "{}\x00{}".format(type(e).__name__, e), failure=True)
+            raise
+
+        self.put(key_hash, value)
+        return value
+
+    def get(self, key_hash: int):
+        """ Get (value, whether it is a failure) of `key_hash`, `None` if not
+        found or being written
+        """
+        buf = self._memory.buf
+        first_slot = (key_hash % self.num_buckets) * self.bucket_size
+        for slot in range(first_slot, first_slot + self.bucket_size):
+            slot_offset = self._slots_offset + slot * SLOT.size
+            version, slot_hash, size, flags = SLOT.unpack_from(buf, slot_offset)
+            if slot_hash != key_hash or version & 1:
+                continue
+
+            value_offset = self._values_offset + slot * self.max_value_bytes
+            data = bytes(buf[value_offset:value_offset + size])
+            if VERSION.unpack_from(buf, slot_offset)[0] != version:
+                return None
+
+            # a lost mark by racing writers only makes eviction less exact
+            buf[self._refs_offset + slot] = 1
+            return data.decode("utf-8", "surrogatepass"), bool(flags & SLOT_FLAG_FAILURE)
+
+        return None
+
+    def put(self, key_hash: int, value: str, failure: bool = False) -> bool:
+        """ Put value of `key_hash`, which replaces the old value of it or
+        an empty slot, or evicts a slot by clock
+
+        Returns:
+            bool, whether the value is cached, not if it is too long
+        """
+        data = value.encode("utf-8", "surrogatepass")
+        if len(data) > self.max_value_bytes:
+            self._count("_rejections")
+            return False
+
+        buf = self._memory.buf
+        bucket = key_hash % self.num_buckets
+        first_slot = bucket * self.bucket_size
+        with self._locks[bucket % len(self._locks)]:
+            target_slot, empty_slot = None, None
+            for slot in range(first_slot, first_slot + self.bucket_size):
+                slot_hash = SLOT.unpack_from(buf, self._slots_offset + slot * SLOT.size)[1]
+                if slot_hash == key_hash:
+                    target_slot = slot
+                    break
+                if slot_hash == EMPTY_HASH and empty_slot is None:
+                    empty_slot = slot
+
+            if target_slot is None:
+                target_slot = empty_slot
+            if target_slot is None:
+                target_slot = self._evict(bucket)
+                self._count("_evictions")
+
+            slot_offset = self._slots_offset + target_slot * SLOT.size
+            version = VERSION.unpack_from(buf, slot_offset)[0]
+            VERSION.pack_into(buf, slot_offset, (version + 1) & 0xFFFFFFFF)
+            value_offset = self._values_offset + target_slot * self.max_value_bytes
+            buf[value_offset:value_offset + len(data)] = data
+            buf[self._refs_offset + target_slot] = 0
+            SLOT.pack_into(
+                buf, slot_offset, (version + 1) & 0xFFFFFFFF, key_hash, len(data),
+                SLOT_FLAG_FAILURE if failure else 0
+            )
+            VERSION.pack_into(buf, slot_offset, (version + 2) & 0xFFFFFFFF)
+
+        return True
+
+    def clear(self):
+        buf = self._memory.buf
+        for bucket in range(self.num_buckets):
+            with self._locks[bucket % len(self._locks)]:
+                first_slot = bucket * self.bucket_size
+                for slot in range(first_slot, first_slot + self.bucket_size):
+                    slot_offset = self._slots_offset + slot * SLOT.size
+                    version = VERSION.unpack_from(buf, slot_offset)[0]
+                    SLOT.pack_into(buf, slot_offset, (version + 2) & 0xFFFFFFFF, EMPTY_HASH, 0, 0)
+
+    def get_stats(self) -> dict:
+        """ Get hits, misses, evictions and values too long to cache of this
+        process, and number of entries of all processes
+        """
+        buf = self._memory.buf
+        entries = sum(
+            SLOT.unpack_from(buf, self._slots_offset + slot * SLOT.size)[1] != EMPTY_HASH
+            for slot in range(self.num_buckets * self.bucket_size)
+        )
+        with self._stats_lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "evictions": self._evictions,
+                "rejections": self._rejections,
+                "entries": entries,
+                "capacity": self.num_buckets * self.bucket_size,
+            }
+
+    def close(self):
+        """ Detach from the shared memory, which is removed if this process
+        created it
+        """
+        if self._memory is None:
+            return
+
+        self._memory.close()
+        if os.getpid() == self._owner_pid:
+            self._memory.unlink()
+        self._memory = None
+
+    def __getstate__(self):
+        # locks can only be pickled while starting processes
+        return {
+            "name": self._memory.name,
+            "max_value_bytes": self.max_value_bytes,
+            "cache_failures": self.cache_failures,
+            "locks": self._locks,
+            "owner_pid": self._owner_pid,
+        }
+
+    def __setstate__(self, state):
+        self._memory = shared_memory.SharedMemory(name=state["name"])
+        magic, self.num_buckets, self.bucket_size, self.max_value_bytes = HEADER.unpack_from(
+            self._memory.buf, 0
+        )
+        if magic != MAGIC:
+            raise ValueError("Invalid shared cache: {}".format(state["name"]))
+        self.cache_failures = state["cache_failures"]
+        self._locks = state["locks"]
+        self._owner_pid = state["owner_pid"]
+        self._init_local()
+
+    def _init_local(self):
+        (
+            self._slots_offset, self._refs_offset, self._hands_offset,
+            self._values_offset, _
+        ) = self._get_layout(self.num_buckets * self.bucket_size)
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._rejections = 0
+
+    def _get_layout(self, num_slots: int) -> tuple:
+        """ Offsets of slots, reference marks, clock hands, value arena, and
+        the total size
+        """
+        slots_offset = HEADER.size
+        refs_offset = slots_offset + num_slots * SLOT.size
+        hands_offset = refs_offset + num_slots
+        values_offset = hands_offset + self.num_buckets
+        return (
+            slots_offset, refs_offset, hands_offset, values_offset,
+            values_offset + num_slots * self.max_value_bytes
+        )
+
+    def _evict(self, bucket: int) -> int:
+        """ Get the slot to evict in a full bucket by clock, with its lock """
+        buf = self._memory.buf
+        hand = buf[self._hands_offset + bucket]
+        first_slot = bucket * self.bucket_size
+        while buf[self._refs_offset + first_slot + hand]:
+            buf[self._refs_offset + first_slot + hand] = 0
+            hand = (hand + 1) % self.bucket_size
+
+        buf[self._hands_offset + bucket] = (hand + 1) % self.bucket_size
+        return first_slot + hand
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+_shared_cache = None
+
+
+def enable_shared_cache(max_entries: int = 65536,
+                        max_value_bytes: int = 256,
+                        bucket_size: int = 8,
+                        num_stripes: int = 64,
+                        cache_failures: bool = False) -> SharedResultCache:
+    """ Cache results of all normalizations in shared memory, which is shared
+    by worker processes forked later, refer to `SharedResultCache`. The
+    enabled one is closed and replaced, and the cache is removed at exit of
+    this process
+
+    Returns:
+        SharedResultCache, the cache enabled
+    """
+    disable_shared_cache()
+    return use_shared_cache(SharedResultCache(
+        max_entries=max_entries,
+        max_value_bytes=max_value_bytes,
+        bucket_size=bucket_size,
+        num_stripes=num_stripes,
+        cache_failures=cache_failures,
+    ))
+
+
+def use_shared_cache(shared_cache: SharedResultCache) -> SharedResultCache:
+    """ Enable an existing shared cache, e.g. one passed to a worker process
+    started by spawn
+    """
+    global _shared_cache
+    _shared_cache = shared_cache
+    return _shared_cache
+
+
+def disable_shared_cache():
+    global _shared_cache
+    if _shared_cache is not None:
+        _shared_cache.close()
+    _shared_cache = None
+
+
+def get_shared_cache() -> SharedResultCache:
+    """ Get the enabled shared cache, `None` if disabled """
+    return _shared_cache
+
+
+@atexit.register
+def _close_shared_cache():
+    if _shared_cache is not None:
+        _shared_cache.close()
@@ -0,0 +1,274 @@
+import re
+import string
+import sys
+import threading
+
+from .result_cache import ResultCache
+from ..stream import LatexTokenStream
+from ..stream.token_stream import (
+    LEXER_REGEX, TOKEN_KIND_COMMAND, TOKEN_KIND_NUMBER, TOKEN_KIND_ALPHA_NUM
+)
+
+
+# Literals are only abstracted right after these symbols. Components read
+# characters of a token (e.g. `\frac12` is digit-split by `OtherOneSignComponent`)
+# or test it by regex only where an argument is expected, i.e. after a command,
+# `^` or `_`, so the symbol must not follow them, or it may be an argument
+# itself and the literal the next one, e.g. `\frac+12`. Contents of `{` are
+# always read as a group.
+SAFE_PRECEDING_SYMBOLS = frozenset("+-=,<>*/;:!?&(")
+GROUP_OPENING_SYMBOL = "{"
+ARGUMENT_LEADING_TOKENS = frozenset(["^", "_"])
+# formulas without any match have no literal, and are not tokenized
+LITERAL_CANDIDATE_RE = re.compile(r"(?:^|[{+\-=,<>*/;:!?&(])\s*[0-9a-zA-Z]")
+
+PLACEHOLDER_POOLS = (string.digits, string.ascii_lowercase, string.ascii_uppercase)
+
+
+class SkeletonTemplate(object):
+    """ Normalized skeleton split by placeholders, filled with literals
+
+    Attributes:
+        parts(list): output of the skeleton split by placeholders
+        slots(list): index of literal for each gap between `parts`
+    """
+    __slots__ = ("parts", "slots")
+
+    def __init__(self, parts, slots):
+        self.parts = parts
+        self.slots = slots
+
+    @classmethod
+    def build(cls, output: str, placeholders: list):
+        """ Build template from output of skeleton, `None` if any placeholder
+        does not occur exactly once in output
+        """
+        positions = []
+        for literal_idx, placeholder in enumerate(placeholders):
+            if output.count(placeholder) != 1:
+                return None
+            positions.append((output.index(placeholder), literal_idx))
+        positions.sort()
+
+        parts, slots, last_end = [], [], 0
+        for position, literal_idx in positions:
+            parts.append(output[last_end:position])
+            slots.append(literal_idx)
+            last_end = position + 1
+        parts.append(output[last_end:])
+
+        return cls(parts, slots)
+
+    def __sizeof__(self):
+        return (
+            object.__sizeof__(self) 
+            + sum(sys.getsizeof(part) for part in self.parts) 
+            + sys.getsizeof(self.slots)
+        )
+
+    def fill(self, literals: list) -> str:
+        result = [self.parts[0]]
+        for literal_idx, part in zip(self.slots, self.parts[1:]):
+            result.append(literals[literal_idx])
+            result.append(part)
+
+        return "".join(result)
+
+
+class SkeletonCache(object):
+    """ Cache of normalized skeletons. Numeric and single letter literals of a
+    formula are replaced by placeholders, the skeleton is normalized once and
+    literals are filled back to its output, e.g. `\\frac{3}{4}` and
+    `\\frac{5}{7}` share the skeleton `\\frac{0}{1}`
+
+    A literal is a token of ascii digits or a single ascii letter, which is
+    kept by the token mapper, and follows `{` or a symbol in
+    `SAFE_PRECEDING_SYMBOLS` not following a command, `^` or `_`. Its
+    placeholder is a char of the same class, which occurs nowhere else in
+    the formula or its mapped tokens, and the skeleton is dropped if any 
+    placeholder does not occur exactly once in its output. Formulas without 
+    literals are normalized directly
+
+    Args:
+        max_entries(int): max number of skeletons
+    """
+    def __init__(self, max_entries: int = 10000):
+        self._templates = ResultCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._rejections = 0
+        self._bypasses = 0
+
+    def normalize(self, normalizer, latex: str) -> str:
+        """ Normalize `latex` by `normalizer` through skeleton """
+        abstracted = self.abstract(latex, normalizer._token_mapper)
+        if abstracted is None:
+            self._count("_bypasses")
+            return normalizer._normalize(latex)
+
+        skeleton, placeholders, literals = abstracted
+        built = []
+        template = self._templates.get_or_compute(
+            (normalizer.options, skeleton),
+            self._build_template, normalizer, skeleton, placeholders, built
+        )
+        self._count("_misses" if built else "_hits")
+
+        if template is None:
+            self._count("_rejections")
+            return normalizer._normalize(latex)
+
+        return template.fill(literals)
+
+    @staticmethod
+    def abstract(latex: str, token_mapper: dict = None):
+        """ Replace literals of `latex` by placeholders
+
+        Returns:
+            tuple, (skeleton, placeholders, literals), `None` if no literal
+            found or placeholders are not enough
+        """
+        if LITERAL_CANDIDATE_RE.search(latex) is None:
+            return None
+
+        token_mapper = token_mapper or {}
+        table = LatexTokenStream(
+            latex, pretokenize=True, lexer=LEXER_REGEX, token_mapper=token_mapper
+        ).get_token_table()
+
+        literal_indexes = []
+        for idx, text in enumerate(table.texts):
+            if (
+                is_literal(text, table.kinds[idx])
+                and text not in token_mapper
+                and latex[table.starts[idx]:table.ends[idx]] == text
+                and is_safe_context(table.texts, table.kinds, idx)
+            ):
+                literal_indexes.append(idx)
+
+        if not literal_indexes:
+            return None
+
+        pieces, last_end = [], 0
+        for idx in literal_indexes:
+            pieces.append(latex[last_end:table.starts[idx]])
+            last_end = table.ends[idx]
+        pieces.append(latex[last_end:])
+
+        # chars of content mapped by the token mapper may occur in output too
+        used_chars = set("".join(pieces))
+        literal_index_set = set(literal_indexes)
+        used_chars.update("".join(
+            text for idx, text in enumerate(table.texts) if idx not in literal_index_set
+        ))
+        pools = [
+            [char for char in pool if char not in used_chars and char not in token_mapper]
+            for pool in PLACEHOLDER_POOLS
+        ]
+
+        placeholders, literals = [], []
+        for idx in literal_indexes:
+            literal = table.texts[idx]
+            pool = next(pool for pool, chars in zip(pools, PLACEHOLDER_POOLS)
+                        if literal[0] in chars)
+            if not pool:
+                return None
+            placeholders.append(pool.pop(0))
+            literals.append(literal)
+
+        skeleton = [pieces[0]]
+        for placeholder, piece in zip(placeholders, pieces[1:]):
+            skeleton.append(placeholder)
+            skeleton.append(piece)
+
+        return "".join(skeleton), placeholders, literals
+
+    def clear(self):
+        self._templates.clear()
+
+    def get_stats(self) -> dict:
+        """ Get hits and misses of skeletons, rejected skeletons, formulas
+        normalized directly without literals, and number of skeletons
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "rejections": self._rejections,
+                "bypasses": self._bypasses,
+                "entries": len(self._templates),
+            }
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _build_template(normalizer, skeleton, placeholders, built):
+        built.append(True)
+        try:
+            output = normalizer._normalize(skeleton)
+        except Exception:
+            # normalized directly for the real exception
+            return None
+
+        return SkeletonTemplate.build(output, placeholders)
+
+
+def is_literal(text: str, kind: int) -> bool:
+    if kind == TOKEN_KIND_NUMBER:
+        return all(char in string.digits for char in text)
+
+    return (
+        kind == TOKEN_KIND_ALPHA_NUM
+        and len(text) == 1
+        and text in string.ascii_letters
+    )
+
+
+def is_safe_context(texts: list, kinds, idx: int) -> bool:
+    """ Whether the token at `idx` can not be read as an argument """
+    if idx == 0:
+        return True
+
+    previous_text = texts[idx - 1]
+    if previous_text == GROUP_OPENING_SYMBOL:
+        return True
+    if previous_text not in SAFE_PRECEDING_SYMBOLS:
+        return False
+    if idx == 1:
+        return True
+
+    return (
+        kinds[idx - 2] != TOKEN_KIND_COMMAND
+        and texts[idx - 2] not in ARGUMENT_LEADING_TOKENS
+    )
+
+
+_skeleton_cache = None
+
+
+def enable_skeleton_cache(max_entries: int = 10000) -> SkeletonCache:
+    """ Normalize formulas of all normalizations in this process through
+    cached skeletons, refer to `SkeletonCache`. A new empty cache replaces
+    the enabled one
+
+    Returns:
+        SkeletonCache, the cache enabled
+    """
+    global _skeleton_cache
+    _skeleton_cache = SkeletonCache(max_entries=max_entries)
+    return _skeleton_cache
+
+
+def disable_skeleton_cache():
+    global _skeleton_cache
+    _skeleton_cache = None
+
+
+def get_skeleton_cache() -> SkeletonCache:
+    """ Get the enabled skeleton cache, `None` if disabled """
+    return _skeleton_cache
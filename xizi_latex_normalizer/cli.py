@@ -0,0 +1,181 @@
+""" Command line normalizer of corpora
+
+Usage:
+    xizi-latex-normalize questions.jsonl.gz --field content --mode sentence -o out.jsonl.gz
+    xizi-latex-normalize questions.jsonl.gz --field content -o out.jsonl.gz --checkpoint out.ckpt
+    cat formulas.txt | xizi-latex-normalize --normalize-token > normalized.txt
+    xizi-latex-normalize --serve-stdio --framing lines --normalize-token
+"""
+import argparse
+import sys
+
+from .__about__ import __version__
+from .batch import BATCH_KIND_LATEX, BATCH_KIND_SENTENCE
+from .corpus import (
+    normalize_files, get_record_format, RecordCodec, RECORD_FORMATS, ON_ERROR_KEEP,
+    ON_ERROR_SKIP, STDIO_PATH
+)
+
+
+MODE_TO_KIND = {
+    "expression": BATCH_KIND_LATEX,
+    "sentence": BATCH_KIND_SENTENCE,
+}
+
+# options of normalization, (name, default), refer to `normalize_latex_expression`
+NORMALIZE_OPTION_FLAGS = (
+    ("normalize_token", False),
+    ("ignore_similar_despite_capital", False),
+    ("keep_left_right_marker", True),
+    ("strip_angle_for_tri", False),
+    ("ensure_valid_formula", True),
+    ("keep_successive_outmost_brace", False),
+    ("brace_single_elem_for_log", True),
+    ("keep_rm_sign", True),
+)
+
+
+def add_normalize_option_arguments(parser: argparse.ArgumentParser):
+    """ Add a flag for each option of normalization, options enabled by
+    default are disabled by `--no-<option>`
+    """
+    group = parser.add_argument_group("normalization options")
+    for name, default in NORMALIZE_OPTION_FLAGS:
+        flag = name.replace("_", "-")
+        if default:
+            group.add_argument(
+                "--no-" + flag, dest=name, action="store_false",
+                help="disable `{}`".format(name)
+            )
+        else:
+            group.add_argument(
+                "--" + flag, dest=name, action="store_true",
+                help="enable `{}`".format(name)
+            )
+
+
+def get_normalize_options(args: argparse.Namespace) -> dict:
+    return {name: getattr(args, name) for name, _ in NORMALIZE_OPTION_FLAGS}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="xizi-latex-normalize",
+        description="Normalize latex of records streamed from files or stdin",
+    )
+    parser.add_argument(
+        "inputs", nargs="*", default=[STDIO_PATH],
+        help="input files, gzip/bz2/xz compressed or not, stdin by default"
+    )
+    parser.add_argument(
+        "-o", "--output", default=STDIO_PATH,
+        help="output file, compressed by extension .gz/.bz2/.xz, stdout by default"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=RECORD_FORMATS, default=None,
+        help="format of records, inferred by extension of the first input by default"
+    )
+    parser.add_argument(
+        "--field", default=None, help="key of jsonl or column of csv/tsv to normalize"
+    )
+    parser.add_argument(
+        "--output-field", default=None,
+        help="key or column to write results, the same as --field by default"
+    )
+    parser.add_argument(
+        "-m", "--mode", choices=sorted(MODE_TO_KIND), default="expression",
+        help="normalize the text as a latex expression, or latex braced by $ in a sentence"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None,
+        help="number of worker processes, number of cpus by default"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000,
+        help="number of records sent to a worker at once"
+    )
+    parser.add_argument(
+        "--max-in-flight", type=int, default=None,
+        help="max number of pending batches, twice of workers by default"
+    )
+    parser.add_argument(
+        "--on-error", choices=(ON_ERROR_KEEP, ON_ERROR_SKIP), default=ON_ERROR_KEEP,
+        help="keep failed records as they are, or skip them"
+    )
+    parser.add_argument(
+        "--checkpoint", default=None,
+        help="checkpoint file to resume from and save to, inputs and output must be files"
+    )
+    parser.add_argument(
+        "--checkpoint-interval", type=float, default=60.0,
+        help="seconds between checkpoints"
+    )
+    parser.add_argument(
+        "--serve-stdio", action="store_true",
+        help="keep running as a co-process answering json requests from stdin, "
+             "refer to `stdio_server`"
+    )
+    parser.add_argument(
+        "--framing", choices=("lines", "length"), default="lines",
+        help="framing of requests and responses of --serve-stdio, newline "
+             "delimited or 4-byte big-endian length prefixed"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not print stats to stderr"
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    add_normalize_option_arguments(parser)
+
+    return parser
+
+
+def check_corpus_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """ Report invalid combinations of arguments as usage errors, before
+    processing, so errors while processing are not mistaken for them
+    """
+    record_format = args.format or get_record_format(args.inputs[0])
+    try:
+        RecordCodec(record_format, field=args.field, output_field=args.output_field)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.checkpoint is not None and (STDIO_PATH in args.inputs or args.output == STDIO_PATH):
+        parser.error("--checkpoint is not supported with stdin or stdout")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+
+
+def main(argv: list = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.serve_stdio:
+        # imported here as it depends on this module
+        from .stdio_server import serve_stdio
+        return serve_stdio(framing=args.framing, **get_normalize_options(args))
+
+    check_corpus_arguments(parser, args)
+    stats = normalize_files(
+        args.inputs,
+        output_path=args.output,
+        record_format=args.format,
+        field=args.field,
+        output_field=args.output_field,
+        kind=MODE_TO_KIND[args.mode],
+        workers=args.workers,
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        on_error=args.on_error,
+        checkpoint_path=args.checkpoint,
+        checkpoint_interval=args.checkpoint_interval,
+        **get_normalize_options(args)
+    )
+
+    if not args.quiet:
+        print(stats, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from .base_component import (
-    BaseComponent, COMPONENT_MAPPER, OtherComponent
+    BaseComponent, COMPONENT_MAPPER, COMPONENT_DISPATCH_INDEX, OtherComponent
 )
 from .single_component import (
     PrimeComponent, OtherOneSignComponent, OneSignComponent
@@ -1,23 +1,77 @@
 import logging
 
+from .component_context import get_component_context
 from ..exceptions.syntax_exception import LatexSyntaxError
 
 logger = logging.getLogger("base_component")
 
 COMPONENT_MAPPER = {}  # mapper for typestr and Module
 
+
+class ComponentDispatchIndex(object):
+    """ Index of components in `COMPONENT_MAPPER` to find the component 
+    matching the stream
+
+    Components matched by `main_str` are looked up with the next token, and
+    the ones with their own `test_token_matched` are tested in order. As the 
+    first matched one in `COMPONENT_MAPPER` wins, the tests stop once the 
+    looked up component comes first.
+    """
+    def __init__(self):
+        self._main_str_mapper = {}  # main_str -> (order, component)
+        self._tested_list = []      # [(order, component)]
+
+    def rebuild(self, component_mapper: dict):
+        main_str_mapper, tested_list = {}, []
+        for order, (main_str, comp) in enumerate(component_mapper.items()):
+            if comp.match_by_main_str:
+                main_str_mapper[main_str] = (order, comp)
+            else:
+                tested_list.append((order, comp))
+
+        self._main_str_mapper = main_str_mapper
+        self._tested_list = tested_list
+
+    def get_matched_component(self, stream, default):
+        """ Get the component matching `stream`, `default` is never tested and
+        returned if no component matched
+        """
+        order, comp = self._main_str_mapper.get(stream.peek(), (None, None))
+        if comp is default:
+            order, comp = None, None
+
+        for tested_order, tested_comp in self._tested_list:
+            if order is not None and tested_order > order:
+                break
+            if tested_comp is not default and tested_comp.test_token_matched(stream):
+                return tested_comp
+
+        return comp or default
+
+
+COMPONENT_DISPATCH_INDEX = ComponentDispatchIndex()
+
+
 class ComponentLogMetaclass(type):
     def __new__(cls, name, bases, attrs):
         global COMPONENT_MAPPER
 
         class_ = super().__new__(cls, name, bases, attrs)
 
+        # components with own `test_token_matched` can not be dispatched by
+        # `main_str`, the root component defines the default one
+        if 'test_token_matched' in attrs:
+            class_.match_by_main_str = not any(
+                isinstance(base, ComponentLogMetaclass) for base in bases
+            )
+
         main_str = attrs.get('main_str', None)
         if main_str is not None:
             if main_str in COMPONENT_MAPPER:
                 logger.warning('Duplicate mian_str for two modules: {}, {}'.format(
                                    COMPONENT_MAPPER[main_str], name))
             COMPONENT_MAPPER[main_str] = class_
+            COMPONENT_DISPATCH_INDEX.rebuild(COMPONENT_MAPPER)
 
         return class_
 
@@ -60,7 +114,14 @@ class BaseComponent(object, metaclass=ComponentLogMetaclass):
 
     @classmethod
     def get_status(cls, key):
-        """ Get status of component, return `None` if no such status exists """
+        """ Get status of component, from the `ComponentContext` in use first,
+        then the status set by `set_status`, return `None` if no such status
+        exists
+        """
+        context = get_component_context()
+        if context is not None and key in context._fields:
+            return getattr(context, key)
+
         return cls._status_dict.get(key, None)
 
     def __len__(self):
@@ -0,0 +1,38 @@
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+class ComponentContext(namedtuple("ComponentContext", 
+                                  ["strip_angle", "brace_single_elem", "keep_rm"])):
+    """ Status of components for one normalization, which is immutable and 
+    held per thread, so that normalizations with different options do not
+    disturb each other
+
+    Attributes:
+        strip_angle(bool): whether trigonometric functions strip \\angle
+        brace_single_elem(bool): whether logarithms add brace for single element
+        keep_rm(bool): whether keep \\rm while rendering
+    """
+    __slots__ = ()
+
+
+_local = threading.local()
+
+
+def get_component_context():
+    """ Get the context in use of current thread, `None` if no context used """
+    return getattr(_local, "context", None)
+
+
+@contextmanager
+def use_component_context(context: ComponentContext):
+    """ Use `context` for components inside the with block, the previous 
+    context is restored after exiting, so it is reentrant
+    """
+    previous_context = get_component_context()
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous_context
@@ -1,7 +1,7 @@
 import pprint
 
 from . import (
-    COMPONENT_MAPPER, OtherComponent
+    COMPONENT_MAPPER, COMPONENT_DISPATCH_INDEX, OtherComponent
 )
 from ..exceptions.base_exception import InvalidMainstrException
 
@@ -16,13 +16,7 @@ class ComponentFactory(object):
 
     @classmethod
     def get_matched_component(cls, stream):
-        for Comp in COMPONENT_MAPPER.values():
-            if Comp == OtherComponent:
-                continue
-            if Comp.test_token_matched(stream):
-                return Comp
-
-        return OtherComponent
+        return COMPONENT_DISPATCH_INDEX.get_matched_component(stream, OtherComponent)
 
     @classmethod
     def set_component_group_status(cls, main_str_list: list, status, value):
@@ -0,0 +1,639 @@
+import bz2
+import contextlib
+import csv
+import gzip
+import io
+import itertools
+import json
+import lzma
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import normalize_items, NormalizeError, BATCH_KIND_LATEX, BATCH_KIND_SENTENCE
+from .normalize import Normalizer
+
+
+# Formats of records, `RECORD_FORMAT_LINES` takes each line as the text
+RECORD_FORMAT_LINES = "lines"
+RECORD_FORMAT_JSONL = "jsonl"
+RECORD_FORMAT_CSV = "csv"
+RECORD_FORMAT_TSV = "tsv"
+RECORD_FORMATS = (RECORD_FORMAT_LINES, RECORD_FORMAT_JSONL, RECORD_FORMAT_CSV, RECORD_FORMAT_TSV)
+RECORD_FORMAT_EXTENSIONS = {
+    ".jsonl": RECORD_FORMAT_JSONL,
+    ".json": RECORD_FORMAT_JSONL,
+    ".csv": RECORD_FORMAT_CSV,
+    ".tsv": RECORD_FORMAT_TSV,
+}
+
+
+def open_gzip_file(fileobj, mode: str):
+    return gzip.GzipFile(fileobj=fileobj, mode=mode, compresslevel=6)
+
+
+# compressed inputs are detected by magic bytes, outputs by extension
+COMPRESSION_MAGICS = (
+    (b"\x1f\x8b", open_gzip_file),
+    (b"BZh", bz2.BZ2File),
+    (b"\xfd7zXZ\x00", lzma.LZMAFile),
+)
+COMPRESSION_EXTENSIONS = {
+    ".gz": open_gzip_file,
+    ".bz2": bz2.BZ2File,
+    ".xz": lzma.LZMAFile,
+}
+
+# What to do with records failed to normalize
+ON_ERROR_KEEP = "keep"
+ON_ERROR_SKIP = "skip"
+
+STDIO_PATH = "-"
+IO_BUFFER_SIZE = 1 << 20
+
+
+def get_record_format(path: str) -> str:
+    """ Infer format of records by extension of `path` ignoring compression,
+    `RECORD_FORMAT_LINES` if unknown
+    """
+    root, extension = os.path.splitext(path.lower())
+    if extension in COMPRESSION_EXTENSIONS:
+        extension = os.path.splitext(root)[1]
+
+    return RECORD_FORMAT_EXTENSIONS.get(extension, RECORD_FORMAT_LINES)
+
+
+@contextlib.contextmanager
+def open_input(path: str, offset: int = 0):
+    """ Open text file of `path` or stdin if `-`, decompressed if needed
+
+    Args:
+        path(str): path of the file
+        offset(int): bytes of decompressed content to skip, files only
+    """
+    raw_file = sys.stdin.buffer if path == STDIO_PATH else open(path, "rb")
+    buffered_file = io.BufferedReader(raw_file, IO_BUFFER_SIZE)
+    binary_file = buffered_file
+    head = buffered_file.peek(6)
+    for magic, open_compressed_file in COMPRESSION_MAGICS:
+        if head.startswith(magic):
+            binary_file = io.BufferedReader(
+                open_compressed_file(buffered_file, "rb"), IO_BUFFER_SIZE
+            )
+            break
+
+    if offset and binary_file is buffered_file:
+        binary_file.seek(offset)
+    elif offset:
+        # compressed content can not be seeked
+        while offset > 0:
+            skipped = len(binary_file.read(min(offset, IO_BUFFER_SIZE)))
+            if not skipped:
+                break
+            offset -= skipped
+
+    text_file = io.TextIOWrapper(binary_file, encoding="utf-8", newline="")
+    try:
+        yield text_file
+    finally:
+        # wrappers are detached, or stdin is closed with them
+        text_file.detach()
+        buffered_file.detach()
+        if path != STDIO_PATH:
+            raw_file.close()
+
+
+class OutputStream(io.RawIOBase):
+    """ Writable stream to a binary file, through a compressor if any. The
+    compressed stream can be finished by `sync`, then the file can be
+    truncated there and appended by a new stream later, as concatenated
+    streams of gzip, bz2 or xz are decompressed as a whole
+
+    Args:
+        raw_file(file): binary file to write
+        open_compressed_file(callable): open compressed file by
+            `(fileobj, mode)`, not compressed if None
+    """
+    def __init__(self, raw_file, open_compressed_file=None):
+        super(OutputStream, self).__init__()
+        self.raw_file = raw_file
+        self._open_compressed_file = open_compressed_file
+        self._target = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._target is None:
+            self._target = (
+                self.raw_file if self._open_compressed_file is None
+                else self._open_compressed_file(self.raw_file, "wb")
+            )
+        self._target.write(data)
+        return len(data)
+
+    def sync(self) -> int:
+        """ Finish the compressed stream and flush the file to disk
+
+        Returns:
+            int, bytes written to the file
+        """
+        self._finish()
+        self.raw_file.flush()
+        os.fsync(self.raw_file.fileno())
+        return self.raw_file.tell()
+
+    def close(self):
+        if not self.closed:
+            self._finish()
+            self.raw_file.flush()
+        super(OutputStream, self).close()
+
+    def _finish(self):
+        if self._target is not None and self._target is not self.raw_file:
+            self._target.close()
+        self._target = None
+
+
+@contextlib.contextmanager
+def open_output(path: str, offset: int = None):
+    """ Open buffered text file of `path` or stdout if `-`, compressed by
+    extension of `path`
+
+    Args:
+        path(str): path of the file
+        offset(int): bytes of the file to keep, where writing starts,
+            overwritten if None, files only
+    """
+    if path == STDIO_PATH:
+        sys.stdout.flush()
+        raw_file = sys.stdout.buffer
+    elif offset is None:
+        raw_file = open(path, "wb")
+    else:
+        raw_file = open(path, "r+b")
+        raw_file.truncate(offset)
+        raw_file.seek(offset)
+
+    output_stream = OutputStream(
+        raw_file, COMPRESSION_EXTENSIONS.get(os.path.splitext(path.lower())[1])
+    )
+    text_file = io.TextIOWrapper(
+        io.BufferedWriter(output_stream, IO_BUFFER_SIZE), encoding="utf-8", newline=""
+    )
+    try:
+        yield text_file
+    finally:
+        text_file.close()
+        if path != STDIO_PATH:
+            raw_file.close()
+
+
+def sync_output(wfile) -> int:
+    """ Flush text file opened by `open_output` to disk, refer to
+    `OutputStream.sync`
+    """
+    wfile.flush()
+    return wfile.buffer.raw.sync()
+
+
+class RecordCodec(object):
+    """ Read and write records of a format, and access the text to normalize
+
+    Args:
+        record_format(str): one of `RECORD_FORMATS`
+        field(str): key of jsonl or column of csv/tsv to normalize, with
+            header in the first row, not used by `RECORD_FORMAT_LINES`
+        output_field(str): key or column to write results, `field` if None
+    """
+    def __init__(self, record_format: str, field: str = None, output_field: str = None):
+        if record_format not in RECORD_FORMATS:
+            raise ValueError("Unknown record format: {}".format(record_format))
+        if record_format != RECORD_FORMAT_LINES and not field:
+            raise ValueError("Field is required by {}".format(record_format))
+
+        self.record_format = record_format
+        self.field = field
+        self.output_field = output_field or field
+        self._input_fieldnames = None
+        self._fieldnames = None
+        self._writer = None
+        self._header_written = False
+
+    def read(self, rfile, has_header: bool = True):
+        """ Iterate records of lines of a text file
+
+        Args:
+            rfile(iterable): lines of text
+            has_header(bool): whether csv/tsv starts with a header, or the
+                header read last time is used, e.g. resumed in the middle
+        """
+        if self.record_format == RECORD_FORMAT_LINES:
+            for line in rfile:
+                yield line.rstrip("\r\n")
+        elif self.record_format == RECORD_FORMAT_JSONL:
+            for line in rfile:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            reader = csv.DictReader(
+                rfile,
+                fieldnames=None if has_header else self._input_fieldnames,
+                dialect=self._get_dialect()
+            )
+            if reader.fieldnames is not None:
+                self._input_fieldnames = list(reader.fieldnames)
+            if self._fieldnames is None and self._input_fieldnames is not None:
+                self._fieldnames = self._input_fieldnames + (
+                    [] if self.output_field in self._input_fieldnames else [self.output_field]
+                )
+            for row in reader:
+                yield row
+
+    def get_state(self) -> dict:
+        """ Get headers of csv/tsv, which is needed to resume """
+        return {
+            "input_fieldnames": self._input_fieldnames,
+            "fieldnames": self._fieldnames,
+            "header_written": self._header_written,
+        }
+
+    def set_state(self, state: dict):
+        self._input_fieldnames = state["input_fieldnames"]
+        self._fieldnames = state["fieldnames"]
+        self._header_written = state["header_written"]
+        self._writer = None
+
+    def get_text(self, record):
+        """ Get text to normalize of `record`, `None` if missing """
+        if self.record_format == RECORD_FORMAT_LINES:
+            return record
+
+        text = record.get(self.field) if isinstance(record, dict) else None
+        return text if isinstance(text, str) else None
+
+    def set_text(self, record, text: str):
+        """ Get `record` with its result set to `text` """
+        if self.record_format == RECORD_FORMAT_LINES:
+            return text
+
+        record[self.output_field] = text
+        return record
+
+    def write(self, wfile, record):
+        if self.record_format == RECORD_FORMAT_LINES:
+            wfile.write(record)
+            wfile.write("\n")
+        elif self.record_format == RECORD_FORMAT_JSONL:
+            wfile.write(json.dumps(record, ensure_ascii=False))
+            wfile.write("\n")
+        else:
+            if self._writer is None:
+                self._writer = csv.DictWriter(
+                    wfile, self._fieldnames or [self.output_field],
+                    dialect=self._get_dialect(), extrasaction="ignore"
+                )
+            if not self._header_written:
+                self._writer.writeheader()
+                self._header_written = True
+            self._writer.writerow(record)
+
+    def _get_dialect(self):
+        return csv.excel_tab if self.record_format == RECORD_FORMAT_TSV else csv.excel
+
+
+class CorpusStats(object):
+    """ Counters of normalizing a corpus
+
+    Attributes:
+        records(int): number of records read
+        errors(int): records failed to normalize, or without text
+        fallbacks(int): formulas falling back to joined tokens, refer to
+            `Normalizer.fallbacks`
+        seconds(float): seconds elapsed
+    """
+    def __init__(self):
+        self.records = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "records": self.records,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "seconds": self.seconds,
+            "records_per_second": self.records / self.seconds if self.seconds else 0.0,
+        }
+
+    @classmethod
+    def from_dict(cls, stats_dict: dict):
+        stats = cls()
+        for name in ("records", "errors", "fallbacks", "seconds"):
+            setattr(stats, name, stats_dict[name])
+        return stats
+
+    def __str__(self):
+        return (
+            "records: {records}, errors: {errors}, fallbacks: {fallbacks}, "
+            "seconds: {seconds:.3f}, records/s: {records_per_second:.1f}"
+        ).format(**self.as_dict())
+
+
+class CorpusCheckpoint(object):
+    """ Checkpoint of normalizing files, saved as a json sidecar file. It
+    keeps the position of input after the last record written, i.e. index
+    of the input file and bytes of decompressed content read, together with
+    bytes of output written, stats and headers of csv/tsv. The configuration
+    of the run is kept too, and a checkpoint of another run is refused
+
+    Args:
+        path(str): path of the checkpoint file
+        config(dict): configuration of the run, json serializable
+    """
+    version = 1
+
+    def __init__(self, path: str, config: dict):
+        self.path = path
+        self.config = json.loads(json.dumps(config))
+
+    def load(self) -> dict:
+        """ Load state of the checkpoint, `None` if not saved yet
+
+        Raises:
+            ValueError: the checkpoint is saved by another run
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as rfile:
+                checkpoint = json.load(rfile)
+        except FileNotFoundError:
+            return None
+
+        if checkpoint.get("version") != self.version or checkpoint.get("config") != self.config:
+            raise ValueError(
+                "Checkpoint {} is saved by another run, remove it to start over".format(self.path)
+            )
+        return checkpoint["state"]
+
+    def save(self, state: dict):
+        """ Save state atomically, replacing the old one """
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as wfile:
+            json.dump(
+                {"version": self.version, "config": self.config, "state": state},
+                wfile, ensure_ascii=False
+            )
+            wfile.flush()
+            os.fsync(wfile.fileno())
+        os.replace(temp_path, self.path)
+
+
+def normalize_chunk(normalizer: Normalizer, kind: str, item_list: list) -> tuple:
+    """ Normalize items like `batch.normalize_items`, with number of fallbacks """
+    fallbacks = normalizer.fallbacks
+    result_list = normalize_items(normalizer, kind, item_list)
+    return result_list, normalizer.fallbacks - fallbacks
+
+
+def normalize_records(records,
+                      codec: RecordCodec,
+                      kind: str = BATCH_KIND_LATEX,
+                      workers: int = 1,
+                      batch_size: int = 1000,
+                      max_in_flight: int = None,
+                      on_error: str = ON_ERROR_KEEP,
+                      stats: CorpusStats = None,
+                      **options):
+    """ Lazily normalize text of each record in order. Records are sent to
+    worker processes in batches, and at most `max_in_flight` batches are
+    pending at once, so memory is bounded however long `records` is
+
+    Args:
+        records(iterable): records of `codec`
+        codec(RecordCodec): codec of records
+        kind(str): `BATCH_KIND_LATEX` or `BATCH_KIND_SENTENCE`
+        workers(int): number of processes, normalized in this process if 1,
+            `os.cpu_count()` if None
+        batch_size(int): number of records sent to a process at once
+        max_in_flight(int): max number of pending batches, twice of `workers`
+            if None
+        on_error(str): `ON_ERROR_KEEP` to keep text of failed records as it
+            is, `ON_ERROR_SKIP` to drop them
+        stats(CorpusStats): counters updated while normalizing
+        options: refer to `normalize_latex_expression`
+
+    Returns:
+        generator, normalized records
+    """
+    for record_list, _ in _normalize_batches(
+            records, codec, kind, workers, batch_size, max_in_flight, on_error,
+            stats, options):
+        for record in record_list:
+            yield record
+
+
+def normalize_files(input_paths,
+                    output_path: str = STDIO_PATH,
+                    record_format: str = None,
+                    field: str = None,
+                    output_field: str = None,
+                    kind: str = BATCH_KIND_LATEX,
+                    workers: int = 1,
+                    batch_size: int = 1000,
+                    max_in_flight: int = None,
+                    on_error: str = ON_ERROR_KEEP,
+                    checkpoint_path: str = None,
+                    checkpoint_interval: float = 60.0,
+                    **options) -> CorpusStats:
+    """ Normalize records of files into one output file in order
+
+    With `checkpoint_path`, a checkpoint is saved every `checkpoint_interval`
+    seconds once a batch is written, refer to `CorpusCheckpoint`. A run
+    with the checkpoint resumes from it, the output is truncated to the
+    checkpoint and records are read from the position after the last one
+    written, so no record is duplicated or missing. Output is written in
+    order whichever worker finishes first, so every record before the
+    position is written and none after it. A finished run is not repeated
+
+    Args:
+        input_paths(list): paths of input files, `-` for stdin, compressed by
+            gzip, bz2 or xz if needed
+        output_path(str): path of output file, `-` for stdout, compressed by
+            its extension `.gz`, `.bz2` or `.xz`
+        record_format(str): one of `RECORD_FORMATS`, inferred by extension of
+            the first input if None
+        field(str): refer to `RecordCodec`
+        output_field(str): refer to `RecordCodec`
+        kind, workers, batch_size, max_in_flight, on_error: refer to
+            `normalize_records`
+        checkpoint_path(str): path of the checkpoint file, not saved if None,
+            stdin and stdout are not supported
+        checkpoint_interval(float): seconds between checkpoints
+        options: refer to `normalize_latex_expression`
+
+    Returns:
+        CorpusStats, counters of the corpus, including resumed runs
+    """
+    input_paths = list(input_paths) or [STDIO_PATH]
+    record_format = record_format or get_record_format(input_paths[0])
+    codec = RecordCodec(record_format, field=field, output_field=output_field)
+    stats = CorpusStats()
+
+    checkpoint, state = None, None
+    if checkpoint_path is not None:
+        if STDIO_PATH in input_paths or output_path == STDIO_PATH:
+            raise ValueError("Checkpoint is not supported with stdin or stdout")
+        checkpoint = CorpusCheckpoint(checkpoint_path, {
+            "input_paths": [os.path.abspath(path) for path in input_paths],
+            "output_path": os.path.abspath(output_path),
+            "record_format": record_format,
+            "field": codec.field,
+            "output_field": codec.output_field,
+            "kind": kind,
+            "on_error": on_error,
+            "options": Normalizer(**options).options._asdict(),
+        })
+        state = checkpoint.load()
+
+    # index of input file and bytes read, after the last record taken
+    position = [0, 0]
+    output_offset = None
+    if state is not None:
+        stats = CorpusStats.from_dict(state["stats"])
+        if state["finished"]:
+            return stats
+        position = [state["input_index"], state["input_offset"]]
+        output_offset = state["output_offset"]
+        codec.set_state(state["codec"])
+
+    def iter_records():
+        for input_index in range(position[0], len(input_paths)):
+            offset = position[1] if input_index == position[0] else 0
+            position[:] = [input_index, offset]
+            with open_input(input_paths[input_index], offset) as rfile:
+                for record in codec.read(_count_bytes(rfile, position), has_header=offset == 0):
+                    yield record
+            position[:] = [input_index + 1, 0]
+
+    def get_position():
+        # header of csv/tsv being read goes with the position, as records
+        # are read ahead of writing
+        return position[0], position[1], codec.get_state()["input_fieldnames"]
+
+    def save_checkpoint(wfile, batch_position, finished=False):
+        codec_state = codec.get_state()
+        codec_state["input_fieldnames"] = batch_position[2]
+        checkpoint.save({
+            "input_index": batch_position[0],
+            "input_offset": batch_position[1],
+            "output_offset": sync_output(wfile),
+            "stats": stats.as_dict(),
+            "codec": codec_state,
+            "finished": finished,
+        })
+
+    with open_output(output_path, output_offset) as wfile:
+        last_checkpoint_time = time.perf_counter()
+        for record_list, batch_position in _normalize_batches(
+                iter_records(), codec, kind, workers, batch_size, max_in_flight,
+                on_error, stats, options, get_position=get_position):
+            for record in record_list:
+                codec.write(wfile, record)
+
+            if (
+                checkpoint is not None
+                and time.perf_counter() - last_checkpoint_time >= checkpoint_interval
+            ):
+                save_checkpoint(wfile, batch_position)
+                last_checkpoint_time = time.perf_counter()
+
+        if checkpoint is not None:
+            save_checkpoint(wfile, get_position(), finished=True)
+
+    return stats
+
+
+def _normalize_batches(records, codec, kind, workers, batch_size, max_in_flight,
+                       on_error, stats, options, get_position=None):
+    """ Normalize records in batches, yield records of each batch and
+    position of input got by `get_position` after the batch is taken
+    """
+    if kind not in (BATCH_KIND_LATEX, BATCH_KIND_SENTENCE):
+        raise ValueError("Unknown kind: {}".format(kind))
+    if on_error not in (ON_ERROR_KEEP, ON_ERROR_SKIP):
+        raise ValueError("Unknown action on error: {}".format(on_error))
+
+    normalizer = Normalizer(**options)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    stats = stats if stats is not None else CorpusStats()
+    start = time.perf_counter() - stats.seconds
+
+    def merge(record_list, outputs, position):
+        record_list = list(_merge_outputs(codec, record_list, outputs, on_error, stats))
+        stats.seconds = time.perf_counter() - start
+        return record_list, position
+
+    batch_iterator = _iter_batches(records, codec, batch_size, get_position)
+    if workers <= 1:
+        for record_list, text_list, position in batch_iterator:
+            yield merge(record_list, normalize_chunk(normalizer, kind, text_list), position)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for record_list, text_list, position in batch_iterator:
+            pending.append((
+                record_list,
+                executor.submit(normalize_chunk, normalizer, kind, text_list),
+                position
+            ))
+            if len(pending) >= max_in_flight:
+                record_list, future, position = pending.popleft()
+                yield merge(record_list, future.result(), position)
+
+        while pending:
+            record_list, future, position = pending.popleft()
+            yield merge(record_list, future.result(), position)
+
+
+def _iter_batches(records, codec, batch_size, get_position=None):
+    record_iterator = iter(records)
+    while True:
+        record_list = list(itertools.islice(record_iterator, batch_size))
+        if not record_list:
+            return
+
+        text_list = [codec.get_text(record) for record in record_list]
+        yield (
+            record_list,
+            [text for text in text_list if text is not None],
+            get_position() if get_position is not None else None
+        )
+
+
+def _count_bytes(lines, position):
+    """ Iterate lines, and count their bytes in utf-8 into `position` """
+    for line in lines:
+        position[1] += len(line.encode("utf-8"))
+        yield line
+
+
+def _merge_outputs(codec, record_list, outputs, on_error, stats):
+    result_list, fallbacks = outputs
+    stats.fallbacks += fallbacks
+
+    result_iterator = iter(result_list)
+    for record in record_list:
+        stats.records += 1
+        result = next(result_iterator) if codec.get_text(record) is not None else None
+        if result is None or isinstance(result, NormalizeError):
+            stats.errors += 1
+            if on_error == ON_ERROR_KEEP:
+                yield record
+            continue
+
+        yield codec.set_text(record, result)
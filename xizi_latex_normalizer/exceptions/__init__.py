@@ -0,0 +1,34 @@
+import builtins
+
+from .base_exception import NormalizerException
+from .syntax_exception import LatexSyntaxError
+
+
+def _get_normalizer_exception_types() -> dict:
+    """ All subclasses of `NormalizerException` and itself, by name """
+    exception_types, stack = {}, [NormalizerException]
+    while stack:
+        exception_type = stack.pop()
+        exception_types[exception_type.__name__] = exception_type
+        stack.extend(exception_type.__subclasses__())
+
+    return exception_types
+
+
+def exception_from_name(name: str, message: str) -> Exception:
+    """ Build the exception of type named `name`, e.g. recorded in caches or
+    sent from other processes. Subclasses of `NormalizerException` and
+    builtin exceptions are resolved, otherwise `NormalizerException` is built
+    """
+    exception_type = _get_normalizer_exception_types().get(name)
+    if exception_type is None:
+        builtin_type = getattr(builtins, name, None)
+        if isinstance(builtin_type, type) and issubclass(builtin_type, Exception):
+            try:
+                return builtin_type(message)
+            except TypeError:
+                # e.g. UnicodeDecodeError requires more arguments
+                pass
+        exception_type = NormalizerException
+
+    return exception_type(message)
@@ -0,0 +1,187 @@
+""" Packing of texts sent between processes. A chunk of texts is packed into
+one buffer, so it is pickled as a single bytes object instead of lots of
+tiny strings, and large buffers can be passed by shared memory
+"""
+import itertools
+import struct
+from array import array
+from collections import namedtuple
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # python < 3.8
+    shared_memory = None
+    resource_tracker = None
+
+
+TEXT_ENCODING = "utf-8"
+TEXT_ERRORS = "surrogatepass"
+# Layouts of packed texts, `LAYOUT_SEPARATED` joins texts by `SEPARATOR` and
+# splits them back at C speed, only if no text contains it, otherwise
+# `LAYOUT_LENGTH_PREFIXED` keeps length of each text
+LAYOUT_LENGTH_PREFIXED = 0
+LAYOUT_SEPARATED = 1
+SEPARATOR = "\x00"
+# layout, number of texts and bytes of joined texts
+TEXTS_HEADER = struct.Struct("<BIQ")
+# typecode of array of uint32 lengths
+LENGTH_TYPECODE = next(typecode for typecode in "IL" if array(typecode).itemsize == 4)
+
+RESULT_OK = 0
+RESULT_ERROR = 1
+
+# buffers of at least these bytes are passed by shared memory if supported
+SHARED_MEMORY_THRESHOLD = 1 << 20
+
+
+class SharedMemoryRef(namedtuple("SharedMemoryRef", ["name", "size"])):
+    """ Reference to a buffer in shared memory """
+    __slots__ = ()
+
+
+def pack_texts(text_list) -> bytes:
+    """ Pack texts into a buffer: `TEXTS_HEADER`, length of each text in
+    chars as uint32 if `LAYOUT_LENGTH_PREFIXED`, and the joined texts in
+    utf-8, which are encoded once
+    """
+    text = SEPARATOR.join(text_list)
+    if text.count(SEPARATOR) == max(len(text_list) - 1, 0):
+        data = text.encode(TEXT_ENCODING, TEXT_ERRORS)
+        return TEXTS_HEADER.pack(LAYOUT_SEPARATED, len(text_list), len(data)) + data
+
+    lengths = array(LENGTH_TYPECODE, [len(text) for text in text_list])
+    data = "".join(text_list).encode(TEXT_ENCODING, TEXT_ERRORS)
+    return b"".join((
+        TEXTS_HEADER.pack(LAYOUT_LENGTH_PREFIXED, len(lengths), len(data)),
+        lengths.tobytes(),
+        data
+    ))
+
+
+def unpack_texts(buffer, offset: int = 0) -> tuple:
+    """ Unpack texts packed by `pack_texts` at `offset` of `buffer`, the
+    joined texts are decoded once and split
+
+    Returns:
+        tuple, (list of texts, offset after the packed texts)
+    """
+    layout, num_texts, num_bytes = TEXTS_HEADER.unpack_from(buffer, offset)
+    offset += TEXTS_HEADER.size
+
+    if layout == LAYOUT_SEPARATED:
+        data = str(buffer[offset:offset + num_bytes], TEXT_ENCODING, TEXT_ERRORS)
+        return (data.split(SEPARATOR) if num_texts else []), offset + num_bytes
+
+    lengths = array(LENGTH_TYPECODE)
+    lengths.frombytes(buffer[offset:offset + lengths.itemsize * num_texts])
+    offset += lengths.itemsize * num_texts
+
+    data = str(buffer[offset:offset + num_bytes], TEXT_ENCODING, TEXT_ERRORS)
+    ends = list(itertools.accumulate(lengths))
+    text_list = [data[start:end] for start, end in zip([0] + ends, ends)]
+
+    return text_list, offset + num_bytes
+
+
+def pack_results(result_list) -> bytes:
+    """ Pack results, each of which is a normalized text or a pair of
+    (exception type, message), e.g. `NormalizeError`, into a buffer: a flag
+    byte for each result, and the texts packed by `pack_texts`
+    """
+    flags = bytearray(len(result_list))
+    text_list = []
+    for idx, result in enumerate(result_list):
+        if isinstance(result, str):
+            text_list.append(result)
+        else:
+            flags[idx] = RESULT_ERROR
+            text_list.extend(result)
+
+    return b"".join((struct.pack("<I", len(flags)), bytes(flags), pack_texts(text_list)))
+
+
+def unpack_results(buffer, error_class=None) -> list:
+    """ Unpack results packed by `pack_results`, errors are built by
+    `error_class(exception_type, message)`, or kept as pairs if None
+    """
+    num_results = struct.unpack_from("<I", buffer)[0]
+    flags = bytes(buffer[4:4 + num_results])
+    text_list, _ = unpack_texts(buffer, 4 + num_results)
+
+    result_list, text_idx = [], 0
+    for flag in flags:
+        if flag == RESULT_OK:
+            result_list.append(text_list[text_idx])
+            text_idx += 1
+        else:
+            error = (text_list[text_idx], text_list[text_idx + 1])
+            result_list.append(error if error_class is None else error_class(*error))
+            text_idx += 2
+
+    return result_list
+
+
+def ensure_shared_memory_tracker():
+    """ Start the resource tracker in this process before starting workers,
+    so they share it. Shared memory is tracked by names only once whichever
+    process opens it, and unlinked by the tracker if its owner exits
+    without unlinking
+    """
+    if shared_memory is not None:
+        resource_tracker.ensure_running()
+
+
+def put_buffer(data: bytes, threshold: int = SHARED_MEMORY_THRESHOLD):
+    """ Put `data` into shared memory if it has `threshold` bytes at least
+    and shared memory is supported
+
+    Returns:
+        tuple, (`data` or its `SharedMemoryRef`, shared memory or None), the
+        shared memory is to be unlinked by the caller once it is read
+    """
+    if shared_memory is None or threshold is None or len(data) < threshold:
+        return data, None
+
+    memory = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    memory.buf[:len(data)] = data
+    return SharedMemoryRef(memory.name, len(data)), memory
+
+
+def put_buffer_for_reader(data: bytes, threshold: int = SHARED_MEMORY_THRESHOLD):
+    """ Put `data` like `put_buffer`, but the shared memory is left to the
+    reader, which gets it by `take_buffer`
+    """
+    buffer, memory = put_buffer(data, threshold)
+    if memory is not None:
+        memory.close()
+    return buffer
+
+
+def read_buffer(buffer) -> bytes:
+    """ Read bytes of `buffer` put by `put_buffer`, the shared memory is
+    left to its creator
+    """
+    if not isinstance(buffer, SharedMemoryRef):
+        return buffer
+
+    memory = shared_memory.SharedMemory(name=buffer.name)
+    try:
+        return bytes(memory.buf[:buffer.size])
+    finally:
+        memory.close()
+
+
+def take_buffer(buffer) -> bytes:
+    """ Read bytes of `buffer` put by `put_buffer_for_reader`, and unlink
+    the shared memory
+    """
+    if not isinstance(buffer, SharedMemoryRef):
+        return buffer
+
+    memory = shared_memory.SharedMemory(name=buffer.name)
+    try:
+        return bytes(memory.buf[:buffer.size])
+    finally:
+        memory.close()
+        memory.unlink()
+
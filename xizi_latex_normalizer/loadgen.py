@@ -0,0 +1,154 @@
+""" Load generator of the HTTP normalization service, for benchmarking on
+localhost. Each client thread keeps a connection alive and sends requests one
+after another
+
+Usage:
+    python -m xizi_latex_normalizer.loadgen --url http://127.0.0.1:8000 -c 16 -n 10000
+    python -m xizi_latex_normalizer.loadgen formulas.txt -c 16 -n 1000 --batch-size 64
+"""
+import argparse
+import http.client
+import itertools
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .pool import WARM_UP_LATEX_LIST
+
+
+class LoadStats(object):
+    """ Results of a load test """
+    def __init__(self, latencies: list, items: int, errors: int, seconds: float):
+        self.latencies = sorted(latencies)
+        self.requests = len(latencies)
+        self.items = items
+        self.errors = errors
+        self.seconds = seconds
+
+    def get_percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        return self.latencies[min(int(len(self.latencies) * percent / 100), len(self.latencies) - 1)]
+
+    def __str__(self):
+        seconds = self.seconds or float("inf")
+        return (
+            "requests: {}, items: {}, errors: {}, seconds: {:.3f}, "
+            "requests/s: {:.1f}, items/s: {:.1f}, latency ms p50: {:.2f}, "
+            "p90: {:.2f}, p99: {:.2f}, max: {:.2f}"
+        ).format(
+            self.requests, self.items, self.errors, self.seconds,
+            self.requests / seconds, self.items / seconds,
+            self.get_percentile(50) * 1e3, self.get_percentile(90) * 1e3,
+            self.get_percentile(99) * 1e3, self.get_percentile(100) * 1e3,
+        )
+
+
+def run_load(url: str,
+             text_list: list,
+             num_requests: int = 1000,
+             concurrency: int = 8,
+             batch_size: int = 1,
+             mode: str = "expression") -> LoadStats:
+    """ Send `num_requests` requests by `concurrency` clients, texts are
+    taken from `text_list` in turn
+
+    Args:
+        url(str): url of the server, e.g. `http://127.0.0.1:8000`
+        text_list(list): texts to normalize
+        num_requests(int): number of requests
+        concurrency(int): number of clients, each of which keeps a connection
+        batch_size(int): texts of a request, `/normalize` is requested if 1,
+            otherwise `/normalize/batch`
+        mode(str): `expression` or `sentence`
+    """
+    split_url = urlsplit(url)
+    text_iterator = itertools.cycle(text_list)
+    request_counter = itertools.count()
+    lock = threading.Lock()
+    latencies, counters = [], {"items": 0, "errors": 0}
+
+    def next_body():
+        with lock:
+            if next(request_counter) >= num_requests:
+                return None
+            text_batch = list(itertools.islice(text_iterator, batch_size))
+        if batch_size == 1:
+            return {"text": text_batch[0], "mode": mode}
+        return {"texts": text_batch, "mode": mode}
+
+    def run_client():
+        connection = http.client.HTTPConnection(split_url.hostname, split_url.port or 80)
+        path = "/normalize" if batch_size == 1 else "/normalize/batch"
+        client_latencies, items, errors = [], 0, 0
+        try:
+            while True:
+                body = next_body()
+                if body is None:
+                    break
+                start = time.perf_counter()
+                connection.request(
+                    "POST", path, json.dumps(body).encode("utf-8"),
+                    {"Content-Type": "application/json"}
+                )
+                response = connection.getresponse()
+                response_body = json.loads(response.read().decode("utf-8"))
+                client_latencies.append(time.perf_counter() - start)
+
+                result_list = response_body.get("results", [response_body])
+                items += len(result_list)
+                errors += sum("error" in result for result in result_list)
+        finally:
+            connection.close()
+            with lock:
+                latencies.extend(client_latencies)
+                counters["items"] += items
+                counters["errors"] += errors
+
+    start = time.perf_counter()
+    thread_list = [threading.Thread(target=run_client) for _ in range(concurrency)]
+    for thread in thread_list:
+        thread.start()
+    for thread in thread_list:
+        thread.join()
+
+    return LoadStats(latencies, counters["items"], counters["errors"], time.perf_counter() - start)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Load generator of the HTTP normalization service"
+    )
+    parser.add_argument(
+        "input", nargs="?", default=None,
+        help="file of one text per line, some formulas by default"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="url of the server")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="number of requests")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="number of clients")
+    parser.add_argument(
+        "--batch-size", type=int, default=1, help="texts of a request, batch endpoint if > 1"
+    )
+    parser.add_argument(
+        "-m", "--mode", choices=("expression", "sentence"), default="expression",
+        help="normalize texts as latex expressions or sentences"
+    )
+    args = parser.parse_args(argv)
+
+    if args.input is None:
+        text_list = WARM_UP_LATEX_LIST
+    else:
+        with open(args.input, encoding="utf-8") as rfile:
+            text_list = [line.rstrip("\r\n") for line in rfile]
+
+    print(run_load(
+        args.url, text_list, num_requests=args.requests, concurrency=args.concurrency,
+        batch_size=args.batch_size, mode=args.mode
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
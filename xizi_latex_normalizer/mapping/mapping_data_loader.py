@@ -12,9 +12,8 @@ class DataReaderSingleton(object):
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
-            cls._instance = (
-                super(DataReaderSingleton, cls).__new__(cls, *args, *kwargs)
-            )
+            # arguments are for `__init__`, which `object.__new__` refuses
+            cls._instance = super(DataReaderSingleton, cls).__new__(cls)
         return cls._instance
 
     def __init__(self):
@@ -43,6 +42,9 @@ class TokenMappingDataReader(DataReaderSingleton):
         )
         self._data = self.read(self.data_path)
 
+    def get_all_tokens(self):
+        return list(self._data.keys())
+
     def get_normalized_token(self, token: str):
         if self._data is None:
             raise ValueError("No valid data provided for token mapping")
@@ -79,6 +81,9 @@ class TokenIgnoringCaptalMappingDataReader(DataReaderSingleton):
         )
         self._data = self.read(self.data_path)
 
+    def get_all_tokens(self):
+        return list(self._data.keys())
+
     def get_lower_case_token(self, token: str):
         if self._data is None:
             raise ValueError("No valid data provided for token mapping")
@@ -135,3 +140,40 @@ class GlobalCharMappingDataReader(DataReaderSingleton):
 
 
 
+
+
+class ChineseUnitMappingDataReader(DataReaderSingleton):
+    """ Class for reading data of chinese units following latex, e.g. `米` in
+    `$64$米`, translated into latex
+
+    Attributes:
+        _data(dict): `units` mapping each unit to latex, and `units_without_rm`
+            listing units not wrapped by `\\rm`, e.g. `度`
+        data_path(str): file path where `_data` from
+    """
+    def __init__(self, data_path=None):
+        if hasattr(self, "_init"):
+            return
+
+        super().__init__()
+
+        self.data_path = (
+            data_path or os.path.join(DIR_PATH, 
+                                      "mapping_data", 
+                                      "chinese_unit_mapping.json")
+        )
+        self._data = self.read(self.data_path)
+
+    def get_unit_mapping(self) -> dict:
+        return dict(self._data["units"])
+
+    def get_units_without_rm(self) -> set:
+        return set(self._data.get("units_without_rm", []))
+
+    def read(self, data_path):
+        """ Read json file as unit mapping """
+        if not check_json_file(data_path):
+            raise ValueError("The file for unit mapping data must be json")
+
+        with open(data_path, "r", encoding="utf-8") as rfile:
+            return json.load(rfile)
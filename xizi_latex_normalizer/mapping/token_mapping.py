@@ -1,3 +1,4 @@
+import functools
 import os
 import re
 
@@ -17,6 +18,42 @@ def lower_token(token: str):
     return TokenIgnoringCaptalMappingDataReader().get_lower_case_token(token)
 
 
+@functools.lru_cache(maxsize=None)
+def get_token_mapper(to_normalize_token: bool, to_lower_token: bool) -> dict:
+    """ Get the composite mapping of `normalize_token` and then `lower_token`,
+    only tokens changed are recorded
+    """
+    token_set = set()
+    if to_normalize_token:
+        token_set.update(TokenMappingDataReader().get_all_tokens())
+    if to_lower_token:
+        token_set.update(TokenIgnoringCaptalMappingDataReader().get_all_tokens())
+
+    token_mapper = {}
+    for token in token_set:
+        mapped_token = token
+        if to_normalize_token:
+            mapped_token = normalize_token(mapped_token)
+        if to_lower_token:
+            mapped_token = lower_token(mapped_token)
+
+        if mapped_token != token:
+            token_mapper[token] = mapped_token
+
+    return token_mapper
+
+
+@functools.lru_cache(maxsize=None)
+def get_invalid_tokens(keep_left_right_marker: bool) -> frozenset:
+    """ Get tokens to be skipped by token stream, except `\\angle` which is 
+    switched while streaming
+    """
+    if keep_left_right_marker:
+        return frozenset()
+    else:
+        return frozenset(["\\left", "\\right"])
+
+
 def normalize_sentence_char(sent: str):
     reader = GlobalCharMappingDataReader()
     for char in reader.get_all_chars():
@@ -0,0 +1,217 @@
+import itertools
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import BATCH_KIND_LATEX, BATCH_KIND_SENTENCE, CHUNKS_PER_WORKER, NormalizeError
+from .corpus import CorpusStats, normalize_chunk, ON_ERROR_KEEP, ON_ERROR_SKIP, STDIO_PATH
+from .normalize import Normalizer
+
+
+# lines normalized at once by a worker
+SHARD_BATCH_SIZE = 1000
+# undecodable bytes are kept as they are
+TEXT_ENCODING = "utf-8"
+TEXT_ERRORS = "surrogateescape"
+
+
+def open_mmap(path: str):
+    """ Map file of `path` read-only, `None` if empty """
+    with open(path, "rb") as rfile:
+        if os.fstat(rfile.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(rfile.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def find_shard_boundaries(data, num_shards: int) -> list:
+    """ Split `data` into about `num_shards` byte ranges of the same size,
+    each of which ends after a newline or at the end
+
+    Args:
+        data(mmap|bytes): content of the file
+        num_shards(int): number of shards expected
+
+    Returns:
+        list, (start, end) of non-empty shards
+    """
+    size = len(data)
+    boundaries = [0]
+    for shard_idx in range(1, num_shards):
+        newline_idx = data.find(b"\n", max(size * shard_idx // num_shards, boundaries[-1]))
+        if newline_idx == -1:
+            break
+        if newline_idx + 1 > boundaries[-1]:
+            boundaries.append(newline_idx + 1)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def iter_lines(data, start: int, end: int):
+    """ Iterate decoded lines in byte range [start, end) of `data`, without
+    line endings
+    """
+    position = start
+    while position < end:
+        newline_idx = data.find(b"\n", position, end)
+        line_end = end if newline_idx == -1 else newline_idx
+        line = data[position:line_end]
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        yield line.decode(TEXT_ENCODING, TEXT_ERRORS)
+        position = line_end + 1
+
+
+def normalize_shard(input_path: str,
+                    start: int,
+                    end: int,
+                    output_path: str,
+                    normalizer: Normalizer,
+                    kind: str = BATCH_KIND_LATEX,
+                    on_error: str = ON_ERROR_KEEP) -> dict:
+    """ Normalize lines in byte range [start, end) of the input file into
+    the output file, line by line
+
+    Returns:
+        dict, number of records, errors and fallbacks
+    """
+    stats = {"records": 0, "errors": 0, "fallbacks": 0}
+    data = open_mmap(input_path)
+    try:
+        with open(output_path, "wb") as wfile:
+            line_iterator = iter_lines(data, start, end) if data is not None else iter([])
+            while True:
+                line_list = list(itertools.islice(line_iterator, SHARD_BATCH_SIZE))
+                if not line_list:
+                    break
+
+                result_list, fallbacks = normalize_chunk(normalizer, kind, line_list)
+                stats["records"] += len(line_list)
+                stats["fallbacks"] += fallbacks
+
+                output_list = []
+                for line, result in zip(line_list, result_list):
+                    if isinstance(result, NormalizeError):
+                        stats["errors"] += 1
+                        if on_error == ON_ERROR_SKIP:
+                            continue
+                        result = line
+                    output_list.append(result)
+                    output_list.append("\n")
+                wfile.write("".join(output_list).encode(TEXT_ENCODING, TEXT_ERRORS))
+    finally:
+        if data is not None:
+            data.close()
+
+    return stats
+
+
+def normalize_mmap_file(input_path: str,
+                        output_path: str = STDIO_PATH,
+                        workers: int = None,
+                        num_shards: int = None,
+                        kind: str = BATCH_KIND_LATEX,
+                        on_error: str = ON_ERROR_KEEP,
+                        **options) -> CorpusStats:
+    """ Normalize a file of one latex expression or sentence per line with a
+    pool of processes. The file is memory mapped and split into byte ranges
+    at newlines, each worker maps the file and decodes its own range, so
+    lines are never sent between processes. Results of each range are
+    written to a temporary file, and joined into the output in order
+
+    Args:
+        input_path(str): path of the file, not compressed
+        output_path(str): path of output file, `-` for stdout
+        workers(int): number of processes, `os.cpu_count()` if None,
+            normalized in this process if 1
+        num_shards(int): number of byte ranges, `CHUNKS_PER_WORKER` for each
+            process if None
+        kind(str): `BATCH_KIND_LATEX` or `BATCH_KIND_SENTENCE`
+        on_error(str): refer to `corpus.normalize_records`
+        options: refer to `normalize_latex_expression`
+
+    Returns:
+        CorpusStats, counters of the file
+    """
+    if kind not in (BATCH_KIND_LATEX, BATCH_KIND_SENTENCE):
+        raise ValueError("Unknown kind: {}".format(kind))
+    if on_error not in (ON_ERROR_KEEP, ON_ERROR_SKIP):
+        raise ValueError("Unknown action on error: {}".format(on_error))
+
+    start_time = time.perf_counter()
+    normalizer = Normalizer(**options)
+    workers = workers or os.cpu_count() or 1
+    num_shards = num_shards or workers * CHUNKS_PER_WORKER
+
+    data = open_mmap(input_path)
+    if data is None:
+        shard_list = []
+    else:
+        with data:
+            shard_list = find_shard_boundaries(data, num_shards if workers > 1 else 1)
+
+    # shards are written beside the output
+    output_dir = None
+    if output_path != STDIO_PATH:
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+    temp_dir = tempfile.mkdtemp(prefix="normalize-shards-", dir=output_dir)
+    stats = CorpusStats()
+    try:
+        shard_path_list = [
+            os.path.join(temp_dir, "{}.txt".format(shard_idx))
+            for shard_idx in range(len(shard_list))
+        ]
+        shard_args_list = [
+            (input_path, start, end, shard_path, normalizer, kind, on_error)
+            for (start, end), shard_path in zip(shard_list, shard_path_list)
+        ]
+
+        if output_path == STDIO_PATH:
+            sys.stdout.flush()
+            wfile = sys.stdout.buffer
+        else:
+            wfile = open(output_path, "wb")
+        try:
+            if workers <= 1:
+                shard_stats_iterator = (
+                    normalize_shard(*shard_args) for shard_args in shard_args_list
+                )
+                _join_shards(shard_stats_iterator, shard_path_list, wfile, stats)
+            else:
+                max_workers = min(workers, max(len(shard_list), 1))
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    future_list = [
+                        executor.submit(normalize_shard, *shard_args)
+                        for shard_args in shard_args_list
+                    ]
+                    _join_shards(
+                        (future.result() for future in future_list), shard_path_list,
+                        wfile, stats
+                    )
+        finally:
+            if output_path == STDIO_PATH:
+                wfile.flush()
+            else:
+                wfile.close()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    stats.seconds = time.perf_counter() - start_time
+    return stats
+
+
+def _join_shards(shard_stats_iterator, shard_path_list, wfile, stats):
+    """ Append outputs of shards in order once each is done """
+    for shard_stats, shard_path in zip(shard_stats_iterator, shard_path_list):
+        with open(shard_path, "rb") as rfile:
+            shutil.copyfileobj(rfile, wfile, 1 << 20)
+        os.remove(shard_path)
+
+        stats.records += shard_stats["records"]
+        stats.errors += shard_stats["errors"]
+        stats.fallbacks += shard_stats["fallbacks"]
@@ -1,8 +1,198 @@
+import functools
+import itertools
+from collections import namedtuple
+
+from .cache.result_cache import get_result_cache
+from .cache.persistent_cache import get_persistent_cache
+from .cache.shared_cache import get_shared_cache
+from .cache.skeleton_cache import get_skeleton_cache
 from .stream import LatexTokenStream
+from .stream.token_stream import LEXER_REGEX
 from .components import COMPONENT_MAPPER, OtherComponent, BraceComponent
-from .components.component_factory import ComponentFactory
+from .components.component_context import ComponentContext, use_component_context
 from .exceptions.base_exception import NormalizerException
-from .utils.common_utils import trans_chinese_unit_to_latex, split_to_latex_and_not
+from .mapping.token_mapping import get_token_mapper, get_invalid_tokens
+from .utils.common_utils import scan_sentence, join_scanned_sentence
+
+
+class NormalizeOptions(namedtuple("NormalizeOptions", [
+        "normalize_token", "ignore_similar_despite_capital", 
+        "keep_left_right_marker", "strip_angle_for_tri", "ensure_valid_formula",
+        "keep_successive_outmost_brace", "brace_single_elem_for_log", 
+        "keep_rm_sign"])):
+    """ Options of normalization, refer to `normalize_latex_expression` """
+    __slots__ = ()
+
+
+NormalizeOptions.__new__.__defaults__ = (False, False, True, False, True, False, True, True)
+
+
+class Normalizer(object):
+    """ Normalizer with fixed options. Everything depending only on options 
+    is prepared once while constructing, which is worthy when normalizing lots
+    of formulas with the same options
+
+    Args:
+        refer to `normalize_latex_expression`
+
+    Attributes:
+        options(NormalizeOptions): options of the normalizer
+        fallbacks(int): number of invalid formulas which fall back to joined
+            tokens as `ensure_valid_formula` is False, cached results excluded
+        pretokenize(bool): whether formulas are tokenized into `TokenTable`
+            before parsing, refer to `benchmarks/bench_normalize.py`
+    """
+    pretokenize = False
+
+    def __init__(self,
+                 normalize_token: bool = False,
+                 ignore_similar_despite_capital: bool = False,
+                 keep_left_right_marker: bool = True,
+                 strip_angle_for_tri: bool = False,
+                 ensure_valid_formula: bool = True,
+                 keep_successive_outmost_brace: bool = False,
+                 brace_single_elem_for_log: bool = True,
+                 keep_rm_sign: bool = True):
+        self.options = NormalizeOptions(
+            normalize_token=bool(normalize_token),
+            ignore_similar_despite_capital=bool(ignore_similar_despite_capital),
+            keep_left_right_marker=bool(keep_left_right_marker),
+            strip_angle_for_tri=bool(strip_angle_for_tri),
+            ensure_valid_formula=bool(ensure_valid_formula),
+            keep_successive_outmost_brace=bool(keep_successive_outmost_brace),
+            brace_single_elem_for_log=bool(brace_single_elem_for_log),
+            keep_rm_sign=bool(keep_rm_sign),
+        )
+
+        # token stream, components are dispatched by the shared 
+        # `COMPONENT_DISPATCH_INDEX`
+        self._token_mapper = get_token_mapper(
+            self.options.normalize_token, self.options.ignore_similar_despite_capital
+        )
+        self._invalid_tokens = get_invalid_tokens(self.options.keep_left_right_marker)
+        self.fallbacks = 0
+
+        # rendering policies of \log, \rm and trigonometric functions
+        self._component_context = ComponentContext(
+            strip_angle=self.options.strip_angle_for_tri,
+            brace_single_elem=self.options.brace_single_elem_for_log,
+            keep_rm=self.options.keep_rm_sign,
+        )
+
+    def __reduce__(self):
+        # rebuild from options while pickling, e.g. sent to worker processes
+        return (self.__class__, tuple(self.options))
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, ", ".join(
+            "{}={}".format(key, value) for key, value in self.options._asdict().items()
+        ))
+
+    def __call__(self, latex: str) -> str:
+        """ Normalize latex expression, refer to `normalize_latex_expression` """
+        normalize_func = self._normalize
+        skeleton_cache = get_skeleton_cache()
+        if skeleton_cache is not None:
+            normalize_func = functools.partial(skeleton_cache.normalize, self)
+
+        return self._normalize_with_caches("latex", latex, normalize_func)
+
+    def normalize_sentence(self, sentence: str) -> str:
+        """ Normalize all latex expressions braced with $ in sentence, refer to 
+        `normalize_latex_in_sentence`
+        """
+        return self._normalize_with_caches(
+            "sentence", sentence, self._normalize_sentence
+        )
+
+    def map(self, latex_iterable, prefetch_size: int = 1000):
+        """ Lazily normalize each latex expression of `latex_iterable`, cached 
+        results in persistent cache are read in batches of `prefetch_size`
+        """
+        if get_persistent_cache() is None:
+            return map(self, latex_iterable)
+
+        return self._map_with_prefetch(latex_iterable, prefetch_size)
+
+    def _map_with_prefetch(self, latex_iterable, prefetch_size):
+        latex_iterator = iter(latex_iterable)
+        while True:
+            latex_batch = list(itertools.islice(latex_iterator, prefetch_size))
+            if not latex_batch:
+                return
+
+            persistent_cache = get_persistent_cache()
+            if persistent_cache is not None:
+                persistent_cache.prefetch(
+                    [("latex", self.options, latex) for latex in latex_batch]
+                )
+            for latex in latex_batch:
+                yield self(latex)
+
+    def _normalize_with_caches(self, kind, text, normalize_func):
+        result_cache = get_result_cache()
+        shared_cache = get_shared_cache()
+        persistent_cache = get_persistent_cache()
+        if result_cache is None and shared_cache is None and persistent_cache is None:
+            return normalize_func(text)
+
+        # in-process cache first, then cache shared by processes, persistent 
+        # cache, skeleton cache of expressions is the last one
+        key = (kind, self.options, text)
+        if persistent_cache is not None:
+            normalize_func = functools.partial(
+                persistent_cache.get_or_compute, key, normalize_func
+            )
+        if shared_cache is not None:
+            normalize_func = functools.partial(
+                shared_cache.get_or_compute, key, normalize_func
+            )
+        if result_cache is not None:
+            return result_cache.get_or_compute(key, normalize_func, text)
+
+        return normalize_func(text)
+
+    def _normalize(self, latex: str) -> str:
+        latex_stream = LatexTokenStream(
+            '{' + latex + '}', 
+            normalize_token=self.options.normalize_token,
+            ignore_similar_despite_capital=self.options.ignore_similar_despite_capital,
+            keep_left_right_marker=self.options.keep_left_right_marker,
+            pretokenize=self.pretokenize,
+            lexer=LEXER_REGEX,
+            token_mapper=self._token_mapper,
+            invalid_tokens=self._invalid_tokens,
+        )
+
+        try:
+            with use_component_context(self._component_context):
+                root_component = BraceComponent.match(latex_stream, strict=True)
+                return root_component.to_string(
+                    sub_comp_has_outmost_header=self.options.keep_successive_outmost_brace
+                ).strip()
+
+        except NormalizerException as e:
+            if self.options.ensure_valid_formula:
+                raise e
+
+            self.fallbacks += 1
+            latex_stream.reset_stream()
+            return " ".join(latex_stream.get_all_tokens()[1:-1]).strip()
+
+    def _normalize_sentence(self, sentence: str) -> str:
+        sentence_parts, delimiter_list = scan_sentence(sentence)
+        for latex_idx, latex in enumerate(sentence_parts[1::2]):
+            sentence_parts[2 * latex_idx + 1] = self(latex)
+
+        return join_scanned_sentence(sentence_parts, delimiter_list)
+
+
+@functools.lru_cache(maxsize=None)
+def get_normalizer(*options) -> Normalizer:
+    """ Get the shared normalizer of given options, the arguments are the same
+    as `Normalizer`, bool only
+    """
+    return Normalizer(*options)
 
 
 def normalize_latex_expression(latex: str, 
@@ -49,36 +239,16 @@ def normalize_latex_expression(latex: str,
         Exceptions from NormalizerException: when ensure valid formula is True, and
             syntax error raised, this kind of exception will be raised
     """
-    ComponentFactory.set_component_group_status(
-        ["\\sin", "\\cos", "\\tan"], "strip_angle", bool(strip_angle_for_tri) 
-    )
-    ComponentFactory.set_component_group_status(
-        ["\\log"], "brace_single_elem", bool(brace_single_elem_for_log)
-    )
-    ComponentFactory.set_component_group_status(
-        ["\\rm"], "keep_rm", bool(keep_rm_sign)
-    )
-
-    latex = '{' + latex + '}'
-    latex_stream = LatexTokenStream(
-        latex, 
-        normalize_token=normalize_token,
-        ignore_similar_despite_capital=ignore_similar_despite_capital,
-        keep_left_right_marker=keep_left_right_marker
-    )
-
-    try:
-        root_component = BraceComponent.match(latex_stream, strict=True)
-        return root_component.to_string(
-            sub_comp_has_outmost_header=keep_successive_outmost_brace
-        ).strip()
-
-    except NormalizerException as e:
-        if ensure_valid_formula:
-            raise e
-
-        latex_stream.reset_stream()
-        return " ".join(latex_stream.get_all_tokens()[1:-1]).strip()
+    return get_normalizer(
+        bool(normalize_token),
+        bool(ignore_similar_despite_capital),
+        bool(keep_left_right_marker),
+        bool(strip_angle_for_tri),
+        bool(ensure_valid_formula),
+        bool(keep_successive_outmost_brace),
+        bool(brace_single_elem_for_log),
+        bool(keep_rm_sign),
+    )(latex)
 
 
 def normalize_latex_in_sentence(sentence: str, 
@@ -111,20 +281,13 @@ def normalize_latex_in_sentence(sentence: str,
         Exceptions from NormalizerException: when ensure valid formula is True, and
             syntax error raised, this kind of exception will be raised
     """
-    sentence = trans_chinese_unit_to_latex(sentence)
-
-    sentence_parts = split_to_latex_and_not(sentence)
-    for latex_idx, latex in enumerate(sentence_parts[1::2]):
-        sentence_parts[2 * latex_idx + 1] = normalize_latex_expression(
-            latex, 
-            normalize_token=normalize_token,
-            ignore_similar_despite_capital=ignore_similar_despite_capital,
-            keep_left_right_marker=keep_left_right_marker,
-            strip_angle_for_tri=strip_angle_for_tri,
-            ensure_valid_formula=ensure_valid_formula,
-            keep_successive_outmost_brace=keep_successive_outmost_brace,
-            brace_single_elem_for_log=brace_single_elem_for_log,
-            keep_rm_sign=keep_rm_sign,
-        )
-    
-    return "$".join(sentence_parts)
+    return get_normalizer(
+        bool(normalize_token),
+        bool(ignore_similar_despite_capital),
+        bool(keep_left_right_marker),
+        bool(strip_angle_for_tri),
+        bool(ensure_valid_formula),
+        bool(keep_successive_outmost_brace),
+        bool(brace_single_elem_for_log),
+        bool(keep_rm_sign),
+    ).normalize_sentence(sentence)
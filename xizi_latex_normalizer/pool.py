@@ -0,0 +1,370 @@
+import gc
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from collections import deque
+from multiprocessing.connection import wait
+
+from .batch import (
+    normalize_items, NormalizeError, BATCH_KIND_LATEX, BATCH_KIND_SENTENCE,
+    CHUNKS_PER_WORKER
+)
+from .mapping.mapping_data_loader import (
+    TokenMappingDataReader, TokenIgnoringCaptalMappingDataReader,
+    GlobalCharMappingDataReader
+)
+from .mapping.token_mapping import get_token_mapper, get_invalid_tokens
+from .cache.shared_cache import get_shared_cache, use_shared_cache
+from .exceptions import exception_from_name
+from .normalize import Normalizer
+from .utils.common_utils import scan_sentence, join_scanned_sentence
+
+
+# formulas touching most components, regex and mappers while warming up
+WARM_UP_LATEX_LIST = [
+    r"x+\frac12+\vec a-\sqrt[2]5+\frac{\frac12}{\frac1{3}}",
+    r"\sin \angle A + \cos^2 x = \tan \frac{\pi}{4} \geqslant \dfrac{1}{2}",
+    r"\log_23 + \lg 100 - \ln(x+1) + 2\pi",
+    r"\left\{\begin{array}{l}{x+y=1} \\ {y=k(x-3)}\end{array}\right.",
+    r"\begin{cases}x \\ y\end{cases} + \overline{AB} \perp \vec{CD}",
+    r"\rm{kg} + 3.2^{\circ} + f'(x) + |x| + \complement_{U}A + \underset{x}{y}",
+]
+WARM_UP_SENTENCE_LIST = ["长$64$米，速度为$3$米每秒，温度为$5$度"]
+
+WORKER_EXITED_ERROR = "WorkerExitedError"
+
+# documents of more formulas or chars than these are normalized by workers
+DOCUMENT_MIN_SEGMENTS = 64
+DOCUMENT_MIN_CHARS = 20000
+
+
+class WorkerExitedError(RuntimeError):
+    """ Worker exited before finishing its chunk """
+
+
+def warm_up(normalizer: Normalizer):
+    """ Load mapping data and everything prepared lazily by normalizing, so
+    processes forked later share them copy-on-write
+    """
+    TokenMappingDataReader()
+    TokenIgnoringCaptalMappingDataReader()
+    GlobalCharMappingDataReader()
+    for to_normalize_token, to_lower_token in itertools.product((False, True), repeat=2):
+        get_token_mapper(to_normalize_token, to_lower_token)
+    for keep_left_right_marker in (False, True):
+        get_invalid_tokens(keep_left_right_marker)
+
+    normalize_items(normalizer, BATCH_KIND_LATEX, WARM_UP_LATEX_LIST)
+    normalize_items(normalizer, BATCH_KIND_SENTENCE, WARM_UP_SENTENCE_LIST)
+
+
+def get_rss():
+    """ Get resident set size of this process in bytes, `None` if unknown """
+    try:
+        with open("/proc/self/statm", "r") as rfile:
+            return int(rfile.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # peak size, in kilobytes on linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if os.uname().sysname == "Darwin" else max_rss * 1024
+
+
+def get_default_start_method() -> str:
+    start_method_list = multiprocessing.get_all_start_methods()
+    for start_method in ("fork", "forkserver"):
+        if start_method in start_method_list:
+            return start_method
+
+    return "spawn"
+
+
+def get_thread_safe_start_method() -> str:
+    """ Start method which does not fork the current process, which may run
+    other threads holding locks
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return "forkserver"
+
+    return "spawn"
+
+
+def _worker_main(connection, normalizer, warm, max_tasks, max_rss_growth,
+                 inherited_connections=(), shared_cache=None):
+    """ Normalize chunks from `connection` until closed, or retire after
+    finishing `max_tasks` chunks or growing `max_rss_growth` bytes
+    """
+    # ends of the parent inherited by forking, or pipes would never be closed
+    for inherited_connection in inherited_connections:
+        inherited_connection.close()
+    # the shared cache is inherited by forking, otherwise passed
+    if shared_cache is not None:
+        use_shared_cache(shared_cache)
+    if warm:
+        warm_up(normalizer)
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+
+    base_rss = get_rss()
+    finished_tasks = 0
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+
+        task_id, kind, item_list = task
+        result_list = normalize_items(normalizer, kind, item_list)
+        finished_tasks += 1
+
+        retiring = bool(max_tasks and finished_tasks >= max_tasks)
+        if max_rss_growth and base_rss is not None:
+            retiring = retiring or get_rss() - base_rss > max_rss_growth
+
+        connection.send((task_id, result_list, retiring))
+        if retiring:
+            return
+
+
+class _PoolWorker(object):
+    def __init__(self, process, connection, start_method):
+        self.process = process
+        self.connection = connection
+        self.start_method = start_method
+        self.task = None  # (task_id, number of items) while busy
+
+
+class NormalizerPool(object):
+    """ Long-lived pool of worker processes with the same options. Mapping
+    data, mappers and everything prepared lazily are loaded in this process
+    before starting workers, and with `fork` workers share them copy-on-write.
+    The state is frozen by `gc.freeze()` around forking and in workers after
+    warm-up, so collections do not touch it. Workers are recycled after
+    finishing some chunks or growing some memory
+
+    Args:
+        workers(int): number of worker processes, `os.cpu_count()` if None
+        start_method(str): `fork`, `forkserver` or `spawn`, `fork` is used if
+            supported, then `forkserver`
+        replace_start_method(str): start method of workers replacing recycled
+            or exited ones, `start_method` if None, while `fork` is replaced
+            by `get_thread_safe_start_method` if this process runs other
+            threads then, e.g. the pool is owned by a threaded server
+        max_tasks_per_worker(int): chunks a worker finishes before retiring,
+            no limit if None
+        max_rss_growth(int): bytes of resident memory a worker grows since
+            warm-up before retiring, no limit if None
+        options: refer to `normalize_latex_expression`
+    """
+    def __init__(self,
+                 workers: int = None,
+                 start_method: str = None,
+                 replace_start_method: str = None,
+                 max_tasks_per_worker: int = None,
+                 max_rss_growth: int = None,
+                 **options):
+        self.normalizer = Normalizer(**options)
+        self.workers = workers or os.cpu_count() or 1
+        self.start_method = start_method or get_default_start_method()
+        self.replace_start_method = replace_start_method
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_rss_growth = max_rss_growth
+
+        self._task_counter = itertools.count()
+        self._recycled_workers = 0
+        self._exited_workers = 0
+        self._finished_tasks = 0
+
+        warm_up(self.normalizer)
+        self._worker_list = []
+        for _ in range(self.workers):
+            self._worker_list.append(self._start_worker())
+
+    def map(self, latex_list, chunksize: int = None) -> list:
+        """ Normalize latex expressions, refer to `batch.normalize_batch` """
+        return self._run(BATCH_KIND_LATEX, latex_list, chunksize)
+
+    def map_sentences(self, sentence_list, chunksize: int = None) -> list:
+        """ Normalize latex in sentences, refer to `batch.normalize_sentence_batch` """
+        return self._run(BATCH_KIND_SENTENCE, sentence_list, chunksize)
+
+    def normalize_document(self,
+                           document: str,
+                           min_segments: int = DOCUMENT_MIN_SEGMENTS,
+                           min_chars: int = DOCUMENT_MIN_CHARS) -> str:
+        """ Normalize latex in a long document, e.g. an exam paper, like
+        `normalize_latex_in_sentence`. If it has more than `min_segments`
+        formulas or `min_chars` chars, its formulas are normalized by workers
+        and reassembled in order, otherwise it is normalized in this process
+
+        A formula failed is kept as it is if `ensure_valid_formula` is False,
+        e.g. its worker exited, otherwise an exception of the same type is
+        raised, `WorkerExitedError` if its worker exited
+        """
+        part_list, delimiter_list = scan_sentence(document)
+        if len(delimiter_list) <= min_segments and len(document) <= min_chars:
+            return self.normalizer.normalize_sentence(document)
+
+        latex_list = part_list[1::2]
+        for latex_idx, (latex, result) in enumerate(zip(latex_list, self.map(latex_list))):
+            if isinstance(result, NormalizeError):
+                if self.normalizer.options.ensure_valid_formula:
+                    if result.exception_type == WORKER_EXITED_ERROR:
+                        raise WorkerExitedError(result.message)
+                    raise exception_from_name(result.exception_type, result.message)
+                result = latex
+            part_list[2 * latex_idx + 1] = result
+
+        return join_scanned_sentence(part_list, delimiter_list)
+
+    def get_stats(self) -> dict:
+        """ Get number of workers, finished chunks, workers recycled and
+        workers exited unexpectedly
+        """
+        return {
+            "workers": len(self._worker_list),
+            "tasks": self._finished_tasks,
+            "recycled": self._recycled_workers,
+            "exited": self._exited_workers,
+        }
+
+    def close(self):
+        """ Stop all workers, chunks in progress are finished first """
+        for worker in self._worker_list:
+            try:
+                worker.connection.send(None)
+            except OSError:
+                pass
+        for worker in self._worker_list:
+            worker.process.join()
+            worker.connection.close()
+        self._worker_list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start_worker(self, start_method: str = None) -> _PoolWorker:
+        start_method = start_method or self.start_method
+        context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            context.set_forkserver_preload([__name__])
+
+        parent_connection, child_connection = context.Pipe()
+        is_fork = start_method == "fork"
+        inherited_connections = (
+            [worker.connection for worker in self._worker_list] + [parent_connection]
+            if is_fork else []
+        )
+        process = context.Process(
+            target=_worker_main,
+            args=(
+                child_connection, self.normalizer, not is_fork,
+                self.max_tasks_per_worker, self.max_rss_growth, inherited_connections,
+                None if is_fork else get_shared_cache()
+            ),
+            daemon=True,
+        )
+
+        # objects frozen before forking are never touched by collections of
+        # workers, which keeps pages shared
+        to_freeze = is_fork and hasattr(gc, "freeze")
+        if to_freeze:
+            gc.freeze()
+        try:
+            process.start()
+        finally:
+            if to_freeze:
+                gc.unfreeze()
+        child_connection.close()
+
+        return _PoolWorker(process, parent_connection, start_method)
+
+    def _replace_worker(self, worker: _PoolWorker):
+        worker.process.join()
+        worker.connection.close()
+
+        start_method = self.replace_start_method or self.start_method
+        if start_method == "fork" and threading.active_count() > 1:
+            # forking a process running other threads may inherit locks held
+            # by them, e.g. threads of requests in a server
+            start_method = get_thread_safe_start_method()
+        self._worker_list[self._worker_list.index(worker)] = self._start_worker(start_method)
+
+    def _run(self, kind, item_list, chunksize):
+        if not self._worker_list:
+            raise ValueError("Pool is closed")
+
+        item_list = list(item_list)
+        if chunksize is None:
+            chunksize = max(
+                math.ceil(len(item_list) / (self.workers * CHUNKS_PER_WORKER)), 1
+            )
+        pending_chunks = deque(
+            (next(self._task_counter), start, item_list[start:start + chunksize])
+            for start in range(0, len(item_list), chunksize)
+        )
+        task_to_start = {task_id: start for task_id, start, _ in pending_chunks}
+        result_list = [None] * len(item_list)
+
+        while pending_chunks or any(worker.task for worker in self._worker_list):
+            for idx in range(len(self._worker_list)):
+                while self._worker_list[idx].task is None and pending_chunks:
+                    worker = self._worker_list[idx]
+                    task_id, start, chunk = pending_chunks.popleft()
+                    try:
+                        worker.connection.send((task_id, kind, chunk))
+                    except OSError:
+                        # exited while idle, the chunk goes to the new one
+                        pending_chunks.appendleft((task_id, start, chunk))
+                        self._exited_workers += 1
+                        self._replace_worker(worker)
+                        continue
+                    worker.task = (task_id, len(chunk))
+
+            busy_worker_list = [worker for worker in self._worker_list if worker.task]
+            ready_list = wait(
+                [worker.connection for worker in busy_worker_list]
+                + [worker.process.sentinel for worker in busy_worker_list]
+            )
+            for worker in busy_worker_list:
+                if worker.connection in ready_list or worker.process.sentinel in ready_list:
+                    self._collect(worker, task_to_start, result_list)
+
+        return result_list
+
+    def _collect(self, worker, task_to_start, result_list):
+        task_id, num_items = worker.task
+        start = task_to_start[task_id]
+        retiring = True
+        try:
+            # the result is sent before a retiring worker exits
+            if worker.connection.poll():
+                _, chunk_result_list, retiring = worker.connection.recv()
+                self._recycled_workers += retiring
+            else:
+                raise EOFError
+        except (EOFError, OSError):
+            self._exited_workers += 1
+            chunk_result_list = [NormalizeError(
+                WORKER_EXITED_ERROR,
+                "Worker exited with code {}".format(worker.process.exitcode)
+            )] * num_items
+
+        result_list[start:start + num_items] = chunk_result_list
+        self._finished_tasks += 1
+        worker.task = None
+        if retiring:
+            self._replace_worker(worker)
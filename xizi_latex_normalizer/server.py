@@ -0,0 +1,421 @@
+""" Local HTTP normalization service, stdlib only
+
+Usage:
+    xizi-latex-normalize-server --port 8000 -j 8 --normalize-token
+
+Endpoints:
+    POST /normalize        {"text": "\\frac12", "mode": "expression"}
+                           -> {"result": "\\frac{1}{2}"}
+    POST /normalize/batch  {"texts": ["\\frac12", "\\frac{1"], "mode": "expression"}
+                           -> {"results": [{"result": "\\frac{1}{2}"},
+                                           {"error": {"type": "...", "message": "..."}}]}
+    GET  /metrics          counters and latency histograms in prometheus text format
+    GET  /health           {"status": "ok"}
+
+Options of normalization are fixed while starting the server, so workers are
+warmed up once. Items of concurrent requests are collected into batches for a
+short window and normalized by a pool of workers, connections are kept alive
+"""
+import argparse
+import json
+import queue
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from .__about__ import __version__
+from .batch import BATCH_KIND_LATEX, BATCH_KIND_SENTENCE, NormalizeError
+from .cli import MODE_TO_KIND, add_normalize_option_arguments, get_normalize_options
+from .pool import NormalizerPool, get_thread_safe_start_method
+
+
+# seconds to collect more items after the first request of a batch
+BATCH_WINDOW = 0.002
+MAX_BATCH_SIZE = 4096
+MAX_BODY_SIZE = 16 << 20
+# seconds an idle keep-alive connection is kept
+CONNECTION_TIMEOUT = 60
+METRIC_PREFIX = "latex_normalizer_"
+# paths counted in metrics, others are counted as `other`
+ENDPOINT_PATHS = ("/normalize", "/normalize/batch", "/metrics", "/health")
+# upper bounds of buckets of latency histograms, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# upper bounds of buckets of histograms of items in a batch
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+class Histogram(object):
+    """ Histogram of observed values in buckets of upper bounds """
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        idx = 0
+        while idx < len(self.buckets) and value > self.buckets[idx]:
+            idx += 1
+        self.counts[idx] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str = "") -> list:
+        """ Lines of the histogram in prometheus text format """
+        line_list = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            line_list.append('{}_bucket{{{}le="{}"}} {}'.format(
+                name, labels + "," if labels else "", bound, cumulative
+            ))
+        braced_labels = "{" + labels + "}" if labels else ""
+        line_list.append("{}_sum{} {}".format(name, braced_labels, self.sum))
+        line_list.append("{}_count{} {}".format(name, braced_labels, self.count))
+        return line_list
+
+
+class ServerMetrics(object):
+    """ Counters and histograms of the server, safe for threads """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start_time = time.time()
+        self._requests = {}  # (path, status) -> count
+        self._latencies = {}  # path -> Histogram
+        self._items = {BATCH_KIND_LATEX: 0, BATCH_KIND_SENTENCE: 0}
+        self._item_errors = 0
+        self._batches = 0
+        self._batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+
+    def observe_request(self, path: str, status: int, seconds: float):
+        with self._lock:
+            self._requests[path, status] = self._requests.get((path, status), 0) + 1
+            if path not in self._latencies:
+                self._latencies[path] = Histogram(LATENCY_BUCKETS)
+            self._latencies[path].observe(seconds)
+
+    def observe_batch(self, kind: str, result_list: list):
+        with self._lock:
+            self._items[kind] += len(result_list)
+            self._item_errors += sum(isinstance(result, NormalizeError) for result in result_list)
+            self._batches += 1
+            self._batch_sizes.observe(len(result_list))
+
+    def render(self, pool_stats: dict = None) -> str:
+        """ All metrics in prometheus text format """
+        with self._lock:
+            line_list = [
+                "# TYPE {}uptime_seconds gauge".format(METRIC_PREFIX),
+                "{}uptime_seconds {}".format(METRIC_PREFIX, time.time() - self._start_time),
+                "# TYPE {}requests_total counter".format(METRIC_PREFIX),
+            ]
+            for (path, status), count in sorted(self._requests.items()):
+                line_list.append('{}requests_total{{path="{}",code="{}"}} {}'.format(
+                    METRIC_PREFIX, path, status, count
+                ))
+            line_list.append("# TYPE {}items_total counter".format(METRIC_PREFIX))
+            for kind, count in sorted(self._items.items()):
+                line_list.append('{}items_total{{kind="{}"}} {}'.format(METRIC_PREFIX, kind, count))
+            line_list.extend([
+                "# TYPE {}item_errors_total counter".format(METRIC_PREFIX),
+                "{}item_errors_total {}".format(METRIC_PREFIX, self._item_errors),
+                "# TYPE {}batches_total counter".format(METRIC_PREFIX),
+                "{}batches_total {}".format(METRIC_PREFIX, self._batches),
+                "# TYPE {}request_seconds histogram".format(METRIC_PREFIX),
+            ])
+            for path, histogram in sorted(self._latencies.items()):
+                line_list.extend(histogram.render(
+                    METRIC_PREFIX + "request_seconds", 'path="{}"'.format(path)
+                ))
+            line_list.append("# TYPE {}batch_items histogram".format(METRIC_PREFIX))
+            line_list.extend(self._batch_sizes.render(METRIC_PREFIX + "batch_items"))
+
+        for name, value in sorted((pool_stats or {}).items()):
+            line_list.append("# TYPE {}pool_{} gauge".format(METRIC_PREFIX, name))
+            line_list.append("{}pool_{} {}".format(METRIC_PREFIX, name, value))
+
+        return "\n".join(line_list) + "\n"
+
+
+class _BatchRequest(object):
+    def __init__(self, kind, item_list):
+        self.kind = kind
+        self.item_list = item_list
+        self.result_list = None
+        self.done = threading.Event()
+
+
+class RequestBatcher(object):
+    """ Collect items of concurrent requests into batches, which are
+    normalized by the pool one by one in a thread. A batch is collected for
+    `batch_window` seconds since its first request, or until it has
+    `max_batch_size` items, and requests keep queuing while it is normalized
+    """
+    def __init__(self,
+                 pool: NormalizerPool,
+                 metrics: ServerMetrics,
+                 batch_window: float = BATCH_WINDOW,
+                 max_batch_size: int = MAX_BATCH_SIZE):
+        self.pool = pool
+        self.metrics = metrics
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def normalize(self, kind: str, item_list: list) -> list:
+        """ Normalize items in a batch, failures are `NormalizeError` """
+        request = _BatchRequest(kind, item_list)
+        self._queue.put(request)
+        request.done.wait()
+        return request.result_list
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        closing = False
+        while not closing:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            request_list = [request]
+            num_items = len(request.item_list)
+            deadline = time.monotonic() + self.batch_window
+            while num_items < self.max_batch_size:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                request_list.append(request)
+                num_items += len(request.item_list)
+
+            self._run_batch(request_list)
+
+    def _run_batch(self, request_list: list):
+        for kind, map_func in ((BATCH_KIND_LATEX, self.pool.map),
+                               (BATCH_KIND_SENTENCE, self.pool.map_sentences)):
+            kind_request_list = [request for request in request_list if request.kind == kind]
+            if not kind_request_list:
+                continue
+
+            item_list = [item for request in kind_request_list for item in request.item_list]
+            try:
+                result_list = map_func(item_list)
+            except Exception as e:
+                result_list = [NormalizeError.from_exception(e)] * len(item_list)
+            self.metrics.observe_batch(kind, result_list)
+
+            start = 0
+            for request in kind_request_list:
+                request.result_list = result_list[start:start + len(request.item_list)]
+                start += len(request.item_list)
+                request.done.set()
+
+
+def format_result(result) -> dict:
+    if isinstance(result, NormalizeError):
+        return {"error": {"type": result.exception_type, "message": result.message}}
+    return {"result": result}
+
+
+class BadRequest(Exception):
+    """ Invalid request, responded with 400 """
+
+
+class NormalizeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "xizi-latex-normalizer/" + __version__
+    timeout = CONNECTION_TIMEOUT
+
+    def do_GET(self):
+        start = time.perf_counter()
+        if self.path == "/metrics":
+            body = self.server.metrics.render(self.server.pool.get_stats()).encode("utf-8")
+            status = self._send(200, body, "text/plain; version=0.0.4; charset=utf-8")
+        elif self.path == "/health":
+            status = self._send_json(200, {"status": "ok"})
+        else:
+            status = self._send_json(404, {"error": {"type": "NotFound", "message": self.path}})
+        self._observe(start, status)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        try:
+            request = self._read_json()
+            if self.path == "/normalize":
+                text = request.get("text")
+                if not isinstance(text, str):
+                    raise BadRequest("`text` must be a string")
+                result = self.server.batcher.normalize(self._get_kind(request), [text])[0]
+                status = self._send_json(422 if isinstance(result, NormalizeError) else 200,
+                                         format_result(result))
+            elif self.path == "/normalize/batch":
+                text_list = request.get("texts")
+                if not isinstance(text_list, list) or not all(
+                        isinstance(text, str) for text in text_list):
+                    raise BadRequest("`texts` must be a list of strings")
+                result_list = self.server.batcher.normalize(self._get_kind(request), text_list)
+                status = self._send_json(200, {
+                    "results": [format_result(result) for result in result_list]
+                })
+            else:
+                # the body has been read, so the connection is kept alive
+                status = self._send_json(404, {"error": {"type": "NotFound", "message": self.path}})
+        except BadRequest as e:
+            status = self._send_json(400, {"error": {"type": "BadRequest", "message": str(e)}})
+        self._observe(start, status)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self) -> dict:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_SIZE:
+            self.close_connection = True
+            raise BadRequest("Invalid Content-Length")
+
+        try:
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError as e:
+            raise BadRequest("Invalid json: {}".format(e))
+        if not isinstance(request, dict):
+            raise BadRequest("Request must be a json object")
+        return request
+
+    def _get_kind(self, request: dict) -> str:
+        mode = request.get("mode", "expression")
+        if mode not in MODE_TO_KIND:
+            raise BadRequest("Unknown mode: {}".format(mode))
+        return MODE_TO_KIND[mode]
+
+    def _send_json(self, status: int, response: dict) -> int:
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        return self._send(status, body, "application/json; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> int:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def _observe(self, start: float, status: int):
+        path = self.path if self.path in ENDPOINT_PATHS else "other"
+        self.server.metrics.observe_request(path, status, time.perf_counter() - start)
+
+
+class NormalizeServer(socketserver.ThreadingMixIn, HTTPServer):
+    """ HTTP server of normalization with a warm `NormalizerPool`, each
+    connection is served in a thread. The pool is started before the socket
+    and threads, so its first workers are forked from a clean process, while
+    workers replacing exited ones are started by `forkserver` (or `spawn`),
+    never forked from the threaded server
+
+    Args:
+        address(tuple): (host, port), port 0 for any free port
+        workers(int): number of worker processes, `os.cpu_count()` if None
+        batch_window(float): seconds to collect a batch
+        max_batch_size(int): max number of items of a batch, a larger batch
+            request is normalized in a batch of its own
+        verbose(bool): whether to log each request to stderr
+        options: refer to `normalize_latex_expression`
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    # connections of clients started together are not refused
+    request_queue_size = 128
+
+    def __init__(self,
+                 address: tuple,
+                 workers: int = None,
+                 batch_window: float = BATCH_WINDOW,
+                 max_batch_size: int = MAX_BATCH_SIZE,
+                 verbose: bool = False,
+                 **options):
+        self.pool = NormalizerPool(
+            workers=workers, replace_start_method=get_thread_safe_start_method(), **options
+        )
+        self.metrics = ServerMetrics()
+        self.verbose = verbose
+        try:
+            HTTPServer.__init__(self, address, NormalizeRequestHandler)
+        except Exception:
+            self.pool.close()
+            raise
+        self.batcher = RequestBatcher(self.pool, self.metrics, batch_window, max_batch_size)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        self.batcher.close()
+        self.pool.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="xizi-latex-normalize-server",
+        description="Serve normalization over HTTP with a warm pool of workers",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind")
+    parser.add_argument("--port", type=int, default=8000, help="port to bind")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None,
+        help="number of worker processes, number of cpus by default"
+    )
+    parser.add_argument(
+        "--batch-window", type=float, default=BATCH_WINDOW,
+        help="seconds to collect items of concurrent requests into a batch"
+    )
+    parser.add_argument(
+        "--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+        help="max number of items of a batch"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log each request")
+    parser.add_argument("--version", action="version", version=__version__)
+    add_normalize_option_arguments(parser)
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    server = NormalizeServer(
+        (args.host, args.port),
+        workers=args.workers,
+        batch_window=args.batch_window,
+        max_batch_size=args.max_batch_size,
+        verbose=args.verbose,
+        **get_normalize_options(args)
+    )
+    print("Serving on {}".format(server.url), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
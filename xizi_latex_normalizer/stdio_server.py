@@ -0,0 +1,132 @@
+""" Co-process protocol over stdin and stdout, for hosts which keep warm
+normalizer processes instead of starting one for each call
+
+Usage:
+    xizi-latex-normalize --serve-stdio [--framing lines|length] [options of normalization]
+
+Each request is a json object, framed by a newline, or prefixed by its length
+in bytes as a 4-byte big-endian unsigned int. Requests may be pipelined, they
+are answered in order with the same framing, and each response carries `id`
+of its request:
+    {"id": 1, "text": "\\frac12", "mode": "expression"}
+    -> {"id": 1, "result": "\\frac{1}{2}"}
+    {"id": 2, "texts": ["\\frac12", "\\frac{1"], "mode": "expression"}
+    -> {"id": 2, "results": [{"result": "\\frac{1}{2}"},
+                             {"error": {"type": "...", "message": "..."}}]}
+Invalid requests are answered with an error of type `BadRequest`. The process
+exits once stdin is closed
+"""
+import json
+import struct
+import sys
+
+from .batch import normalize_items
+from .cli import MODE_TO_KIND
+from .normalize import Normalizer
+from .pool import warm_up
+from .server import BadRequest, format_result
+
+
+FRAMING_LINES = "lines"
+FRAMING_LENGTH = "length"
+FRAMINGS = (FRAMING_LINES, FRAMING_LENGTH)
+LENGTH_PREFIX = struct.Struct(">I")
+
+
+def read_messages(rfile, framing: str = FRAMING_LINES):
+    """ Iterate messages in bytes of binary `rfile`, empty lines are skipped """
+    if framing == FRAMING_LINES:
+        for line in rfile:
+            if line.strip():
+                yield line
+        return
+
+    while True:
+        prefix = rfile.read(LENGTH_PREFIX.size)
+        if not prefix:
+            return
+        if len(prefix) < LENGTH_PREFIX.size:
+            raise EOFError("Truncated length prefix")
+        length = LENGTH_PREFIX.unpack(prefix)[0]
+        data = rfile.read(length)
+        if len(data) < length:
+            raise EOFError("Truncated message")
+        yield data
+
+
+def write_message(wfile, data: bytes, framing: str = FRAMING_LINES):
+    """ Write a message to binary `wfile` and flush it """
+    if framing == FRAMING_LINES:
+        wfile.write(data + b"\n")
+    else:
+        wfile.write(LENGTH_PREFIX.pack(len(data)) + data)
+    wfile.flush()
+
+
+def handle_request(normalizer: Normalizer, request) -> dict:
+    """ Answer a decoded request, refer to the protocol of the module """
+    if not isinstance(request, dict):
+        raise BadRequest("Request must be a json object")
+
+    mode = request.get("mode", "expression")
+    if mode not in MODE_TO_KIND:
+        raise BadRequest("Unknown mode: {}".format(mode))
+    kind = MODE_TO_KIND[mode]
+
+    response = {"id": request.get("id")}
+    if "texts" in request:
+        text_list = request["texts"]
+        if not isinstance(text_list, list) or not all(isinstance(text, str) for text in text_list):
+            raise BadRequest("`texts` must be a list of strings")
+        response["results"] = [
+            format_result(result) for result in normalize_items(normalizer, kind, text_list)
+        ]
+    else:
+        text = request.get("text")
+        if not isinstance(text, str):
+            raise BadRequest("`text` must be a string")
+        response.update(format_result(normalize_items(normalizer, kind, [text])[0]))
+
+    return response
+
+
+def serve_stdio(rfile=None, wfile=None, framing: str = FRAMING_LINES, **options) -> int:
+    """ Answer requests from `rfile` to `wfile` until `rfile` is closed
+
+    Args:
+        rfile: binary file of requests, stdin if None
+        wfile: binary file of responses, stdout if None
+        framing(str): `FRAMING_LINES` or `FRAMING_LENGTH`
+        options: refer to `normalize_latex_expression`
+
+    Returns:
+        int, exit code, 1 if the input is truncated in a message
+    """
+    if framing not in FRAMINGS:
+        raise ValueError("Unknown framing: {}".format(framing))
+    rfile = rfile or sys.stdin.buffer
+    wfile = wfile or sys.stdout.buffer
+
+    normalizer = Normalizer(**options)
+    warm_up(normalizer)
+
+    try:
+        for data in read_messages(rfile, framing):
+            request = None
+            try:
+                try:
+                    request = json.loads(data.decode("utf-8"))
+                except ValueError as e:
+                    raise BadRequest("Invalid json: {}".format(e))
+                response = handle_request(normalizer, request)
+            except BadRequest as e:
+                response = {
+                    "id": request.get("id") if isinstance(request, dict) else None,
+                    "error": {"type": "BadRequest", "message": str(e)},
+                }
+            write_message(wfile, json.dumps(response, ensure_ascii=False).encode("utf-8"), framing)
+    except EOFError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return 0
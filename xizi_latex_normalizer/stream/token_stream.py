@@ -1,12 +1,44 @@
 import re
-from typing import Tuple
+from array import array
+from collections import namedtuple
+from typing import Tuple, Callable
 
 from .stream import Stream, check_stream_idx_valid
 from ..mapping.token_mapping import (
-    normalize_token, lower_token, is_left_marker, is_right_marker,
-    is_angle_marker, normalize_sentence_char
+    normalize_token, lower_token, is_angle_marker, normalize_sentence_char,
+    get_invalid_tokens
 )
 
+# Kinds of token recorded in `TokenTable.kinds`
+TOKEN_KIND_SYMBOL = 0       # any other single char, e.g. `+`, `{`
+TOKEN_KIND_COMMAND = 1      # `\frac`, `\{`, also completed `sin` -> `\sin`
+TOKEN_KIND_LINE_BREAK = 2   # `\\`
+TOKEN_KIND_NUMBER = 3       # `3.2`
+TOKEN_KIND_ALPHA_NUM = 4    # `2k`, `ab`
+TOKEN_KIND_UPPER_ALPHA = 5  # `OAB` while tokenizing fragments
+
+# Lexers of `LatexTokenStream`, `LEXER_STEPWISE` reads token with the `_read_*`
+# helpers step by step, `LEXER_REGEX` gets a token with one match of a master 
+# regex, the tokens are the same
+LEXER_STEPWISE = "stepwise"
+LEXER_REGEX = "regex"
+
+class TokenTable(namedtuple("TokenTable", 
+                            ["texts", "kinds", "starts", "ends", "index"])):
+    """ Tokens of the whole stream in parallel arrays
+
+    Attributes:
+        texts(list): token strings, the same as returned by `peek`
+        kinds(array): `TOKEN_KIND_*` of each token
+        starts(array): offset of the first char of each token
+        ends(array): offset right after each token, where the next scan begins
+        index(array): token index for every offset of the stream, offsets 
+            before a token (spaces included) points to it, offsets inside a 
+            token are -1, and offsets after the last token are `len(texts)`
+    """
+    __slots__ = ()
+
+
 class LatexTokenStream(Stream):
     """ Latex string tokenizer """
     invalid_char = {
@@ -21,27 +53,99 @@ class LatexTokenStream(Stream):
         "log": "\\log",
     }
     
-    continue_alpha = re.compile(r"^\\[A-Za-z]+")
     continue_alpha_num = re.compile(r"^\\[A-Za-z0-9]+")
     discrete_alpha_num = re.compile(r"^( )+[A-Za-z0-9]+( )+[A-Za-z0-9]+")
-    double_slash = re.compile(r"^\\\\")
+
+    # Patterns below are used as `pattern.match(stream, pos)`, so no `^`
+    _invalid = "[{}]*".format(re.escape("".join(sorted(invalid_char))))
+    invalid_chars = re.compile(_invalid)
+    continue_alpha = re.compile(r"\\[A-Za-z]+")
+    double_slash = re.compile(r"\\\\")
+    # successive chars are read with invalid chars skipped, the ascii 
+    # patterns are the fast path of `str.isnumeric`, `str.isupper`, etc.
+    alpha_num = re.compile(r"(?:[^\W_]|\.)(?:{}(?:[^\W_]|\.))*".format(_invalid))
+    ascii_alpha = re.compile(r"[A-Za-z](?:{}[A-Za-z])*".format(_invalid))
+    ascii_num = re.compile(r"[0-9.](?:{}[0-9.])*".format(_invalid))
+    ascii_upper_alpha = re.compile(r"[A-Z](?:{}[A-Z])*".format(_invalid))
+    further_tokenize_re = re.compile(r"[ a-zA-Z0-9]+")
+    complete_token_re = {
+        test_token: re.compile(r"\s*".join(test_token))
+        for test_token in complete_token_mapper
+    }
+
+    # Master regexes for `LEXER_REGEX`. Only ascii numbers and capital letters
+    # are matched here, token meeting non-ascii chars of `unicode` is read
+    # by the stepwise readers to follow `str.isnumeric` and `str.isupper`
+    _valid = "[^{}]".format(re.escape("".join(sorted(invalid_char))))
+    _command = r"(?P<line_break>\\\\)|(?P<command>\\(?:[A-Za-z]+|.)?)"
+    token_re = re.compile(
+        r"{invalid}(?:{command}"
+        r"|(?P<number>[0-9](?:{invalid}[0-9.])*)(?!{invalid}(?:[^\W_]|\.))"
+        r"|(?P<alpha_num>[^\W_](?:{invalid}(?:[^\W_]|\.))*)"
+        r"|(?P<symbol>{valid}))".format(
+            invalid=_invalid, valid=_valid, command=_command), 
+        re.DOTALL
+    )
+    frag_token_re = re.compile(
+        r"{invalid}(?:{command}"
+        r"|(?P<number>[0-9](?:{invalid}[0-9.])*)(?P<number_unicode>{invalid}[^\x00-\x7f])?"
+        r"|(?P<upper_alpha>[A-Z](?:{invalid}[A-Z])*)(?P<upper_unicode>{invalid}[^\x00-\x7f])?"
+        r"|(?P<unicode>[^\x00-\x7f])"
+        r"|(?P<symbol>{valid}))".format(
+            invalid=_invalid, valid=_valid, command=_command), 
+        re.DOTALL
+    )
 
     def __init__(self, 
                  latex_str: str, 
                  normalize_token=None, 
                  ignore_similar_despite_capital: bool = False,
                  keep_left_right_marker: bool = True,
-                 strip_angle: bool = False):
+                 strip_angle: bool = False,
+                 pretokenize: bool = False,
+                 lexer: str = LEXER_STEPWISE,
+                 token_mapper: dict = None,
+                 invalid_tokens: frozenset = None):
 
         self._stream = latex_str
         self._current_idx = 0
         self._peek_delta_idx = 0
 
+        # if `pretokenize`, the stream is tokenized once into `TokenTable`,
+        # then peeking at a token boundary is just an index lookup
+        self._pretokenize = pretokenize
+        self._token_tables = {}
+
+        # results of peeking at `_lookahead_status`, which is the current 
+        # offset and `strip_angle`, reset once the status changes
+        self._lookahead = {}
+        self._lookahead_status = None
+        self._lookahead_hits = 0
+        self._lookahead_misses = 0
+
+        if lexer == LEXER_STEPWISE:
+            self._get_token_funcs = {False: self._get_token, True: self._get_frag_token}
+        elif lexer == LEXER_REGEX:
+            self._get_token_funcs = {
+                False: self._match_token, True: self._match_frag_token
+            }
+        else:
+            raise ValueError("Invalid lexer: {}, only {} and {} supported".format(
+                                 lexer, LEXER_STEPWISE, LEXER_REGEX))
+
         self._normalize_token = normalize_token
         self.ignore_similar_despite_capital = ignore_similar_despite_capital
         self.keep_left_right_marker = keep_left_right_marker
         self.strip_angle = strip_angle
 
+        # precomputed `mapping.token_mapping.get_token_mapper` and 
+        # `get_invalid_tokens` could be given to save the lookups per token
+        self._token_mapper = token_mapper
+        self._invalid_tokens = (
+            invalid_tokens if invalid_tokens is not None 
+            else get_invalid_tokens(keep_left_right_marker)
+        )
+
         if self._normalize_token:
             self._stream = normalize_sentence_char(self._stream)
 
@@ -59,62 +163,94 @@ class LatexTokenStream(Stream):
 
     @check_stream_idx_valid
     def peek(self):
-        token = self._peek_one_token()
-        while token is not None and not self.is_valid_token(token):
-            self._read_one_token()
-            token = self._peek_one_token()
-
-        return token
+        return self._peek_with_lookahead(("token", False), self._peek_valid_token, False)
 
     @check_stream_idx_valid
     def peek_frag(self):
-        token = self._peek_one_frag_token()
+        return self._peek_with_lookahead(("token", True), self._peek_valid_token, True)
+
+    def _peek_valid_token(self, frag: bool):
+        token = self._peek_token(frag)
         while token is not None and not self.is_valid_token(token):
             self._read_one_token()
-            token = self._peek_one_frag_token()
+            token = self._peek_token(frag)
 
         return token
 
+    def _peek_with_lookahead(self, key, peek_func, *args):
+        """ Return what `peek_func` peeks, and cache it for the current status
+        with `key`. `_peek_delta_idx` is cached as well for reading
+        """
+        lookahead = self._get_lookahead()
+        if key in lookahead:
+            self._lookahead_hits += 1
+            token, self._peek_delta_idx = lookahead[key]
+            return token
+
+        self._lookahead_misses += 1
+        token = peek_func(*args)
+        # the stream might be forwarded while skipping invalid tokens
+        self._get_lookahead()[key] = (token, self._peek_delta_idx)
+
+        return token
+
+    def _get_lookahead(self) -> dict:
+        status = (self._current_idx, self.strip_angle)
+        if status != self._lookahead_status:
+            self._lookahead = {}
+            self._lookahead_status = status
+
+        return self._lookahead
+
     def _read_one_token(self):
         token = self._peek_one_token()
         self._current_idx += self._peek_delta_idx
         return token
 
     def _peek_one_token(self):
-        next_token, peek_delta_idx = (
-            self._get_token(self._stream[self._current_idx:])
-        )
-        
-        next_token, self._peek_delta_idx = (
-            self.further_tokenize(next_token, peek_delta_idx)
-        )
-
-        if next_token == '':
-            return None
-        else:
-            if self._normalize_token:
-                next_token = normalize_token(next_token)
-            if self.ignore_similar_despite_capital:
-                next_token = lower_token(next_token)
-            return next_token
+        return self._peek_token(frag=False)
 
     def _peek_one_frag_token(self):
-        next_token, peek_delta_idx = (
-            self._get_frag_token(self._stream[self._current_idx:])
-        )
-        
+        return self._peek_token(frag=True)
+
+    def _peek_token(self, frag: bool):
+        if self._pretokenize and self._current_idx <= len(self._stream):
+            table = self.get_token_table(frag=frag)
+            token_idx = table.index[self._current_idx]
+            if token_idx == len(table.texts):
+                self._peek_delta_idx = 0
+                return None
+            elif token_idx >= 0:
+                self._peek_delta_idx = table.ends[token_idx] - self._current_idx
+                return table.texts[token_idx]
+
+        # not pretokenized, or points to the middle of a token after 
+        # `read_one_char` or `read_with_re`
         next_token, self._peek_delta_idx = (
-            self.further_tokenize(next_token, peek_delta_idx)
+            self._scan_token(self._current_idx, frag)
         )
-
         if next_token == '':
             return None
         else:
-            if self._normalize_token:
-                next_token = normalize_token(next_token)
-            if self.ignore_similar_despite_capital:
-                next_token = lower_token(next_token)
-            return next_token
+            return self._map_token(next_token)
+
+    def _scan_token(self, start_idx: int, frag: bool) -> Tuple[str, int]:
+        """ Scan token begins from `start_idx`, return the token before mapping
+        and its length (leading spaces included)
+        """
+        next_token, delta_idx = self._get_token_funcs[frag](start_idx)
+
+        return self.further_tokenize(next_token, delta_idx, start_idx=start_idx)
+
+    def _map_token(self, token: str) -> str:
+        if self._token_mapper is not None:
+            return self._token_mapper.get(token, token)
+
+        if self._normalize_token:
+            token = normalize_token(token)
+        if self.ignore_similar_despite_capital:
+            token = lower_token(token)
+        return token
 
     @check_stream_idx_valid
     def read_with_re(self, pattern):
@@ -130,13 +266,18 @@ class LatexTokenStream(Stream):
         if isinstance(pattern, str):
             pattern = re.compile(pattern)
 
+        return self._peek_with_lookahead(("re", pattern), self._peek_with_re, pattern)
+
+    def _peek_with_re(self, pattern):
         char, delta_idx = self._read_until_valid()
         if char is None:
             return None
         self._peek_delta_idx = delta_idx
         # self._current_idx += delta_idx
 
-        result = pattern.match(self._stream[self._current_idx+delta_idx:])
+        result = get_unanchored_pattern(pattern).match(
+            self._stream, self._current_idx + delta_idx
+        )
 
         if result is None:
             return None
@@ -152,21 +293,29 @@ class LatexTokenStream(Stream):
 
     @check_stream_idx_valid
     def peek_one_char(self):
+        return self._peek_with_lookahead(("char", ), self._peek_char)
+
+    def _peek_char(self):
         char, delta_idx = self._peek_one_char()
         self._peek_delta_idx = delta_idx
 
         return char
 
     def _peek_one_char(self):
-        delta_idx = 0
-        char = None
-        for idx, _char in enumerate(self._stream[self._current_idx:]):
-            delta_idx = idx + 1
-            if _char not in self.invalid_char:
-                char = _char
-                break
+        if self._pretokenize:
+            table = self.get_token_table()
+            token_idx = table.index[self._current_idx]
+            if token_idx == len(table.texts):
+                return None, len(self._stream) - self._current_idx
+            elif token_idx >= 0:
+                start_idx = table.starts[token_idx]
+                return self._stream[start_idx], start_idx + 1 - self._current_idx
 
-        return char, delta_idx
+        char_idx = self.invalid_chars.match(self._stream, self._current_idx).end()
+        if char_idx == len(self._stream):
+            return None, char_idx - self._current_idx
+
+        return self._stream[char_idx], char_idx + 1 - self._current_idx
 
     @check_stream_idx_valid
     def read_one_char(self):
@@ -176,11 +325,11 @@ class LatexTokenStream(Stream):
         return char
 
     def _read_until_valid(self):
-        for idx, char in enumerate(self._stream[self._current_idx:]):
-            if char not in self.invalid_char:
-                return char, idx
+        char_idx = self.invalid_chars.match(self._stream, self._current_idx).end()
+        if char_idx == len(self._stream):
+            return None, None
 
-        return None, None
+        return self._stream[char_idx], char_idx - self._current_idx
 
     def get_all_tokens(self):
         tokens = []
@@ -201,9 +350,8 @@ class LatexTokenStream(Stream):
         return tokens
 
     def is_valid_token(self, token: str):
-        if not self.keep_left_right_marker:
-            if is_left_marker(token) or is_right_marker(token):
-                return False
+        if token in self._invalid_tokens:
+            return False
 
         if self.strip_angle:
             if is_angle_marker(token):
@@ -211,11 +359,15 @@ class LatexTokenStream(Stream):
         
         return True
 
-    def further_tokenize(self, token: str, delta_idx: int) -> Tuple[str, int]:
+    def further_tokenize(self, token: str, delta_idx: int, 
+                         start_idx: int = None) -> Tuple[str, int]:
         """ seperated sinx -> \sin x """
         if not self.is_token_to_further_tokenize(token):
             return token, delta_idx
 
+        if start_idx is None:
+            start_idx = self._current_idx
+
         len_token = len(token)
         for test_token, target_token in self.complete_token_mapper.items():
             if test_token not in token:
@@ -225,22 +377,21 @@ class LatexTokenStream(Stream):
             if test_token in {"sin", "cos", "tan"} and "arc"+test_token in token:
                 continue
 
-            search_result = self.match_with_inserted_empty_space(
-                test_token, 
-                self._stream[self._current_idx: self._current_idx+delta_idx]
+            search_result = self.complete_token_re[test_token].search(
+                self._stream, start_idx, start_idx + delta_idx
             )
             test_idx = token.index(test_token)
             if test_idx == -1:
                 continue
             elif test_idx > 0:
-                return token[:test_idx], search_result.span()[0]
+                return token[:test_idx], search_result.start() - start_idx
             elif test_idx == 0:
-                return target_token, search_result.span()[1]
+                return target_token, search_result.end() - start_idx
 
         return token, delta_idx
 
     def is_token_to_further_tokenize(self, token: str) -> bool:
-        return re.match("[ a-zA-Z0-9]+", token) is not None
+        return self.further_tokenize_re.match(token) is not None
 
     def match_with_inserted_empty_space(self, pattern: str, token: str): 
         pattern = "\s*".join(list(pattern))
@@ -250,6 +401,71 @@ class LatexTokenStream(Stream):
     def get_stream_str(self):
         return self._stream
 
+    def get_lookahead_stats(self) -> dict:
+        """ Hits and misses of peeking at the same status repeatedly """
+        total = self._lookahead_hits + self._lookahead_misses
+        return {
+            "hits": self._lookahead_hits,
+            "misses": self._lookahead_misses,
+            "hit_rate": self._lookahead_hits / total if total else 0.0,
+        }
+
+    def get_token_table(self, frag: bool = False) -> TokenTable:
+        """ Tokenize the whole stream once, the table is cached by `frag` """
+        table = self._token_tables.get(frag)
+        if table is None:
+            table = self._build_token_table(frag)
+            self._token_tables[frag] = table
+
+        return table
+
+    def _build_token_table(self, frag: bool) -> TokenTable:
+        len_stream = len(self._stream)
+        texts, kinds = [], array('b')
+        starts, ends = array('l'), array('l')
+        index = array('l', [-1]) * (len_stream + 1)
+
+        start_idx = 0
+        while start_idx < len_stream:
+            token, delta_idx = self._scan_token(start_idx, frag)
+            if token == '':
+                break
+
+            # offsets of leading spaces and the first char point to the token
+            token_start_idx = self.invalid_chars.match(self._stream, start_idx).end()
+            if token_start_idx == start_idx:
+                index[start_idx] = len(texts)
+            else:
+                index[start_idx:token_start_idx + 1] = array(
+                    'l', [len(texts)]
+                ) * (token_start_idx + 1 - start_idx)
+
+            texts.append(self._map_token(token))
+            kinds.append(self._get_token_kind(token, frag))
+            starts.append(token_start_idx)
+            ends.append(start_idx + delta_idx)
+            start_idx += delta_idx
+
+        index[start_idx:] = array('l', [len(texts)]) * (len_stream + 1 - start_idx)
+
+        return TokenTable(texts, kinds, starts, ends, index)
+
+    @staticmethod
+    def _get_token_kind(token: str, frag: bool) -> int:
+        if token == '\\\\':
+            return TOKEN_KIND_LINE_BREAK
+        elif token.startswith('\\'):
+            return TOKEN_KIND_COMMAND
+        elif token[0].isnumeric() and (
+                frag or all(char.isnumeric() or char == '.' for char in token)):
+            return TOKEN_KIND_NUMBER
+        elif frag and token[0].isalpha() and token[0].isupper():
+            return TOKEN_KIND_UPPER_ALPHA
+        elif not frag and token[0].isalnum():
+            return TOKEN_KIND_ALPHA_NUM
+        else:
+            return TOKEN_KIND_SYMBOL
+
     # ================== Status Controller ==========================
     def reset_stream(self):
         self._current_idx = 0
@@ -261,123 +477,164 @@ class LatexTokenStream(Stream):
     def disable_strip_angle(self):
         self.strip_angle = False
 
-    def _get_frag_token(self, input_str: str):
-        if input_str == '':
-            return '', 0
+    def _get_frag_token(self, start_idx: int):
+        """ Get token begins from `start_idx`, successive numbers or capital 
+        letters are treated as one token
 
-        start_idx, end_idx = 0, 0
-        for idx, char in enumerate(input_str):
-            if char in self.invalid_char:
-                continue
+        Returns:
+            tuple, token with invalid chars removed, and its length from
+            `start_idx`, ('', 0) if no token left
+        """
+        idx = self.invalid_chars.match(self._stream, start_idx).end()
+        if idx == len(self._stream):
+            return '', 0
 
-            start_idx, end_idx = idx, idx
-            if char == '\\':
-                alpha_idx = self._read_continue_alpha(input_str[start_idx:])
-                slash_idx = self._read_slash(input_str[start_idx:])
-                one_sign_idx = 2
-                end_idx = max(alpha_idx, slash_idx, one_sign_idx) + start_idx
-
-            elif char.isnumeric():
-                end_idx = self._read_num(input_str[start_idx:]) + start_idx
-                
-            elif char.isalpha() and char.isupper():
-                end_idx = self._read_upper_alpha(input_str[start_idx:]) + start_idx
-                
-            else:
-                end_idx += 1
+        char = self._stream[idx]
+        if char == '\\':
+            end_idx = max(self._read_continue_alpha(idx), self._read_slash(idx), idx + 2)
+        elif char.isnumeric():
+            end_idx = self._read_num(idx)
+        elif char.isalpha() and char.isupper():
+            end_idx = self._read_upper_alpha(idx)
+        else:
+            end_idx = idx + 1
 
-            break
+        return self._get_valid_str(idx, end_idx), end_idx - start_idx
 
-        return input_str[start_idx:end_idx].replace(' ', ''), end_idx
+    def _get_token(self, start_idx: int):
+        """ Get token begins from `start_idx`, successive letters and numbers
+        are treated as one token
 
-    def _get_token(self, input_str: str):
-        if input_str == '':
+        Returns:
+            tuple, token with invalid chars removed, and its length from
+            `start_idx`, ('', 0) if no token left
+        """
+        idx = self.invalid_chars.match(self._stream, start_idx).end()
+        if idx == len(self._stream):
             return '', 0
 
-        start_idx, end_idx = 0, 0
-        for idx, char in enumerate(input_str):
-            if char in self.invalid_char:
-                continue
+        char = self._stream[idx]
+        if char == '\\':
+            end_idx = max(self._read_continue_alpha(idx), self._read_slash(idx), idx + 2)
+        elif char.isalnum():
+            end_idx = self._read_alpha_num(idx)
+        else:
+            end_idx = idx + 1
 
-            start_idx, end_idx = idx, idx
-            if char == '\\':
-                alpha_idx = self._read_continue_alpha(input_str[start_idx:])
-                slash_idx = self._read_slash(input_str[start_idx:])
-                one_sign_idx = 2
-                end_idx = max(alpha_idx, slash_idx, one_sign_idx) + start_idx
-                
-            elif char.isalnum():
-                end_idx = self._read_alpha_num(input_str[start_idx:]) + start_idx
-                
-            else:
-                end_idx += 1
+        return self._get_valid_str(idx, end_idx), end_idx - start_idx
+
+    def _match_token(self, start_idx: int):
+        """ `_get_token` with one match of `token_re` """
+        match_result = self.token_re.match(self._stream, start_idx)
+        if match_result is None:
+            return '', 0
 
-            break
+        group = match_result.lastgroup
+        idx, end_idx = match_result.span(group)
+        if group == "command":
+            # `_get_token` reads 2 chars for `\` at the end
+            end_idx = max(end_idx, idx + 2)
 
-        return input_str[start_idx:end_idx].replace(' ', ''), end_idx
+        return self._get_valid_str(idx, end_idx), end_idx - start_idx
 
-    def _read_continue_alpha(self, input_str: str):
-        match_result = self.continue_alpha.search(input_str)
+    def _match_frag_token(self, start_idx: int):
+        """ `_get_frag_token` with one match of `frag_token_re` """
+        match_result = self.frag_token_re.match(self._stream, start_idx)
         if match_result is None:
-            return 0
-        else:
-            return match_result.span()[1]
+            return '', 0
 
-    def _read_alpha(self, input_str: str):
-        return_idx = -1
-        for idx, char in enumerate(input_str):
-            if char in self.invalid_char:
-                continue
+        group = match_result.lastgroup
+        if group in {"unicode", "number_unicode", "upper_unicode"}:
+            return self._get_frag_token(start_idx)
 
-            if char.isalpha():
-                return_idx = idx
-            else:
-                break
+        idx, end_idx = match_result.span(group)
+        if group == "command":
+            end_idx = max(end_idx, idx + 2)
 
-        return return_idx + 1
+        return self._get_valid_str(idx, end_idx), end_idx - start_idx
 
-    def _read_alpha_num(self, input_str: str):
-        return_idx = -1
-        for idx, char in enumerate(input_str):
-            if char in self.invalid_char:
-                continue
+    def _get_valid_str(self, start_idx: int, end_idx: int) -> str:
+        valid_str = self._stream[start_idx:end_idx]
+        for char in self.invalid_char:
+            if char in valid_str:
+                valid_str = valid_str.replace(char, '')
 
-            if char.isalnum() or char == '.':
-                return_idx = idx
-            else:
-                break
+        return valid_str
 
-        return return_idx + 1
+    # `_read_*` return the end offset of what is read from `start_idx`, 
+    # `start_idx` is returned if nothing read
 
-    def _read_slash(self, input_str: str):
-        match_result = self.double_slash.search(input_str)
+    def _read_continue_alpha(self, start_idx: int) -> int:
+        match_result = self.continue_alpha.match(self._stream, start_idx)
         if match_result is None:
-            return 0
+            return start_idx
         else:
-            return match_result.span()[1]
+            return match_result.end()
 
-    def _read_upper_alpha(self, input_str: str):
-        return_idx = -1
-        for idx, char in enumerate(input_str):
-            if char in self.invalid_char:
-                continue
+    def _read_slash(self, start_idx: int) -> int:
+        match_result = self.double_slash.match(self._stream, start_idx)
+        if match_result is None:
+            return start_idx
+        else:
+            return match_result.end()
 
-            if char.isalpha() and char.isupper():
-                return_idx = idx
-            else:
-                break
+    def _read_alpha(self, start_idx: int) -> int:
+        return self._read_successive(
+            start_idx, self.ascii_alpha, lambda char: char.isalpha()
+        )
+
+    def _read_alpha_num(self, start_idx: int) -> int:
+        match_result = self.alpha_num.match(self._stream, start_idx)
+        if match_result is None:
+            return start_idx
+        else:
+            return match_result.end()
 
-        return return_idx + 1
+    def _read_upper_alpha(self, start_idx: int) -> int:
+        return self._read_successive(
+            start_idx, self.ascii_upper_alpha, 
+            lambda char: char.isalpha() and char.isupper()
+        )
 
-    def _read_num(self, input_str: str):
-        return_idx = -1
-        for idx, char in enumerate(input_str):
-            if char in self.invalid_char:
-                continue
+    def _read_num(self, start_idx: int) -> int:
+        return self._read_successive(
+            start_idx, self.ascii_num, lambda char: char.isnumeric() or char == "."
+        )
 
-            if char.isnumeric() or char == ".":
-                return_idx = idx
+    def _read_successive(self, start_idx: int, ascii_pattern, 
+                         is_valid: Callable[[str], bool]) -> int:
+        """ Read chars fulfilling `is_valid` from `start_idx`, invalid chars
+        are skipped. `ascii_pattern` reads the ascii ones at once, and the 
+        rest non-ascii chars are checked one by one
+        """
+        end_idx = idx = start_idx
+        while idx < len(self._stream):
+            match_result = ascii_pattern.match(self._stream, idx)
+            if match_result is not None:
+                end_idx = match_result.end()
+            elif self._stream[idx] >= '\x80' and is_valid(self._stream[idx]):
+                end_idx = idx + 1
             else:
                 break
 
-        return return_idx + 1
+            idx = self.invalid_chars.match(self._stream, end_idx).end()
+
+        return end_idx
+
+
+_unanchored_pattern_cache = {}
+
+
+def get_unanchored_pattern(pattern):
+    """ Strip the leading `^` of `pattern`. `^` never matches `pattern.match(
+    string, pos)` with pos > 0, though `pattern.match` is anchored at pos itself
+    """
+    if not pattern.pattern.startswith("^"):
+        return pattern
+
+    unanchored_pattern = _unanchored_pattern_cache.get(pattern)
+    if unanchored_pattern is None:
+        unanchored_pattern = re.compile(pattern.pattern[1:], pattern.flags)
+        _unanchored_pattern_cache[pattern] = unanchored_pattern
+
+    return unanchored_pattern
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+
+from ..aio import AsyncNormalizer, anormalize, anormalize_sentence
+from ..exceptions.syntax_exception import LatexSyntaxError
+from ..normalize import normalize_latex_expression, normalize_latex_in_sentence
+
+
+class TestAsyncNormalizer(unittest.TestCase):
+    latex_list = [r"\frac12", r"x^2_3", r"\sqrt2", r"a+b"] * 5
+
+    def test_anormalize(self):
+        async def run():
+            result_list = await asyncio.gather(*[
+                anormalize(latex, normalize_token=True) for latex in self.latex_list
+            ])
+            sentence = await anormalize_sentence("已知$\\frac12$")
+            # the same type as `normalize_latex_expression`
+            with self.assertRaises(LatexSyntaxError):
+                await anormalize(r"\frac{1}{2")
+            async with AsyncNormalizer(workers=1) as normalizer:
+                with self.assertRaises(LatexSyntaxError):
+                    await normalizer.normalize(r"\frac{1}{2")
+            return result_list, sentence
+
+        # a new loop for each run
+        for _ in range(2):
+            result_list, sentence = asyncio.run(run())
+            self.assertEqual(result_list, [
+                normalize_latex_expression(latex, normalize_token=True)
+                for latex in self.latex_list
+            ])
+            self.assertEqual(sentence, normalize_latex_in_sentence("已知$\\frac12$"))
+
+    def test_micro_batch(self):
+        async def run():
+            async with AsyncNormalizer(workers=1, batch_window=0.05, max_batch_size=8) as normalizer:
+                result_list = await asyncio.gather(*[
+                    normalizer.normalize(latex) for latex in self.latex_list
+                ])
+                return result_list, normalizer.get_stats()
+
+        result_list, stats = asyncio.run(run())
+        self.assertEqual(result_list, [normalize_latex_expression(latex) for latex in self.latex_list])
+        self.assertEqual((stats["requests"], stats["batches"]), (20, 3))
+
+    def test_backpressure(self):
+        async def run():
+            async with AsyncNormalizer(workers=1, max_batch_size=2, max_pending=1,
+                                       max_in_flight=1) as normalizer:
+                task_list = [
+                    asyncio.ensure_future(normalizer.normalize(latex)) for latex in self.latex_list
+                ]
+                await asyncio.sleep(0)
+                # at most one request is queued
+                self.assertLessEqual(normalizer.get_stats()["queued"], 1)
+                return await asyncio.gather(*task_list)
+
+        self.assertEqual(
+            asyncio.run(run()), [normalize_latex_expression(latex) for latex in self.latex_list]
+        )
+
+    def test_cancel(self):
+        async def run():
+            async with AsyncNormalizer(workers=1, batch_window=0.05) as normalizer:
+                task_list = [
+                    asyncio.ensure_future(normalizer.normalize(latex)) for latex in self.latex_list
+                ]
+                await asyncio.sleep(0)
+                task_list[0].cancel()
+                result_list = await asyncio.gather(*task_list[1:])
+                self.assertTrue(task_list[0].cancelled())
+                return result_list, normalizer.get_stats()
+
+        result_list, stats = asyncio.run(run())
+        self.assertEqual(
+            result_list, [normalize_latex_expression(latex) for latex in self.latex_list[1:]]
+        )
+        self.assertEqual(stats["cancelled"], 1)
@@ -0,0 +1,134 @@
+import unittest
+
+from ..batch import (
+    normalize_batch, normalize_sentence_batch, normalize_sentences, NormalizeError,
+    CostAwareScheduler,
+    estimate_cost, SCHEDULER_COST, TRANSPORT_PACKED
+)
+from ..normalize import normalize_latex_expression, normalize_latex_in_sentence
+
+
+class TestBatch(unittest.TestCase):
+    def test_normalize_batch(self):
+        latex_list = [r"\frac12", r"\frac{1}{2", r"x\geqslant y", r"\sqrt2"] * 5
+
+        for workers, chunksize in ((1, None), (2, None), (3, 2)):
+            result_list = normalize_batch(
+                latex_list, workers=workers, chunksize=chunksize, normalize_token=True
+            )
+            self.assertEqual(len(result_list), len(latex_list))
+            for latex, result in zip(latex_list, result_list):
+                if latex == r"\frac{1}{2":
+                    self.assertIsInstance(result, NormalizeError)
+                    self.assertEqual(result.exception_type, "LatexSyntaxError")
+                else:
+                    self.assertEqual(
+                        result, normalize_latex_expression(latex, normalize_token=True)
+                    )
+
+        self.assertEqual(normalize_batch([], workers=2), [])
+        self.assertEqual(
+            normalize_batch([r"\frac{1}{2"], ensure_valid_formula=False), [r"\frac { 1 } { 2"]
+        )
+
+    def test_normalize_sentence_batch(self):
+        sentence_list = ["长$64m$", "包含中文$\\frac12$的公式", "无公式"] * 3
+        self.assertEqual(
+            normalize_sentence_batch(iter(sentence_list), workers=2, keep_rm_sign=False),
+            [normalize_latex_in_sentence(sentence, keep_rm_sign=False) 
+             for sentence in sentence_list]
+        )
+
+    def test_normalize_sentences(self):
+        sentence_list = ["长$64$米", "已知$x$与$\\frac12$", "无公式", "$x$且$\\frac{1}{2$"] * 5
+        for workers in (1, 2):
+            result_list, stats = normalize_sentences(
+                iter(sentence_list), workers=workers, keep_rm_sign=False
+            )
+            self.assertEqual(len(result_list), len(sentence_list))
+            for sentence, result in zip(sentence_list, result_list):
+                if sentence.endswith("\\frac{1}{2$"):
+                    self.assertEqual(result.exception_type, "LatexSyntaxError")
+                else:
+                    self.assertEqual(
+                        result, normalize_latex_in_sentence(sentence, keep_rm_sign=False)
+                    )
+            self.assertEqual(stats, {
+                "sentences": 20, "formulas": 25, "unique_formulas": 4, "dedup_ratio": 1 - 4 / 25
+            })
+
+        self.assertEqual(normalize_sentences([]), ([], {
+            "sentences": 0, "formulas": 0, "unique_formulas": 0, "dedup_ratio": 0.0
+        }))
+
+    def test_cost_scheduler(self):
+        latex_list = [r"x", r"\frac{1}{2", r"\begin{array}{l}x \\ y\end{array}" * 20] * 4
+        self.assertEqual(
+            normalize_batch(latex_list, workers=2, scheduler=SCHEDULER_COST),
+            normalize_batch(latex_list, workers=1)
+        )
+
+    def test_packed_transport(self):
+        latex_list = [r"x", r"\frac{1}{2", r"\begin{array}{l}x \\ y\end{array}" * 20] * 4
+        expected_list = normalize_batch(latex_list, workers=1)
+        for scheduler in ("fixed", SCHEDULER_COST):
+            for shared_memory_threshold in (None, 0):
+                self.assertEqual(
+                    normalize_batch(
+                        latex_list, workers=2, scheduler=scheduler,
+                        transport=TRANSPORT_PACKED,
+                        shared_memory_threshold=shared_memory_threshold
+                    ),
+                    expected_list
+                )
+
+        sentence_list = ["长$64m$", "包含中文$\\frac12$的公式", ""] * 3
+        self.assertEqual(
+            normalize_sentence_batch(sentence_list, workers=2, transport=TRANSPORT_PACKED),
+            normalize_sentence_batch(sentence_list, workers=1)
+        )
+
+    def test_invalid_options(self):
+        with self.assertRaises(TypeError):
+            normalize_batch([r"\frac12"], workers=2, unknown_option=True)
+        with self.assertRaises(ValueError):
+            normalize_batch([r"\frac12"], workers=2, scheduler="unknown")
+        with self.assertRaises(ValueError):
+            normalize_batch([r"\frac12"], workers=2, transport="unknown")
+
+
+class TestCostAwareScheduler(unittest.TestCase):
+    def test_estimate_cost(self):
+        self.assertEqual(estimate_cost("x"), 1)
+        self.assertGreater(estimate_cost(r"\frac{1}{2}"), len(r"\frac{1}{2}"))
+        self.assertGreater(
+            estimate_cost(r"\begin{cases}x\end{cases}"), len(r"\begin{cases}x\end{cases}")
+        )
+
+    def test_next_chunk(self):
+        cost_list = [1, 100, 2, 50, 3, 1, 1, 1]
+        scheduler = CostAwareScheduler(cost_list, workers=2)
+
+        chunk_list = []
+        while scheduler.has_next():
+            chunk_list.append(scheduler.next_chunk())
+
+        # longest first, every item once
+        self.assertEqual(chunk_list[0], [1])
+        self.assertEqual(sorted(sum(chunk_list, [])), list(range(len(cost_list))))
+        chunk_cost_list = [sum(cost_list[idx] for idx in chunk) for chunk in chunk_list]
+        self.assertEqual(chunk_cost_list, sorted(chunk_cost_list, reverse=True))
+
+    def test_observe(self):
+        scheduler = CostAwareScheduler([1] * 1000, workers=1, min_latency=0.1)
+        self.assertEqual(len(scheduler.next_chunk()), 250)
+
+        # 1ms per item, so at least 100 items in a chunk
+        scheduler.observe(list(range(10)), 0.01)
+        self.assertEqual(len(scheduler.next_chunk()), 188)
+        for _ in range(5):
+            self.assertGreaterEqual(len(scheduler.next_chunk()), 100)
+
+        scheduler = CostAwareScheduler([1] * 1000, workers=1, max_latency=0.1)
+        scheduler.observe(list(range(10)), 0.1)
+        self.assertEqual(len(scheduler.next_chunk()), 10)
@@ -1,7 +1,10 @@
+import json
+import os
+import tempfile
 import unittest
 
 from xizi_latex_normalizer.utils.common_utils import (
-    trans_chinese_unit_to_latex, split_to_latex_and_not
+    trans_chinese_unit_to_latex, split_to_latex_and_not, load_chinese_units, scan_sentence
 )
 
 
@@ -57,3 +60,55 @@ class TestCommon(unittest.TestCase):
             trans_chinese_unit_to_latex("房间面积为$5$平方米"),
             r"房间面积为$5 \rm m^2$"
         )
+
+        self.assertEqual(
+            trans_chinese_unit_to_latex("体积为$5$立方米"),
+            r"体积为$5 \rm m^3$"
+        )
+
+        # the longest unit is matched
+        self.assertEqual(
+            trans_chinese_unit_to_latex("速度为$3$米每秒，距离为$2$千米"),
+            r"速度为$3 \rm m/s$，距离为$2 \rm km$"
+        )
+
+        self.assertEqual(
+            trans_chinese_unit_to_latex("速度为$3$千米每小时"),
+            r"速度为$3 \rm km/h$"
+        )
+
+    def test__load_units(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_path = os.path.join(temp_dir, "units.json")
+            with open(data_path, "w", encoding="utf-8") as wfile:
+                json.dump({"units": {"光年": "ly", "华氏度": "^{\\circ}F"},
+                           "units_without_rm": ["华氏度"]}, wfile)
+
+            try:
+                load_chinese_units(data_path)
+                self.assertEqual(
+                    trans_chinese_unit_to_latex("$2$光年，$5$华氏度，$3$米"),
+                    r"$2 \rm ly$，$5 ^{\circ}F$，$3$米"
+                )
+            finally:
+                load_chinese_units()
+
+        self.assertEqual(trans_chinese_unit_to_latex("$3$米"), r"$3 \rm m$")
+
+    def test__scan(self):
+        # the same as splitting after translating units for formulas braced by $
+        for sent in ("其中\\$\\$米$64$米的长度", r"测\$试$a\$bc$测\$试$de\$f$",
+                     "测试$abc$$def$米", "水温为$5$度", "答案为$$"):
+            self.assertEqual(
+                scan_sentence(sent)[0], split_to_latex_and_not(trans_chinese_unit_to_latex(sent))
+            )
+
+        self.assertEqual(
+            scan_sentence(r"$$a$$米\(b\)\[c\]\(d"),
+            (["", r"a \rm m", "", "b", "", "c", r"\(d"],
+             [("$$", "$$"), ("\\(", "\\)"), ("\\[", "\\]")])
+        )
+        self.assertEqual(
+            scan_sentence("$64$米", trans_unit=False), (["", "64", "米"], [("$", "$")])
+        )
+        self.assertEqual(scan_sentence("x$a"), (["x", "$a", ""], [("$", "")]))
@@ -0,0 +1,64 @@
+import unittest
+
+from ..components import (
+    COMPONENT_MAPPER, COMPONENT_DISPATCH_INDEX, BaseComponent, OtherComponent,
+    MoninalComponent, SineFunctionComponent, BraceComponent
+)
+from ..components.component_factory import ComponentFactory
+from ..stream import LatexTokenStream
+
+
+class TestComponentFactory(unittest.TestCase):
+    def _get_matched_component_one_by_one(self, stream):
+        for comp in COMPONENT_MAPPER.values():
+            if comp != OtherComponent and comp.test_token_matched(stream):
+                return comp
+
+        return OtherComponent
+
+    def test_get_matched_component(self):
+        latex_list = [
+            r"\sin x", r"2x", r"\pi", r"{a}", r"\frac12", r"+", r"\unknown", 
+            r"other", r"BaseBraceComponent", r"\left(", "",
+        ]
+        for latex in latex_list:
+            self.assertEqual(
+                ComponentFactory.get_matched_component(LatexTokenStream(latex)),
+                self._get_matched_component_one_by_one(LatexTokenStream(latex)),
+            )
+
+        self.assertEqual(
+            ComponentFactory.get_matched_component(LatexTokenStream(r"\sin x")),
+            SineFunctionComponent
+        )
+        self.assertEqual(
+            ComponentFactory.get_matched_component(LatexTokenStream(r"2x")),
+            MoninalComponent
+        )
+        self.assertEqual(
+            ComponentFactory.get_matched_component(LatexTokenStream(r"{a}")),
+            BraceComponent
+        )
+        self.assertEqual(
+            ComponentFactory.get_matched_component(LatexTokenStream(r"+")),
+            OtherComponent
+        )
+
+    def test_register_component(self):
+        class DispatchTestComponent(BaseComponent):
+            main_str = r"\dispatchtest"
+
+        try:
+            self.assertEqual(
+                ComponentFactory.get_matched_component(
+                    LatexTokenStream(r"\dispatchtest")),
+                DispatchTestComponent
+            )
+        finally:
+            del COMPONENT_MAPPER[DispatchTestComponent.main_str]
+            COMPONENT_DISPATCH_INDEX.rebuild(COMPONENT_MAPPER)
+
+        self.assertEqual(
+            ComponentFactory.get_matched_component(LatexTokenStream(r"\dispatchtest")),
+            OtherComponent
+        )
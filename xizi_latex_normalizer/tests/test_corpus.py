@@ -0,0 +1,264 @@
+import bz2
+import contextlib
+import gzip
+import io
+import json
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ..batch import BATCH_KIND_SENTENCE
+from ..cli import main
+from ..corpus import (
+    CorpusCheckpoint, RecordCodec, CorpusStats, normalize_records, normalize_files, get_record_format,
+    open_input, open_output, RECORD_FORMAT_LINES, RECORD_FORMAT_JSONL,
+    RECORD_FORMAT_CSV, RECORD_FORMAT_TSV, ON_ERROR_SKIP
+)
+from ..normalize import normalize_latex_expression
+
+
+class Crash(Exception):
+    pass
+
+
+def crash_after_writes(num_writes):
+    """ Patch `RecordCodec.write` to raise `Crash` after some writes """
+    write = RecordCodec.write
+    counter = [0]
+
+    def crashing_write(codec, wfile, record):
+        if counter[0] >= num_writes:
+            raise Crash()
+        counter[0] += 1
+        write(codec, wfile, record)
+
+    return mock.patch.object(RecordCodec, "write", crashing_write)
+
+
+class TestCorpus(unittest.TestCase):
+    latex_list = [r"\frac12", r"\frac{1}{2", r"x^2_3", r"\sqrt2"] * 5
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def get_path(self, file_name):
+        return os.path.join(self.temp_dir, file_name)
+
+    def test_get_record_format(self):
+        self.assertEqual(get_record_format("a.jsonl.gz"), RECORD_FORMAT_JSONL)
+        self.assertEqual(get_record_format("a.CSV"), RECORD_FORMAT_CSV)
+        self.assertEqual(get_record_format("a.tsv.xz"), RECORD_FORMAT_TSV)
+        self.assertEqual(get_record_format("a.txt"), RECORD_FORMAT_LINES)
+        self.assertEqual(get_record_format("-"), RECORD_FORMAT_LINES)
+
+    def test_compression(self):
+        for extension, open_func in ((".gz", gzip.open), (".bz2", bz2.open),
+                                     (".xz", lzma.open), ("", open)):
+            path = self.get_path("a.txt" + extension)
+            with open_output(path) as wfile:
+                wfile.write("长\n$x$\n")
+            with open_func(path, "rb") as rfile:
+                self.assertEqual(rfile.read().decode("utf-8"), "长\n$x$\n")
+            with open_input(path) as rfile:
+                self.assertEqual(rfile.read(), "长\n$x$\n")
+
+    def test_normalize_records(self):
+        codec = RecordCodec(RECORD_FORMAT_LINES)
+        expected_list = [
+            latex if latex == r"\frac{1}{2" else normalize_latex_expression(latex)
+            for latex in self.latex_list
+        ]
+        for workers in (1, 2):
+            stats = CorpusStats()
+            result_list = list(normalize_records(
+                self.latex_list, codec, workers=workers, batch_size=3,
+                max_in_flight=2, stats=stats
+            ))
+            self.assertEqual(result_list, expected_list)
+            self.assertEqual((stats.records, stats.errors, stats.fallbacks), (20, 5, 0))
+
+        stats = CorpusStats()
+        result_list = list(normalize_records(
+            self.latex_list, codec, on_error=ON_ERROR_SKIP, stats=stats,
+            ensure_valid_formula=False
+        ))
+        self.assertEqual(len(result_list), 20)
+        self.assertEqual((stats.errors, stats.fallbacks), (0, 5))
+
+        result_list = list(normalize_records(
+            self.latex_list, codec, on_error=ON_ERROR_SKIP
+        ))
+        self.assertEqual(result_list, [
+            result for result in expected_list if result != r"\frac{1}{2"
+        ])
+
+        with self.assertRaises(ValueError):
+            list(normalize_records(self.latex_list, codec, kind="word"))
+
+    def test_jsonl(self):
+        input_path = self.get_path("in.jsonl.gz")
+        with gzip.open(input_path, "wt", encoding="utf-8") as wfile:
+            wfile.write(json.dumps({"id": 1, "text": "长$\\frac12$"}) + "\n\n")
+            wfile.write(json.dumps({"id": 2}) + "\n")
+
+        output_path = self.get_path("out.jsonl")
+        stats = normalize_files(
+            [input_path], output_path, field="text", output_field="normalized",
+            kind=BATCH_KIND_SENTENCE
+        )
+        with open(output_path, encoding="utf-8") as rfile:
+            self.assertEqual([json.loads(line) for line in rfile], [
+                {"id": 1, "text": "长$\\frac12$", "normalized": "长$\\frac{1}{2}$"},
+                {"id": 2},
+            ])
+        self.assertEqual((stats.records, stats.errors), (2, 1))
+
+        with self.assertRaises(ValueError):
+            normalize_files([input_path], output_path)
+
+    def test_csv(self):
+        for extension, delimiter, quote in ((".csv", ",", "\""), (".tsv", "\t", "")):
+            input_path = self.get_path("in" + extension)
+            with open(input_path, "w", encoding="utf-8", newline="") as wfile:
+                wfile.write(delimiter.join(["id", "latex"]) + "\n")
+                wfile.write(delimiter.join(["1", "\"\\frac12,x\""]) + "\n")
+
+            output_path = self.get_path("out" + extension)
+            normalize_files([input_path, input_path], output_path, field="latex")
+            with open(output_path, encoding="utf-8", newline="") as rfile:
+                self.assertEqual(rfile.read().splitlines(), [
+                    delimiter.join(["id", "latex"]),
+                    delimiter.join(["1", quote + "\\frac{1}{2} , x" + quote]),
+                    delimiter.join(["1", quote + "\\frac{1}{2} , x" + quote]),
+                ])
+
+    def test_cli(self):
+        input_path = self.get_path("in.txt.bz2")
+        with bz2.open(input_path, "wt", encoding="utf-8") as wfile:
+            wfile.write("\n".join(self.latex_list) + "\n")
+
+        output_path = self.get_path("out.txt")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            main([
+                input_path, "-o", output_path, "-j", "2", "--batch-size", "3",
+                "--normalize-token", "--no-ensure-valid-formula"
+            ])
+        self.assertIn("fallbacks: 5", stderr.getvalue())
+
+        with open(output_path, encoding="utf-8") as rfile:
+            self.assertEqual(rfile.read().splitlines(), [
+                normalize_latex_expression(
+                    latex, normalize_token=True, ensure_valid_formula=False
+                )
+                for latex in self.latex_list
+            ])
+
+        # usage errors
+        for argv in ([input_path, "--format", "jsonl"],
+                     [input_path, "--checkpoint", self.get_path("out.ckpt")],
+                     [input_path, "-o", output_path, "--batch-size", "0"]):
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as cm:
+                main(argv)
+            self.assertEqual(cm.exception.code, 2)
+
+        # errors while processing are not usage errors
+        checkpoint_path = self.get_path("other.ckpt")
+        with open(checkpoint_path, "w", encoding="utf-8") as wfile:
+            json.dump({"version": -1, "config": {}, "state": {}}, wfile)
+        with self.assertRaisesRegex(ValueError, "another run"):
+            main([input_path, "-o", output_path, "--checkpoint", checkpoint_path])
+
+    def check_resume(self, input_paths, output_path, read_output, **kwargs):
+        expected_path = self.get_path("expected" + os.path.splitext(output_path)[1])
+        expected_stats = normalize_files(input_paths, expected_path, **kwargs)
+
+        checkpoint_path = self.get_path("out.ckpt")
+        for num_writes in (4, 7, 0):
+            with crash_after_writes(num_writes), self.assertRaises(Crash):
+                normalize_files(
+                    input_paths, output_path, checkpoint_path=checkpoint_path,
+                    checkpoint_interval=0, **kwargs
+                )
+            # partial writes after the checkpoint are dropped
+            with open(output_path, "ab") as wfile:
+                wfile.write(b"\x00" * 100000)
+
+        stats = normalize_files(
+            input_paths, output_path, checkpoint_path=checkpoint_path,
+            checkpoint_interval=0, **kwargs
+        )
+        self.assertEqual(read_output(output_path), read_output(expected_path))
+        self.assertEqual(
+            (stats.records, stats.errors, stats.fallbacks),
+            (expected_stats.records, expected_stats.errors, expected_stats.fallbacks)
+        )
+
+        # finished runs are not repeated
+        with crash_after_writes(0):
+            stats = normalize_files(
+                input_paths, output_path, checkpoint_path=checkpoint_path, **kwargs
+            )
+        self.assertEqual(stats.records, expected_stats.records)
+        self.assertEqual(read_output(output_path), read_output(expected_path))
+
+        with self.assertRaises(ValueError):
+            normalize_files(
+                input_paths, output_path, checkpoint_path=checkpoint_path,
+                normalize_token=True, **kwargs
+            )
+        os.remove(checkpoint_path)
+
+    def test_resume(self):
+        input_path = self.get_path("in.txt.xz")
+        with lzma.open(input_path, "wt", encoding="utf-8") as wfile:
+            wfile.write("\n".join(self.latex_list) + "\n")
+
+        def read_lines(path):
+            with open_input(path) as rfile:
+                return rfile.read().splitlines()
+
+        for workers in (1, 2):
+            self.check_resume(
+                [input_path], self.get_path("out.txt.gz"), read_lines,
+                workers=workers, batch_size=3, max_in_flight=3
+            )
+
+    def test_resume_csv(self):
+        input_path_list = []
+        for file_idx in range(2):
+            input_path = self.get_path("in{}.csv".format(file_idx))
+            with open(input_path, "w", encoding="utf-8", newline="") as wfile:
+                wfile.write("id,latex\n")
+                for idx, latex in enumerate(self.latex_list):
+                    wfile.write("{},\"{}\"\n".format(idx, latex))
+            input_path_list.append(input_path)
+
+        def read_csv(path):
+            with open(path, encoding="utf-8") as rfile:
+                return rfile.read()
+
+        self.check_resume(
+            input_path_list, self.get_path("out.csv"), read_csv, field="latex",
+            output_field="normalized", workers=2, batch_size=5, max_in_flight=2
+        )
+
+    def test_checkpoint(self):
+        checkpoint = CorpusCheckpoint(self.get_path("a.ckpt"), {"inputs": ("a",)})
+        self.assertIsNone(checkpoint.load())
+        checkpoint.save({"input_index": 1})
+        self.assertEqual(checkpoint.load(), {"input_index": 1})
+        self.assertEqual(
+            CorpusCheckpoint(checkpoint.path, {"inputs": ["a"]}).load(), {"input_index": 1}
+        )
+        with self.assertRaises(ValueError):
+            CorpusCheckpoint(checkpoint.path, {"inputs": ["b"]}).load()
+
+        with self.assertRaises(ValueError):
+            normalize_files(["-"], self.get_path("out.txt"), checkpoint_path=checkpoint.path)
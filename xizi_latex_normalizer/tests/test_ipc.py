@@ -0,0 +1,65 @@
+import unittest
+
+from ..batch import NormalizeError
+from ..ipc import (
+    LAYOUT_LENGTH_PREFIXED, LAYOUT_SEPARATED, TEXTS_HEADER, pack_texts, unpack_texts, pack_results, unpack_results, put_buffer,
+    put_buffer_for_reader, read_buffer, take_buffer, shared_memory, SharedMemoryRef
+)
+
+
+class TestIpc(unittest.TestCase):
+    text_list = [r"\frac12", "", "长$64m$", "\U0001f600x", "\ud800", "a\nb"]
+
+    def test_pack_texts(self):
+        for text_list in (self.text_list, [], [""], ["x" * 100000], ["a\x00", "", "\x00b"]):
+            buffer = pack_texts(text_list)
+            self.assertIsInstance(buffer, bytes)
+            self.assertEqual(unpack_texts(buffer), (text_list, len(buffer)))
+
+        self.assertEqual(pack_texts(self.text_list)[0], LAYOUT_SEPARATED)
+        buffer = pack_texts(self.text_list + ["\x00"])
+        self.assertEqual(buffer[0], LAYOUT_LENGTH_PREFIXED)
+        self.assertEqual(len(buffer), TEXTS_HEADER.size + 4 * 7 + len(
+            "".join(self.text_list + ["\x00"]).encode("utf-8", "surrogatepass")
+        ))
+
+        buffer = b"xy" + pack_texts(self.text_list) + pack_texts(["z"])
+        text_list, offset = unpack_texts(memoryview(buffer), 2)
+        self.assertEqual(text_list, self.text_list)
+        self.assertEqual(unpack_texts(buffer, offset)[0], ["z"])
+
+    def test_pack_results(self):
+        result_list = [
+            r"\frac{1}{2}", NormalizeError("LatexSyntaxError", "长"), "", 
+            NormalizeError("ValueError", "")
+        ]
+        buffer = pack_results(result_list)
+        self.assertEqual(unpack_results(buffer, NormalizeError), result_list)
+        self.assertEqual(
+            unpack_results(buffer)[1], ("LatexSyntaxError", "长")
+        )
+        self.assertEqual(unpack_results(pack_results([])), [])
+
+    def test_buffer(self):
+        data = pack_texts(self.text_list)
+        self.assertEqual(put_buffer(data, len(data) + 1), (data, None))
+        self.assertEqual(put_buffer(data, None), (data, None))
+        self.assertIs(read_buffer(data), data)
+        self.assertIs(take_buffer(data), data)
+
+        if shared_memory is None:
+            return
+
+        buffer, memory = put_buffer(data, 0)
+        self.assertIsInstance(buffer, SharedMemoryRef)
+        try:
+            self.assertEqual(read_buffer(buffer), data)
+            self.assertEqual(read_buffer(buffer), data)
+        finally:
+            memory.close()
+            memory.unlink()
+
+        buffer = put_buffer_for_reader(data, 0)
+        self.assertEqual(take_buffer(buffer), data)
+        with self.assertRaises(FileNotFoundError):
+            take_buffer(buffer)
@@ -1,4 +1,5 @@
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from ..normalize import normalize_latex_expression, normalize_latex_in_sentence
 from ..exceptions.base_exception import NormalizerException
@@ -559,3 +560,31 @@ class TestLatex(unittest.TestCase):
             ),
             r"\frac{d}{dx} (e^{\cos(\pi x)})",
         )
+
+
+class TestLatexConcurrency(unittest.TestCase):
+    def test_latex__threads_with_different_options(self):
+        latex_list = [r"\log_23 + \rm{kg}", r"\sin \angle A + \log 2"] * 50
+        kwargs_list = [
+            {},
+            {"brace_single_elem_for_log": False, "keep_rm_sign": False},
+            {"strip_angle_for_tri": True},
+        ]
+        expected = {
+            (latex, idx): normalize_latex_expression(latex, **kwargs)
+            for latex in set(latex_list) for idx, kwargs in enumerate(kwargs_list)
+        }
+
+        def normalize(args):
+            latex, idx = args
+            return normalize_latex_expression(latex, **kwargs_list[idx])
+
+        args_list = [
+            (latex, idx) for latex in latex_list for idx in range(len(kwargs_list))
+        ]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            result_list = list(executor.map(normalize, args_list))
+
+        self.assertEqual(result_list, [expected[args] for args in args_list])
+        self.assertNotEqual(expected[(latex_list[0], 0)], expected[(latex_list[0], 1)])
+        self.assertNotEqual(expected[(latex_list[1], 0)], expected[(latex_list[1], 2)])
@@ -1,6 +1,6 @@
 import unittest
 
-from ..mapping.token_mapping import normalize_sentence_char
+from ..mapping.token_mapping import normalize_sentence_char, get_token_mapper
 
 
 class TestMapping(unittest.TestCase):
@@ -10,5 +10,10 @@ class TestMapping(unittest.TestCase):
             r"3\pi + 5\pi = \frac{2}{\pi} / \pi"
         )
 
+    def test_token_mapper(self):
+        token_mapper = get_token_mapper(True, True)
 
-
+        self.assertEqual(token_mapper["\\geqslant"], "\\ge")
+        self.assertEqual(token_mapper["X"], "x")
+        self.assertNotIn("x", token_mapper)
+        self.assertEqual(get_token_mapper(False, False), {})
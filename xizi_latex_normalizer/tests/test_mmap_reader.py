@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..corpus import ON_ERROR_SKIP
+from ..mmap_reader import find_shard_boundaries, iter_lines, normalize_mmap_file
+from ..normalize import normalize_latex_expression
+
+
+class TestMmapReader(unittest.TestCase):
+    latex_list = [r"\frac12", r"\frac{1}{2", "", r"x^2_3", r"\sqrt2 长"] * 5
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.temp_dir, "in.txt")
+        self.output_path = os.path.join(self.temp_dir, "out.txt")
+        with open(self.input_path, "w", encoding="utf-8", newline="") as wfile:
+            wfile.write("\r\n".join(self.latex_list))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_find_shard_boundaries(self):
+        data = b"ab\ncd\n\nef"
+        for num_shards in range(1, 12):
+            shard_list = find_shard_boundaries(data, num_shards)
+            self.assertEqual(b"".join(data[start:end] for start, end in shard_list), data)
+            self.assertLessEqual(len(shard_list), num_shards)
+            for start, end in shard_list[:-1]:
+                self.assertEqual(data[end - 1:end], b"\n")
+
+        self.assertEqual(find_shard_boundaries(b"abc", 4), [(0, 3)])
+        self.assertEqual(find_shard_boundaries(b"", 4), [])
+
+    def test_iter_lines(self):
+        data = "a\r\n\n长\nb".encode("utf-8")
+        self.assertEqual(list(iter_lines(data, 0, len(data))), ["a", "", "长", "b"])
+        self.assertEqual(list(iter_lines(data, 3, 4)), [""])
+        self.assertEqual(list(iter_lines(b"\xffa\n", 0, 3)), ["\udcffa"])
+
+    def test_normalize_mmap_file(self):
+        expected_list = [
+            latex if latex == r"\frac{1}{2" else normalize_latex_expression(latex)
+            for latex in self.latex_list
+        ]
+        for workers, num_shards in ((1, None), (2, None), (2, 7), (3, 100)):
+            stats = normalize_mmap_file(
+                self.input_path, self.output_path, workers=workers, num_shards=num_shards
+            )
+            with open(self.output_path, encoding="utf-8") as rfile:
+                self.assertEqual(rfile.read().splitlines(), expected_list)
+            self.assertEqual((stats.records, stats.errors), (25, 5))
+            self.assertEqual(os.listdir(self.temp_dir), ["in.txt", "out.txt"])
+
+        stats = normalize_mmap_file(
+            self.input_path, self.output_path, workers=2, on_error=ON_ERROR_SKIP,
+            ensure_valid_formula=False
+        )
+        self.assertEqual((stats.records, stats.errors, stats.fallbacks), (25, 0, 5))
+
+        open(self.input_path, "w").close()
+        stats = normalize_mmap_file(self.input_path, self.output_path, workers=2)
+        self.assertEqual(stats.records, 0)
+        self.assertEqual(os.path.getsize(self.output_path), 0)
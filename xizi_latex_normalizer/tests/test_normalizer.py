@@ -0,0 +1,74 @@
+import pickle
+import unittest
+
+from ..normalize import (
+    Normalizer, NormalizeOptions, get_normalizer, normalize_latex_expression,
+    normalize_latex_in_sentence
+)
+from ..exceptions.base_exception import NormalizerException
+
+
+class TestNormalizer(unittest.TestCase):
+    def test_call(self):
+        normalizer = Normalizer(normalize_token=True, keep_left_right_marker=False)
+
+        self.assertEqual(
+            normalizer(r"f(\left x\right)\geq \frac12"),
+            normalize_latex_expression(r"f(\left x\right)\geq \frac12", 
+                                       normalize_token=True,
+                                       keep_left_right_marker=False)
+        )
+        self.assertEqual(normalizer(r"X\geqslant Y"), r"X \ge Y")
+        self.assertEqual(
+            Normalizer(normalize_token=True, 
+                       ignore_similar_despite_capital=True)(r"X\geqslant Y"),
+            r"x \ge y"
+        )
+
+    def test_invalid_formula(self):
+        with self.assertRaises(NormalizerException):
+            Normalizer()(r"\frac{1}{2")
+
+        self.assertEqual(
+            Normalizer(ensure_valid_formula=False)(r"\frac{1}{2"),
+            r"\frac { 1 } { 2"
+        )
+
+    def test_normalize_sentence(self):
+        normalizer = Normalizer(keep_rm_sign=False)
+
+        self.assertEqual(
+            Normalizer().normalize_sentence("包含中文$\\frac12$的公式$64$米"),
+            "包含中文$\\frac{1}{2}$的公式$64 \\rm m$"
+        )
+        self.assertEqual(
+            normalizer.normalize_sentence("包含中文$\\frac12$的公式$64$米"),
+            normalize_latex_in_sentence("包含中文$\\frac12$的公式$64$米", 
+                                        keep_rm_sign=False)
+        )
+
+        # display formulas and formulas braced by \( or \[
+        self.assertEqual(
+            Normalizer().normalize_sentence(
+                "如$$\\frac12$$与\\(\\sqrt2\\)米及\\[x^2_3\\]，答案为$$，\\(不是公式"
+            ),
+            "如$$\\frac{1}{2}$$与\\(\\sqrt{2} \\rm m\\)及\\[x_{3}^{2}\\]，答案为$$，\\(不是公式"
+        )
+
+    def test_map(self):
+        self.assertEqual(
+            list(Normalizer().map([r"\frac12", r"\sqrt2", r"x"])),
+            [r"\frac{1}{2}", r"\sqrt{2}", r"x"]
+        )
+
+    def test_options(self):
+        normalizer = Normalizer(strip_angle_for_tri=1)
+
+        self.assertEqual(
+            normalizer.options, NormalizeOptions(strip_angle_for_tri=True)
+        )
+        self.assertEqual(
+            pickle.loads(pickle.dumps(normalizer)).options, normalizer.options
+        )
+        self.assertIs(get_normalizer(*normalizer.options), 
+                      get_normalizer(*normalizer.options))
@@ -0,0 +1,190 @@
+import gc
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import weakref
+from multiprocessing import util as multiprocessing_util
+from unittest import mock
+
+from ..batch import normalize_batch
+from ..cache import persistent_cache
+from ..cache import (
+    PersistentResultCache, enable_persistent_cache, disable_persistent_cache,
+    enable_result_cache, disable_result_cache
+)
+from ..normalize import (
+    Normalizer, NormalizeOptions, normalize_latex_expression, normalize_latex_in_sentence
+)
+from ..utils.common_utils import load_chinese_units
+from ..exceptions import exception_from_name
+from ..exceptions.base_exception import NormalizerException, InvalidBeginEndType
+from ..exceptions.syntax_exception import LatexSyntaxError
+
+
+KEY = ("latex", NormalizeOptions(), r"\frac12")
+
+
+class TestPersistentResultCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "cache.sqlite")
+
+    def tearDown(self):
+        disable_persistent_cache()
+        disable_result_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_persist(self):
+        cache = PersistentResultCache(self.path, batch_size=2)
+        self.assertEqual(cache.get_or_compute(KEY, str.upper, "a"), "A")
+        # buffered write is visible in the same process
+        self.assertEqual(cache.get_or_compute(KEY, str.upper, "b"), "A")
+        self.assertEqual(cache.get_stats()["pending"], 1)
+        cache.close()
+
+        cache = PersistentResultCache(self.path)
+        self.assertEqual(cache.get_or_compute(KEY, str.upper, "c"), "A")
+        stats = cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 0))
+
+        # another kind or options is another key
+        other_keys = [
+            ("sentence",) + KEY[1:], 
+            ("latex", NormalizeOptions(normalize_token=True), KEY[2]),
+            ("latex", NormalizeOptions(), KEY[2] + "\ud800"),
+        ]
+        for key in other_keys:
+            self.assertEqual(cache.get_or_compute(key, str, key[2]), key[2])
+        cache.close()
+
+    def test_invalidation(self):
+        cache = PersistentResultCache(self.path)
+        cache.get_or_compute(KEY, str.upper, "a")
+        cache.close()
+
+        with mock.patch.object(persistent_cache, "__version__", "0.0.0"):
+            cache = PersistentResultCache(self.path)
+            self.assertEqual(cache.get_or_compute(KEY, str.upper, "b"), "B")
+            cache.close()
+
+        # results of another version are kept
+        cache = PersistentResultCache(self.path)
+        self.assertEqual(cache.get_or_compute(KEY, str.upper, "c"), "A")
+        cache.close()
+        with mock.patch.object(persistent_cache, "__version__", "0.0.0"):
+            cache = PersistentResultCache(self.path)
+            self.assertEqual(cache.get_or_compute(KEY, str.upper, "c"), "B")
+            cache.close()
+
+    def test_unit_table(self):
+        data_path = os.path.join(self.temp_dir, "units.json")
+        with open(data_path, "w", encoding="utf-8") as wfile:
+            json.dump({"units": {"米": "meter"}, "units_without_rm": []}, wfile)
+
+        cache = enable_persistent_cache(self.path)
+        fingerprint = cache.fingerprint
+        self.assertEqual(normalize_latex_in_sentence("长$3$米"), r"长$3 \rm m$")
+        try:
+            load_chinese_units(data_path)
+            self.assertNotEqual(cache.fingerprint, fingerprint)
+            self.assertEqual(normalize_latex_in_sentence("长$3$米"), r"长$3 \rm meter$")
+            self.assertEqual(cache.get_stats()["hits"], 0)
+        finally:
+            load_chinese_units()
+        self.assertEqual(cache.fingerprint, fingerprint)
+        self.assertEqual(normalize_latex_in_sentence("长$3$米"), r"长$3 \rm m$")
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+    def test_cache_failures(self):
+        calls = []
+        def compute(latex):
+            calls.append(latex)
+            return Normalizer()(latex)
+
+        for cache_failures, expected_calls in ((False, 2), (True, 1)):
+            calls.clear()
+            cache = PersistentResultCache(self.path, cache_failures=cache_failures)
+            cache.clear()
+            for _ in range(2):
+                with self.assertRaises(NormalizerException):
+                    cache.get_or_compute(KEY, compute, r"\frac{1}{2")
+            self.assertEqual(len(calls), expected_calls)
+            cache.close()
+
+    def test_failure_type(self):
+        cache = enable_persistent_cache(self.path, cache_failures=True)
+        for _ in range(2):
+            with self.assertRaises(LatexSyntaxError):
+                normalize_latex_expression(r"\frac{1}{2")
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+        # committed failures
+        cache = enable_persistent_cache(self.path, cache_failures=True)
+        with self.assertRaises(LatexSyntaxError):
+            normalize_latex_expression(r"\frac{1}{2")
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+        self.assertIsInstance(exception_from_name("InvalidBeginEndType", ""), InvalidBeginEndType)
+        self.assertIsInstance(exception_from_name("KeyError", ""), KeyError)
+        self.assertIs(type(exception_from_name("UnknownError", "")), NormalizerException)
+
+    def test_enabled(self):
+        cache = enable_persistent_cache(self.path)
+        result_cache = enable_result_cache()
+
+        self.assertEqual(normalize_latex_expression(r"\frac12"), r"\frac{1}{2}")
+        result_cache.clear()
+        self.assertEqual(normalize_latex_expression(r"\frac12"), r"\frac{1}{2}")
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+        latex_list = [r"\sqrt{}%d" % idx for idx in range(10)]
+        expected = [Normalizer()._normalize(latex) for latex in latex_list]
+        self.assertEqual(list(Normalizer().map(latex_list, prefetch_size=3)), expected)
+        cache.flush()
+        result_cache.clear()
+
+        with mock.patch.object(cache, "prefetch", wraps=cache.prefetch) as prefetch:
+            self.assertEqual(
+                list(Normalizer().map(latex_list, prefetch_size=3)), expected
+            )
+            self.assertEqual(prefetch.call_count, 4)
+            self.assertEqual(len(cache._prefetched), 1)
+        self.assertEqual(cache.get_stats()["hits"], 11)
+
+    def test_finalizer(self):
+        def count_finalizers(cache_ref):
+            return sum(
+                finalizer._callback is persistent_cache._flush_cache_ref
+                and finalizer._args[0] is cache_ref
+                for finalizer in list(multiprocessing_util._finalizer_registry.values())
+            )
+
+        cache = PersistentResultCache(self.path)
+        cache_ref = weakref.ref(cache)
+        # reconnecting in the same process registers no more finalizers
+        for _ in range(3):
+            cache.close()
+            cache.get_or_compute(KEY, str.upper, "a")
+        self.assertEqual(count_finalizers(cache_ref), 1)
+
+        # the finalizer does not keep the cache alive
+        cache.close()
+        del cache
+        gc.collect()
+        self.assertIsNone(cache_ref())
+        self.assertEqual(count_finalizers(cache_ref), 0)
+
+    def test_workers(self):
+        # buffered writes of workers are committed when they exit
+        enable_persistent_cache(self.path)
+        latex_list = [r"\sqrt{}%d" % idx for idx in range(40)]
+        normalize_batch(latex_list, workers=2)
+
+        connection = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM results").fetchone()[0], 40)
+        finally:
+            connection.close()
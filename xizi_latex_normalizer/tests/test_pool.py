@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+import threading
+import unittest
+from unittest import mock
+
+from ..batch import NormalizeError
+from ..exceptions.syntax_exception import LatexSyntaxError
+from ..normalize import Normalizer, normalize_latex_expression, normalize_latex_in_sentence
+from ..pool import NormalizerPool, WorkerExitedError, WORKER_EXITED_ERROR
+
+
+class TestNormalizerPool(unittest.TestCase):
+    latex_list = [r"\frac12", r"\frac{1}{2", r"x\geqslant y", r"\sqrt2"] * 5
+
+    def check_results(self, result_list):
+        self.assertEqual(len(result_list), len(self.latex_list))
+        for latex, result in zip(self.latex_list, result_list):
+            if latex == r"\frac{1}{2":
+                self.assertEqual(result.exception_type, "LatexSyntaxError")
+            else:
+                self.assertEqual(
+                    result, normalize_latex_expression(latex, normalize_token=True)
+                )
+
+    def test_map(self):
+        with NormalizerPool(workers=2, normalize_token=True) as pool:
+            self.check_results(pool.map(self.latex_list))
+            self.check_results(pool.map(iter(self.latex_list), chunksize=3))
+            self.assertEqual(pool.map([]), [])
+
+            sentence_list = ["长$64m$", "包含中文$\\frac12$的公式", "无公式"]
+            self.assertEqual(
+                pool.map_sentences(sentence_list),
+                [normalize_latex_in_sentence(sentence, normalize_token=True) 
+                 for sentence in sentence_list]
+            )
+            self.assertEqual(pool.get_stats()["recycled"], 0)
+
+        with self.assertRaises(ValueError):
+            pool.map(self.latex_list)
+
+    def test_start_method(self):
+        for start_method in ("forkserver", "spawn"):
+            if start_method not in multiprocessing.get_all_start_methods():
+                continue
+            with NormalizerPool(workers=1, start_method=start_method, 
+                                normalize_token=True) as pool:
+                self.check_results(pool.map(self.latex_list))
+
+    @unittest.skipIf("fork" not in multiprocessing.get_all_start_methods(), "fork is not supported")
+    def test_replace_start_method(self):
+        with NormalizerPool(workers=1, start_method="fork", max_tasks_per_worker=1,
+                            normalize_token=True) as pool:
+            with mock.patch.object(threading, "active_count", return_value=1):
+                pool.map(self.latex_list[:1])
+            self.assertEqual(pool._worker_list[0].start_method, "fork")
+
+            # not forked while other threads are running
+            with mock.patch.object(threading, "active_count", return_value=2):
+                pool.map(self.latex_list[:1])
+            self.assertIn(pool._worker_list[0].start_method, ("forkserver", "spawn"))
+            self.check_results(pool.map(self.latex_list))
+
+        with NormalizerPool(workers=1, start_method="fork", replace_start_method="spawn",
+                            max_tasks_per_worker=1, normalize_token=True) as pool:
+            pool.map(self.latex_list[:1])
+            self.assertEqual(pool._worker_list[0].start_method, "spawn")
+            self.check_results(pool.map(self.latex_list))
+
+    def test_recycle(self):
+        with NormalizerPool(workers=2, max_tasks_per_worker=2, 
+                            normalize_token=True) as pool:
+            self.check_results(pool.map(self.latex_list, chunksize=2))
+            stats = pool.get_stats()
+            self.assertEqual(stats["tasks"], 10)
+            self.assertGreaterEqual(stats["recycled"], 3)
+            self.assertEqual(stats["workers"], 2)
+
+        with NormalizerPool(workers=1, max_rss_growth=1, normalize_token=True) as pool:
+            # sure to grow by a huge formula
+            pool.map([r"\frac12+" * 10000])
+            self.check_results(pool.map(self.latex_list))
+            self.assertGreater(pool.get_stats()["recycled"], 0)
+
+    def test_exited_worker(self):
+        with NormalizerPool(workers=1, normalize_token=True) as pool:
+            worker = pool._worker_list[0]
+            worker.process.terminate()
+            worker.process.join()
+
+            self.check_results(pool.map(self.latex_list))
+            self.assertEqual(pool.get_stats()["exited"], 1)
+
+            # exited while normalizing a chunk
+            worker = pool._worker_list[0]
+            worker.process.terminate()
+            worker.process.join()
+            worker.task = (-1, 1)
+            result_list = [None]
+            pool._collect(worker, {-1: 0}, result_list)
+            self.assertIsInstance(result_list[0], NormalizeError)
+            self.assertEqual(result_list[0].exception_type, WORKER_EXITED_ERROR)
+
+            self.check_results(pool.map(self.latex_list))
+
+
+    def test_normalize_document(self):
+        document = "已知$x+\\frac12=3$，长$64$米。" * 20 + "设$\\frac{1}{2$"
+        normalize = Normalizer._normalize
+
+        def failing_normalize(normalizer, latex):
+            if latex == "x+\\frac12=3":
+                raise RuntimeError("failed")
+            return normalize(normalizer, latex)
+
+        # failed formulas are kept, forked workers fail as patched
+        with mock.patch.object(Normalizer, "_normalize", failing_normalize), \
+                NormalizerPool(workers=2, ensure_valid_formula=False) as pool:
+            self.assertEqual(
+                pool.normalize_document(document, min_segments=10),
+                normalize_latex_in_sentence(
+                    document.replace("$x+\\frac12=3$", "@"), ensure_valid_formula=False
+                ).replace("@", "$x+\\frac12=3$")
+            )
+
+        valid_document = document[:-len("设$\\frac{1}{2$")]
+        with NormalizerPool(workers=2) as pool:
+            self.assertEqual(
+                pool.normalize_document(valid_document, min_segments=10),
+                normalize_latex_in_sentence(valid_document)
+            )
+            # the same type as normalized in this process
+            with self.assertRaises(LatexSyntaxError):
+                normalize_latex_in_sentence(document)
+            with self.assertRaises(LatexSyntaxError):
+                pool.normalize_document(document, min_chars=100)
+
+            # short documents are normalized in this process
+            finished_tasks = pool.get_stats()["tasks"]
+            self.assertGreater(finished_tasks, 0)
+            self.assertEqual(
+                pool.normalize_document(valid_document), normalize_latex_in_sentence(valid_document)
+            )
+            self.assertEqual(pool.get_stats()["tasks"], finished_tasks)
+
+    def test_document_failure_types(self):
+        normalize = Normalizer._normalize
+
+        def failing_normalize(normalizer, latex):
+            if latex == "y":
+                raise RuntimeError("failed")
+            if latex == "z":
+                os._exit(1)
+            return normalize(normalizer, latex)
+
+        with mock.patch.object(Normalizer, "_normalize", failing_normalize), \
+                NormalizerPool(workers=1) as pool:
+            with self.assertRaisesRegex(RuntimeError, "^failed$"):
+                pool.normalize_document("$x$与$y$", min_segments=0)
+            with self.assertRaises(WorkerExitedError):
+                pool.normalize_document("$x$与$z$", min_segments=0)
@@ -0,0 +1,95 @@
+import unittest
+
+from ..cache import (
+    ResultCache, enable_result_cache, disable_result_cache, get_result_cache
+)
+from ..normalize import (
+    Normalizer, normalize_latex_expression, normalize_latex_in_sentence
+)
+from ..exceptions.base_exception import NormalizerException
+
+
+class TestResultCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        cache.get_or_compute(("a",), str.upper, "a")
+        cache.get_or_compute(("b",), str.upper, "b")
+        cache.get_or_compute(("a",), str.upper, "a")
+        cache.get_or_compute(("c",), str.upper, "c")
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 3)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["entries"], 2)
+
+        # "b" is the least recently used one
+        cache.get_or_compute(("a",), str.upper, "a")
+        cache.get_or_compute(("b",), str.upper, "b")
+        self.assertEqual(cache.get_stats()["hits"], 2)
+
+    def test_byte_eviction(self):
+        cache = ResultCache(max_entries=None, max_bytes=2000)
+        for idx in range(100):
+            self.assertEqual(cache.get_or_compute((str(idx),), str, idx), str(idx))
+
+        stats = cache.get_stats()
+        self.assertLessEqual(stats["bytes"], 2000)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertEqual(stats["entries"] + stats["evictions"], 100)
+
+        # too large to be cached
+        cache.get_or_compute(("large",), str, "x" * 3000)
+        self.assertLessEqual(cache.get_stats()["bytes"], 2000)
+
+        cache.clear()
+        self.assertEqual(cache.get_stats()["bytes"], 0)
+        self.assertEqual(len(cache), 0)
+
+    def test_cache_failures(self):
+        calls = []
+        def compute(latex):
+            calls.append(latex)
+            return Normalizer()(latex)
+
+        for cache_failures, expected_calls in ((False, 2), (True, 1)):
+            calls.clear()
+            cache = ResultCache(cache_failures=cache_failures)
+            for _ in range(2):
+                with self.assertRaises(NormalizerException):
+                    cache.get_or_compute(("key",), compute, r"\frac{1}{2")
+            self.assertEqual(len(calls), expected_calls)
+
+
+class TestEnabledResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = enable_result_cache(max_entries=100)
+
+    def tearDown(self):
+        disable_result_cache()
+
+    def test_normalize(self):
+        self.assertIs(get_result_cache(), self.cache)
+
+        for _ in range(2):
+            self.assertEqual(normalize_latex_expression(r"\frac12"), r"\frac{1}{2}")
+        self.assertEqual(
+            normalize_latex_expression(r"\frac12", normalize_token=True), 
+            r"\frac{1}{2}"
+        )
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+
+        self.assertEqual(
+            normalize_latex_in_sentence(r"长$64m$"), 
+            normalize_latex_in_sentence(r"长$64m$")
+        )
+        # sentence and the expression in it
+        self.assertEqual(self.cache.get_stats()["misses"], 4)
+
+    def test_disabled(self):
+        disable_result_cache()
+        self.assertIsNone(get_result_cache())
+        normalize_latex_expression(r"\frac12")
+        self.assertEqual(self.cache.get_stats()["misses"], 0)
@@ -0,0 +1,93 @@
+import http.client
+import json
+import threading
+import unittest
+
+from ..loadgen import run_load
+from ..normalize import normalize_latex_expression, normalize_latex_in_sentence
+from ..pool import get_thread_safe_start_method
+from ..server import NormalizeServer, Histogram
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = NormalizeServer(("127.0.0.1", 0), workers=1, normalize_token=True)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def setUp(self):
+        host, port = self.server.server_address[:2]
+        self.connection = http.client.HTTPConnection(host, port)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def request(self, method, path, body=None):
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.connection.request(method, path, body)
+        response = self.connection.getresponse()
+        return response.status, response.read().decode("utf-8")
+
+    def test_normalize(self):
+        # requests share a kept-alive connection
+        status, body = self.request("POST", "/normalize", {"text": r"\frac12"})
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), {
+            "result": normalize_latex_expression(r"\frac12", normalize_token=True)
+        })
+
+        status, body = self.request("POST", "/normalize", {"text": r"\frac{1}{2"})
+        self.assertEqual(status, 422)
+        self.assertIn("error", json.loads(body))
+
+        status, body = self.request("POST", "/normalize/batch", {
+            "texts": ["长$\\frac12$", "$\\frac{1}{2$"], "mode": "sentence"
+        })
+        self.assertEqual(status, 200)
+        result_list = json.loads(body)["results"]
+        self.assertEqual(result_list[0], {
+            "result": normalize_latex_in_sentence("长$\\frac12$", normalize_token=True)
+        })
+        self.assertIn("error", result_list[1])
+
+    def test_bad_request(self):
+        for body in (b"{", {"text": 1}, {"text": "x", "mode": "word"}, ["x"]):
+            self.assertEqual(self.request("POST", "/normalize", body)[0], 400)
+        self.assertEqual(self.request("POST", "/normalize/batch", {"texts": "x"})[0], 400)
+        self.assertEqual(self.request("POST", "/other", {})[0], 404)
+        self.assertEqual(self.request("GET", "/health")[0], 200)
+
+    def test_metrics(self):
+        stats = run_load(self.server.url, [r"\frac12", r"x^2"], num_requests=20, concurrency=4)
+        self.assertEqual((stats.requests, stats.items, stats.errors), (20, 20, 0))
+        stats = run_load(self.server.url, [r"\frac12", r"\frac{"], num_requests=5,
+                         concurrency=2, batch_size=4)
+        self.assertEqual((stats.requests, stats.items, stats.errors), (5, 20, 10))
+
+        status, body = self.request("GET", "/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn('latex_normalizer_requests_total{path="/normalize",code="200"}', body)
+        self.assertIn('latex_normalizer_request_seconds_bucket{path="/normalize",le="+Inf"}', body)
+        self.assertIn("latex_normalizer_pool_workers 1", body)
+
+    def test_replace_start_method(self):
+        # workers are never forked from the threaded server
+        self.assertEqual(self.server.pool.replace_start_method, get_thread_safe_start_method())
+        self.assertNotEqual(self.server.pool.replace_start_method, "fork")
+
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        self.assertEqual(histogram.render("t"), [
+            't_bucket{le="0.1"} 2', 't_bucket{le="1"} 3', 't_bucket{le="+Inf"} 4',
+            "t_sum 2.65", "t_count 4",
+        ])
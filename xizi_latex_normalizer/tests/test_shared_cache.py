@@ -0,0 +1,115 @@
+import multiprocessing
+import unittest
+
+from ..batch import normalize_batch
+from ..cache import (
+    SharedResultCache, enable_shared_cache, disable_shared_cache, get_shared_cache
+)
+from ..cache.shared_cache import hash_key, shared_memory
+from ..exceptions.base_exception import NormalizerException
+from ..exceptions.syntax_exception import LatexSyntaxError
+from ..normalize import Normalizer, NormalizeOptions, normalize_latex_expression
+from ..pool import NormalizerPool
+
+
+KEY = ("latex", NormalizeOptions(), r"\frac12")
+
+
+def put_in_child(cache):
+    cache.put(hash_key(KEY), "child")
+
+
+@unittest.skipIf(shared_memory is None, "shared memory is not supported")
+class TestSharedResultCache(unittest.TestCase):
+    def tearDown(self):
+        disable_shared_cache()
+
+    def test_get_or_compute(self):
+        cache = SharedResultCache(max_entries=16)
+        try:
+            self.assertEqual(cache.get_or_compute(KEY, str.upper, "a"), "A")
+            self.assertEqual(cache.get_or_compute(KEY, str.upper, "b"), "A")
+            # options and kind are parts of the key
+            key = ("sentence",) + KEY[1:]
+            self.assertEqual(cache.get_or_compute(key, str.upper, "b"), "B")
+            key = ("latex", NormalizeOptions(normalize_token=True), KEY[2])
+            self.assertEqual(cache.get_or_compute(key, str.upper, "c"), "C")
+
+            stats = cache.get_stats()
+            self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 3, 3))
+
+            # too long to cache
+            key = ("latex", NormalizeOptions(), "long")
+            self.assertEqual(cache.get_or_compute(key, str.upper, "长" * 100), "长" * 100)
+            self.assertEqual(cache.get_stats()["rejections"], 1)
+
+            cache.clear()
+            self.assertEqual(cache.get_stats()["entries"], 0)
+        finally:
+            cache.close()
+
+    def test_failure(self):
+        def fail(_):
+            raise NormalizerException("invalid")
+
+        cache = SharedResultCache(max_entries=16, cache_failures=True)
+        try:
+            for _ in range(2):
+                with self.assertRaises(NormalizerException):
+                    cache.get_or_compute(KEY, fail, "a")
+            self.assertEqual(cache.get_stats()["hits"], 1)
+
+            # the same type as computed
+            key = ("latex", NormalizeOptions(), r"\frac{1}{2")
+            for _ in range(2):
+                with self.assertRaises(LatexSyntaxError):
+                    cache.get_or_compute(key, Normalizer(), key[2])
+            self.assertEqual(cache.get_stats()["hits"], 2)
+        finally:
+            cache.close()
+
+    def test_clock_eviction(self):
+        cache = SharedResultCache(max_entries=4, bucket_size=4)
+        try:
+            key_hash_list = list(range(1, 6))
+            for key_hash in key_hash_list[:4]:
+                cache.put(key_hash, str(key_hash))
+            # referenced slots get a second chance
+            self.assertEqual(cache.get(1), ("1", False))
+            cache.put(5, "5")
+            self.assertIsNone(cache.get(2))
+            self.assertEqual(cache.get(1), ("1", False))
+            self.assertEqual(cache.get(5), ("5", False))
+
+            stats = cache.get_stats()
+            self.assertEqual((stats["evictions"], stats["entries"]), (1, 4))
+        finally:
+            cache.close()
+
+    def test_processes(self):
+        cache = enable_shared_cache(max_entries=1024)
+        self.assertIs(get_shared_cache(), cache)
+        for start_method in ("fork", "spawn"):
+            if start_method not in multiprocessing.get_all_start_methods():
+                continue
+            cache.clear()
+            process = multiprocessing.get_context(start_method).Process(
+                target=put_in_child, args=(cache,)
+            )
+            process.start()
+            process.join()
+            self.assertEqual(cache.get(hash_key(KEY)), ("child", False))
+
+    def test_workers(self):
+        latex_list = [r"\frac12", r"x^2_3", r"\sqrt2"] * 4
+        expected_list = [normalize_latex_expression(latex) for latex in latex_list]
+        cache = enable_shared_cache(max_entries=1024)
+
+        self.assertEqual(normalize_batch(latex_list, workers=2, chunksize=2), expected_list)
+        self.assertEqual(cache.get_stats()["entries"], 3)
+        # results of workers are hit in this process
+        self.assertEqual([normalize_latex_expression(latex) for latex in latex_list], expected_list)
+        self.assertEqual(cache.get_stats()["misses"], 0)
+
+        with NormalizerPool(workers=2, start_method="spawn") as pool:
+            self.assertEqual(pool.map(latex_list), expected_list)
@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+
+from ..cache import (
+    SkeletonCache, enable_skeleton_cache, disable_skeleton_cache, 
+    enable_result_cache, disable_result_cache
+)
+from ..normalize import Normalizer, normalize_latex_expression
+
+
+class TestSkeletonCache(unittest.TestCase):
+    def test_abstract(self):
+        self.assertEqual(
+            SkeletonCache.abstract(r"\frac{3}{4}"), 
+            (r"\frac{0}{1}", ["0", "1"], ["3", "4"])
+        )
+        self.assertEqual(
+            SkeletonCache.abstract(r"x+Y=12"), 
+            (r"a+A=0", ["a", "A", "0"], ["x", "Y", "12"])
+        )
+        # placeholders do not occur in other parts
+        self.assertEqual(
+            SkeletonCache.abstract(r"a+b=2a"), (r"b+c=2a", ["b", "c"], ["a", "b"])
+        )
+
+        # read by char or as an argument
+        self.assertIsNone(SkeletonCache.abstract(r"\frac12"))
+        self.assertIsNone(SkeletonCache.abstract(r"\sqrt 2"))
+        self.assertIsNone(SkeletonCache.abstract(r"\frac+12"))
+        self.assertEqual(SkeletonCache.abstract(r"x^+12"), (r"a^+12", ["a"], ["x"]))
+        self.assertEqual(SkeletonCache.abstract(r"x^2"), (r"a^2", ["a"], ["x"]))
+        # not literals
+        self.assertIsNone(SkeletonCache.abstract(r"3.5+2x+ab"))
+
+    def test_normalize(self):
+        cache = SkeletonCache()
+        normalizer = Normalizer()
+
+        for latex in [r"\frac{3}{4}", r"\frac{5}{7}", r"\frac{0}{1}", r"\frac12"]:
+            self.assertEqual(cache.normalize(normalizer, latex), normalizer._normalize(latex))
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["bypasses"], 1)
+
+        # mapped tokens are not placeholders
+        normalizer = Normalizer(ignore_similar_despite_capital=True)
+        latex = r"C+{l}"
+        self.assertEqual(cache.normalize(normalizer, latex), normalizer._normalize(latex))
+
+    def test_rejection(self):
+        cache = SkeletonCache()
+        normalizer = Normalizer(ensure_valid_formula=False)
+        
+        # `b` occurs twice in output of skeleton `a+b`
+        with mock.patch.object(normalizer, "_normalize", return_value="a+b+b"):
+            self.assertEqual(cache.normalize(normalizer, "x+y"), "a+b+b")
+        self.assertEqual(cache.get_stats()["rejections"], 1)
+
+
+class TestEnabledSkeletonCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = enable_skeleton_cache()
+        self.result_cache = enable_result_cache()
+
+    def tearDown(self):
+        disable_skeleton_cache()
+        disable_result_cache()
+
+    def test_normalize(self):
+        for latex in [r"\frac{3}{4}", r"\frac{3}{4}", r"\frac{5}{7}"]:
+            self.assertEqual(normalize_latex_expression(latex), latex)
+
+        # exact matches are counted by result cache only
+        self.assertEqual(self.result_cache.get_stats()["hits"], 1)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
@@ -0,0 +1,92 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from ..normalize import normalize_latex_expression, normalize_latex_in_sentence
+from ..stdio_server import (
+    serve_stdio, read_messages, LENGTH_PREFIX, FRAMING_LINES, FRAMING_LENGTH
+)
+
+
+REQUEST_LIST = [
+    {"id": 1, "text": r"\frac12"},
+    {"id": "b", "texts": ["长$\\frac12$", "$\\frac{1}{2$"], "mode": "sentence"},
+    {"id": 3, "text": r"\frac{1}{2"},
+    {"id": 4, "text": 1},
+    ["x"],
+]
+
+
+def encode_requests(request_list, framing):
+    data_list = [json.dumps(request).encode("utf-8") for request in request_list]
+    if framing == FRAMING_LINES:
+        return b"".join(data + b"\n" for data in data_list)
+    return b"".join(LENGTH_PREFIX.pack(len(data)) + data for data in data_list)
+
+
+class TestStdioServer(unittest.TestCase):
+    def check_responses(self, response_list):
+        self.assertEqual([response["id"] for response in response_list], [1, "b", 3, 4, None])
+        self.assertEqual(response_list[0]["result"], normalize_latex_expression(r"\frac12"))
+        self.assertEqual(response_list[1]["results"][0], {
+            "result": normalize_latex_in_sentence("长$\\frac12$")
+        })
+        self.assertIn("error", response_list[1]["results"][1])
+        self.assertNotEqual(response_list[2]["error"]["type"], "BadRequest")
+        self.assertEqual(response_list[3]["error"]["type"], "BadRequest")
+        self.assertEqual(response_list[4]["error"]["type"], "BadRequest")
+
+    def test_serve_stdio(self):
+        for framing in (FRAMING_LINES, FRAMING_LENGTH):
+            # pipelined requests are answered in order
+            rfile = io.BytesIO(encode_requests(REQUEST_LIST, framing) + b"\n{")
+            wfile = io.BytesIO()
+            if framing == FRAMING_LINES:
+                self.assertEqual(serve_stdio(rfile, wfile, framing), 0)
+            else:
+                # truncated message
+                self.assertEqual(serve_stdio(rfile, wfile, framing), 1)
+
+            wfile.seek(0)
+            response_list = [
+                json.loads(data.decode("utf-8")) for data in read_messages(wfile, framing)
+            ]
+            if framing == FRAMING_LINES:
+                self.assertEqual(response_list.pop()["error"]["type"], "BadRequest")
+            self.check_responses(response_list)
+
+        with self.assertRaises(ValueError):
+            serve_stdio(io.BytesIO(), io.BytesIO(), "xml")
+
+    def test_co_process(self):
+        process = subprocess.Popen(
+            [sys.executable, "-m", "xizi_latex_normalizer.cli", "--serve-stdio",
+             "--framing", "length", "--normalize-token"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        )
+        try:
+            # a response is flushed before the next request is sent
+            process.stdin.write(encode_requests([{"id": 0, "text": "x^2_3"}], FRAMING_LENGTH))
+            process.stdin.flush()
+            response = next(read_messages(process.stdout, FRAMING_LENGTH))
+            self.assertEqual(json.loads(response.decode("utf-8")), {
+                "id": 0, "result": normalize_latex_expression("x^2_3", normalize_token=True)
+            })
+
+            process.stdin.write(encode_requests(REQUEST_LIST, FRAMING_LENGTH))
+            process.stdin.close()
+            response_list = [
+                json.loads(data.decode("utf-8"))
+                for data in read_messages(process.stdout, FRAMING_LENGTH)
+            ]
+            self.assertEqual(process.wait(timeout=60), 0)
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        self.check_responses(response_list)
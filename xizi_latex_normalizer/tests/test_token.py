@@ -1,6 +1,10 @@
 import unittest
 
 from ..stream import LatexTokenStream
+from ..stream.token_stream import (
+    TOKEN_KIND_COMMAND, TOKEN_KIND_NUMBER, TOKEN_KIND_SYMBOL, TOKEN_KIND_ALPHA_NUM,
+    LEXER_REGEX
+)
 
 
 class TestTokenStream(unittest.TestCase):
@@ -209,3 +213,116 @@ class TestTokenStream(unittest.TestCase):
             LatexTokenStream(r"sinxlgyln10").get_all_tokens(),
             ["\\sin", "x", "\\lg", "y", "\\ln", "10"]
         )
+
+
+class TestTokenTable(unittest.TestCase):
+    def test_table(self):
+        table = LatexTokenStream(r" \frac {12} x", pretokenize=True).get_token_table()
+
+        self.assertEqual(table.texts, ['\\frac', '{', '12', '}', 'x'])
+        self.assertEqual(
+            list(table.kinds),
+            [TOKEN_KIND_COMMAND, TOKEN_KIND_SYMBOL, TOKEN_KIND_NUMBER, 
+             TOKEN_KIND_SYMBOL, TOKEN_KIND_ALPHA_NUM]
+        )
+        self.assertEqual(list(table.starts), [1, 7, 8, 10, 12])
+        self.assertEqual(list(table.ends), [6, 8, 10, 11, 13])
+        self.assertEqual(list(table.index), [0, 0, -1, -1, -1, -1, 1, 1, 2, -1, 3, 4, 4, 5])
+
+    def test_same_tokens(self):
+        latex_list = [
+            r"S _ O A B + S_ AC D+ ",
+            r"\left(\frac{\pi  }{4}+2k\pi ,\frac{\pi }{2}+2k\pi \right)",
+            r"s in (x cosx)",
+            r"sinxlgyln10",
+        ]
+        for latex in latex_list:
+            for kwargs in [{}, {"keep_left_right_marker": False}]:
+                self.assertEqual(
+                    LatexTokenStream(latex, pretokenize=True, **kwargs).get_all_tokens(),
+                    LatexTokenStream(latex, **kwargs).get_all_tokens(),
+                )
+                self.assertEqual(
+                    LatexTokenStream(latex, pretokenize=True, **kwargs).tokenize(),
+                    LatexTokenStream(latex, **kwargs).tokenize(),
+                )
+
+    def test_read_inside_token(self):
+        stream = LatexTokenStream(r"\frac12 + 3", pretokenize=True)
+
+        self.assertEqual(stream.read(), "\\frac")
+        self.assertEqual(stream.read_one_char(), "1")
+        self.assertEqual(stream.peek_one_char(), "2")
+        self.assertEqual(stream.read(), "2")
+        self.assertEqual(stream.peek_one_char(), "+")
+        self.assertEqual(stream.get_all_tokens(), ["+", "3"])
+
+    def test_peek_with_re_inside_stream(self):
+        stream = LatexTokenStream(r"\sqrt 2 x+1")
+        stream.read()
+
+        self.assertEqual(stream.peek_with_re(r"^[0-9 ]*[a-z]"), "2 x")
+        self.assertEqual(stream.read_with_re(r"[0-9 ]*[a-z]"), "2 x")
+        self.assertEqual(stream.get_all_tokens(), ["+", "1"])
+
+    def test_non_ascii_chars(self):
+        self.assertEqual(
+            LatexTokenStream("ä b+一 ² 3.5").get_all_tokens(),
+            ["äb", "+", "一²3.5"]
+        )
+        self.assertEqual(
+            LatexTokenStream("ÄB c+一 ² 3.5").tokenize(),
+            ["ÄB", "c", "+", "一²3.5"]
+        )
+
+
+class TestRegexLexer(unittest.TestCase):
+    def test_same_tokens(self):
+        latex_list = [
+            r"\frac {\frac{1 }{ 2 }} {2}",
+            r"S _ O A B + S_ AC D+ ",
+            r"3.2 + 2.5 .3",
+            r"\left\{\begin{matrix}x^{2}+4y^{2}=36\\x+2y-8=0\end{matrix}\right.",
+            r"sin(xcosx)+lg10\ln50-arcsinx",
+            "\\ \\\tx\n\\",
+            "ÄB c+一 ² 3.5+12ä",
+        ]
+        for latex in latex_list:
+            self.assertEqual(
+                LatexTokenStream(latex, lexer=LEXER_REGEX).get_all_tokens(),
+                LatexTokenStream(latex).get_all_tokens(),
+            )
+            self.assertEqual(
+                LatexTokenStream(latex, lexer=LEXER_REGEX).tokenize(),
+                LatexTokenStream(latex).tokenize(),
+            )
+
+    def test_invalid_lexer(self):
+        with self.assertRaises(ValueError):
+            LatexTokenStream("x", lexer="unknown")
+
+
+class TestLookahead(unittest.TestCase):
+    def test_stats(self):
+        stream = LatexTokenStream(r"\frac12")
+        stream.peek()
+        stream.peek()
+        self.assertEqual(stream.read(), "\\frac")
+        self.assertEqual(stream.peek_one_char(), "1")
+        self.assertEqual(stream.read_one_char(), "1")
+
+        self.assertEqual(
+            stream.get_lookahead_stats(),
+            {"hits": 3, "misses": 2, "hit_rate": 0.6}
+        )
+
+    def test_strip_angle_changed(self):
+        stream = LatexTokenStream(r"\angle A")
+        self.assertEqual(stream.peek(), "\\angle")
+
+        stream.enable_strip_angle()
+        self.assertEqual(stream.peek(), "A")
+
+        stream.disable_strip_angle()
+        self.assertEqual(stream.peek(), "A")
+        self.assertEqual(stream.get_lookahead_stats()["hits"], 0)
@@ -1,5 +1,8 @@
 import unittest
+from unittest import mock
 
+from ..components.base_component import BaseComponent
+from ..components.component_context import ComponentContext, use_component_context
 from ..components.unary_component import (
     SqrtComponent, ExpComponent, SubscriptComponent, Vector2Component, 
     VectorComponent, SineFunctionComponent, CosineFunctionComponent, 
@@ -235,6 +238,10 @@ class TestTrigonometric(unittest.TestCase):
 
 
 class TestLogorithm(unittest.TestCase):
+    def setUp(self):
+        # status is no longer left over by normalizations in other tests
+        LogrithmComponent.set_status(brace_single_elem=True)
+
     def test_log(self):
         self.assertEqual(
             LogrithmComponent.match(LatexTokenStream(r"\log_23")).to_string(),
@@ -411,3 +418,19 @@ class TestRmComponent(unittest.TestCase):
             RmComponent.match(LatexTokenStream(r"\rm kg")).to_string(),
             r""
         )
+
+
+class TestComponentStatus(unittest.TestCase):
+    def test_get_status(self):
+        with mock.patch.dict(BaseComponent._status_dict, clear=True):
+            # unset status is None out of any context
+            for key in ("strip_angle", "brace_single_elem", "keep_rm", "other"):
+                self.assertIsNone(RmComponent.get_status(key))
+
+            RmComponent.set_status(keep_rm=False)
+            self.assertIs(RmComponent.get_status("keep_rm"), False)
+
+            context = ComponentContext(strip_angle=True, brace_single_elem=True, keep_rm=True)
+            with use_component_context(context):
+                self.assertIs(RmComponent.get_status("keep_rm"), True)
+                self.assertIsNone(RmComponent.get_status("other"))
@@ -1,23 +1,84 @@
-from collections import OrderedDict
+import hashlib
+import json
 import re
 
 
-# 所有中文单位列表
-CHINESE_UNIT_TO_LATEX_MAPPER = OrderedDict(
-    米="m", 厘米="cm", 分米="dm", 毫米="mm", 千米="km",
-    平方米="m^2", 平方厘米="cm^2", 平方毫米="mm^2", 平方千米="km^2",
-    立方米="m^2", 立方厘米="cm^3", 立方分米="dm^3", 立方毫米="mm^3",
-    千克="kg", 克="g", 吨="t", 毫克="mg",
-    秒="s", 毫秒="ms", 小时="h", 分钟="min",
-    厘米每秒="cm/s", 米每秒="m/s", 千米每小时="km/h",
-    度=r"^{\circ}", 摄氏度=r"^{\circ}C",
-    千克每立方米="kg/m^3", 立方米每小时="m^3/h", 吨每分钟="t/min",
-    帕斯卡="Pa", 帕="Pa", 千帕="kPa", 千帕斯卡="kPa",
-    牛顿="N", 牛="N",
-    安培="A", 安="A", 欧姆=r"\Omega", 欧=r"\Omega", 伏特="V", 伏="V",
-)
-NO_RM_CHINESE_UNIT = {"度", "摄氏度"}
-CHINESE_UNIT_LIST = list(CHINESE_UNIT_TO_LATEX_MAPPER.keys())
+# opening delimiters of formulas in sentences, `$` following `\` excluded
+OPENING_DELIMITER_PATTERN = re.compile(r"(?<!\\)\$\$?|\\[(\[]")
+CLOSING_DELIMITERS = {"$": "$", "$$": "$$", "\\(": "\\)", "\\[": "\\]"}
+CLOSING_DELIMITER_PATTERNS = {
+    "$": re.compile(r"(?<!\\)\$"),
+    "$$": re.compile(r"(?<!\\)\$\$"),
+    "\\(": re.compile(r"\\\)"),
+    "\\[": re.compile(r"\\\]"),
+}
+
+
+class ChineseUnitMatcher(object):
+    """ Match the longest chinese unit at a position by a single alternation
+    regex of all units sorted from the longest, so `米每秒` is matched before
+    `米` whatever the order of the table
+
+    Args:
+        unit_mapping(dict): chinese unit to latex
+        units_without_rm(set): units whose latex is not wrapped by `\\rm`
+
+    Attributes:
+        digest(str): digest of the table, refer to `get_cache_fingerprint`
+    """
+    def __init__(self, unit_mapping: dict, units_without_rm=()):
+        self.unit_mapping = dict(unit_mapping)
+        self.units_without_rm = set(units_without_rm)
+        self.digest = hashlib.sha256(json.dumps(
+            [sorted(self.unit_mapping.items()), sorted(self.units_without_rm)],
+            ensure_ascii=False
+        ).encode("utf-8")).hexdigest()
+
+        unit_list = sorted(self.unit_mapping, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(unit) for unit in unit_list) or "(?!)")
+
+    def match(self, sent: str, pos: int = 0) -> str:
+        """ Get the longest unit `sent` starts with at `pos`, `None` if not found """
+        matched = self._pattern.match(sent, pos)
+        return matched.group() if matched is not None else None
+
+    def to_latex(self, unit: str) -> str:
+        """ Latex appended to the formula followed by `unit` """
+        if unit in self.units_without_rm:
+            return " " + self.unit_mapping[unit]
+        return " \\rm " + self.unit_mapping[unit]
+
+
+_chinese_unit_matcher = None
+
+
+def load_chinese_units(data_path: str = None) -> ChineseUnitMatcher:
+    """ Load the table of chinese units from a json file like
+    `mapping_data/chinese_unit_mapping.json`, the default one if None, which
+    replaces the table loaded. The persistent cache enabled is invalidated if
+    the table changes, while results cached in memory before are not
+    """
+    # imported here as the mapping data loader and the cache depend on this module
+    from ..mapping.mapping_data_loader import ChineseUnitMappingDataReader
+    from ..cache.persistent_cache import get_persistent_cache
+
+    global _chinese_unit_matcher
+    ChineseUnitMappingDataReader.relase()
+    reader = ChineseUnitMappingDataReader(data_path)
+    _chinese_unit_matcher = ChineseUnitMatcher(
+        reader.get_unit_mapping(), reader.get_units_without_rm()
+    )
+
+    persistent_cache = get_persistent_cache()
+    if persistent_cache is not None:
+        persistent_cache.refresh_fingerprint()
+    return _chinese_unit_matcher
+
+
+def get_chinese_unit_matcher() -> ChineseUnitMatcher:
+    if _chinese_unit_matcher is None:
+        load_chinese_units()
+    return _chinese_unit_matcher
 
 
 def check_json_file(file):
@@ -26,6 +87,7 @@ def check_json_file(file):
 
 
 def trans_chinese_unit_to_latex(sent: str) -> str:
+    unit_matcher = get_chinese_unit_matcher()
     preceding_slash = False
     in_formula = False
 
@@ -42,29 +104,18 @@ def trans_chinese_unit_to_latex(sent: str) -> str:
                 in_formula = not in_formula
 
             if not in_formula:
-                valid_start_idx = idx + 1
-                while valid_start_idx + 1 < len(sent) and sent[valid_start_idx+1] == " ":
-                    valid_start_idx += 1
-
-                chinese_unit = _starts_with_chinese_unit(sent[valid_start_idx:])
+                chinese_unit, unit_end_idx = _match_unit_after_formula(
+                    sent, idx + 1, unit_matcher
+                )
                 if chinese_unit is not None:
-                    valid_group_list.append(
-                        [idx, valid_start_idx + len(chinese_unit), chinese_unit]
-                    )
+                    valid_group_list.append([idx, unit_end_idx, chinese_unit])
         else:
             preceding_slash = False
 
     out_seg_list = []
     start_idx = 0
     for group in valid_group_list:
-        if group[2] in NO_RM_CHINESE_UNIT:
-            seg = "{} {}$".format(
-                sent[start_idx: group[0]], CHINESE_UNIT_TO_LATEX_MAPPER[group[2]]
-            )
-        else:
-            seg = "{} \\rm {}$".format(
-                sent[start_idx: group[0]], CHINESE_UNIT_TO_LATEX_MAPPER[group[2]]
-            )
+        seg = "{}{}$".format(sent[start_idx: group[0]], unit_matcher.to_latex(group[2]))
 
         start_idx = group[1]
         out_seg_list.append(seg)
@@ -74,15 +125,6 @@ def trans_chinese_unit_to_latex(sent: str) -> str:
     return "".join(out_seg_list)
 
 
-def _starts_with_chinese_unit(sent: str) -> bool:
-    global CHINESE_UNIT_LIST
-    for unit in CHINESE_UNIT_LIST:
-        if sent.startswith(unit):
-            return unit
-
-    return None
-
-
 def split_to_latex_and_not(sent: str):
     start_idx, seg_list = 0, []
     preceding_slash, in_formula = False, False
@@ -109,3 +151,91 @@ def split_to_latex_and_not(sent: str):
 
     return seg_list
 
+
+def _match_unit_after_formula(sent: str, start_idx: int, unit_matcher: ChineseUnitMatcher):
+    """ Match chinese unit following a formula ending before `start_idx`
+
+    Returns:
+        tuple, (unit or None, index after the unit)
+    """
+    valid_start_idx = start_idx
+    while valid_start_idx + 1 < len(sent) and sent[valid_start_idx+1] == " ":
+        valid_start_idx += 1
+
+    chinese_unit = unit_matcher.match(sent, valid_start_idx)
+    if chinese_unit is None:
+        return None, start_idx
+    return chinese_unit, valid_start_idx + len(chinese_unit)
+
+
+def scan_sentence(sent: str, trans_unit: bool = True) -> tuple:
+    """ Split `sent` into texts and formulas in a single pass, like
+    `split_to_latex_and_not` after `trans_chinese_unit_to_latex`. Delimiters
+    are searched by compiled regex instead of walking chars, formulas are
+    braced by `$`, `$$`, `\\(` and `\\)`, or `\\[` and `\\]`, and chinese
+    units following formulas are translated into them while scanning
+
+    `$$` without closing `$$` is an empty formula braced by `$`, and `\\(` or
+    `\\[` without closing ones is text. An unclosed `$` makes the rest a
+    formula starting with `$` and no closing delimiter
+
+    Args:
+        sent(str): sentence to split
+        trans_unit(bool): whether to translate chinese units following formulas
+
+    Returns:
+        tuple, (texts and formulas alternately, starting and ending with text,
+            (opening, closing) delimiters of each formula)
+    """
+    unit_matcher = get_chinese_unit_matcher() if trans_unit else None
+    part_list, delimiter_list = [], []
+    text_start_idx = search_idx = 0
+    while True:
+        opening_match = OPENING_DELIMITER_PATTERN.search(sent, search_idx)
+        if opening_match is None:
+            break
+
+        opening = opening_match.group()
+        formula_start_idx = opening_match.end()
+        closing_match = CLOSING_DELIMITER_PATTERNS[opening].search(sent, formula_start_idx)
+        if closing_match is None and opening == "$$":
+            opening, formula_start_idx = "$", opening_match.start() + 1
+            closing_match = CLOSING_DELIMITER_PATTERNS[opening].search(sent, formula_start_idx)
+        if closing_match is None and opening != "$":
+            search_idx = formula_start_idx
+            continue
+
+        part_list.append(sent[text_start_idx:opening_match.start()])
+        if closing_match is None:
+            part_list.append(sent[opening_match.start():])
+            delimiter_list.append((opening, ""))
+            text_start_idx = len(sent)
+            break
+
+        formula = sent[formula_start_idx:closing_match.start()]
+        text_start_idx = closing_match.end()
+        if unit_matcher is not None:
+            chinese_unit, text_start_idx = _match_unit_after_formula(
+                sent, text_start_idx, unit_matcher
+            )
+            if chinese_unit is not None:
+                formula += unit_matcher.to_latex(chinese_unit)
+
+        part_list.append(formula)
+        delimiter_list.append((opening, CLOSING_DELIMITERS[opening]))
+        search_idx = text_start_idx
+
+    part_list.append(sent[text_start_idx:])
+
+    return part_list, delimiter_list
+
+
+def join_scanned_sentence(part_list: list, delimiter_list: list) -> str:
+    """ Join texts and formulas split by `scan_sentence` with delimiters """
+    out_part_list = [part_list[0]]
+    for latex_idx, (opening, closing) in enumerate(delimiter_list):
+        out_part_list.extend((
+            opening, part_list[2 * latex_idx + 1], closing, part_list[2 * latex_idx + 2]
+        ))
+
+    return "".join(out_part_list)